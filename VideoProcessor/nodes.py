@@ -4,6 +4,7 @@ import torch
 import numpy as np
 import subprocess
 from datetime import datetime
+from ..video_utils import FirstFrameCache, VideoFrameIndex
 
 class VideoProcessorNode:
     @classmethod
@@ -41,13 +42,8 @@ class VideoProcessorNode:
         return (video_path, frame_seq, audio_path, first_frame)
 
     def _extract_first_frame(self, video_path):
-        cap = cv2.VideoCapture(video_path)
-        success, frame = cap.read()
-        cap.release()
-        if not success:
-            raise ValueError("无法读取视频首帧")
-        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        return torch.from_numpy(frame_rgb.astype(np.float32) / 255.0).unsqueeze(0)
+        # 优先取磁盘首帧缓存，命中时不打开视频
+        return FirstFrameCache.get_tensor(video_path)
 
     def _extract_frames(self, video_path, output_dir, interval):
         os.makedirs(output_dir, exist_ok=True)
@@ -83,5 +79,68 @@ class VideoProcessorNode:
             print(f"音频提取失败: {str(e)}")
             return ""
 
-NODE_CLASS_MAPPINGS = {"VideoProcessorNode": VideoProcessorNode}
-NODE_DISPLAY_NAME_MAPPINGS = {"VideoProcessorNode": "⒎11加载视频♈微信stone_liwei"}
\ No newline at end of file
+class VideoFrameSamplerNode:
+    """
+    按时间点/帧序号/均匀间隔随机读取视频帧
+    基于持久化的帧索引(时间戳+关键帧位置)，每帧只需一次跳转加最多一个GOP的解码，不必从头解码
+    """
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "video_path": ("STRING", {"default": "input/video.mp4", "multiline": False}),
+                "mode": (["evenly", "timestamps", "indices"], {
+                    "default": "evenly",
+                    "tooltip": "evenly=均匀抽取count帧；timestamps=按秒数取帧；indices=按帧序号(从0开始)取帧"
+                }),
+                "count": ("INT", {
+                    "default": 8, "min": 1, "max": 1024,
+                    "tooltip": "evenly模式下抽取的帧数"
+                }),
+                "positions": ("STRING", {
+                    "default": "", "multiline": True,
+                    "tooltip": "timestamps/indices模式下的秒数或帧序号，逗号或换行分隔，例如: 1.5, 30, 360"
+                }),
+            }
+        }
+
+    RETURN_TYPES = ("IMAGE", "STRING", "INT")
+    RETURN_NAMES = ("frames", "frame_info", "total_frames")
+    FUNCTION = "sample_frames"
+    CATEGORY = "🎨公众号懂AI的木子做号工具/懒人做号/视频相关"
+    OUTPUT_NODE = True
+
+    def sample_frames(self, video_path, mode, count, positions):
+        if not os.path.isfile(video_path):
+            raise ValueError(f"视频文件不存在: {video_path}")
+        index = VideoFrameIndex.get(video_path)
+        if not len(index):
+            raise ValueError(f"视频中没有帧: {video_path}")
+
+        if mode == "evenly":
+            targets = index.evenly(count)
+        else:
+            values = [v for v in positions.replace("，", ",").replace("\n", ",").split(",") if v.strip()]
+            if not values:
+                raise ValueError("请在positions中填写秒数或帧序号")
+            try:
+                if mode == "timestamps":
+                    targets = [index.index_at(float(v)) for v in values]
+                else:
+                    targets = [int(v) for v in values]
+            except ValueError:
+                raise ValueError(f"positions格式错误: {positions}")
+
+        frames = index.read_frames(video_path, targets)
+        images = torch.from_numpy(np.stack(frames).astype(np.float32) / 255.0)
+        frame_info = "\n".join(f"{t},{index.pts[t]:.3f}" for t in targets)
+        return (images, frame_info, len(index))
+
+NODE_CLASS_MAPPINGS = {
+    "VideoProcessorNode": VideoProcessorNode,
+    "VideoFrameSamplerNode": VideoFrameSamplerNode,
+}
+NODE_DISPLAY_NAME_MAPPINGS = {
+    "VideoProcessorNode": "⒎11加载视频♈微信stone_liwei",
+    "VideoFrameSamplerNode": "📺视频任意帧提取（关键帧索引）",
+}
\ No newline at end of file
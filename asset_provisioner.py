@@ -0,0 +1,201 @@
+"""
+资源预备管理器
+- 汇总插件需要的全部Lora和LUT资源清单
+- 插件加载时在后台线程池中下载缺失资源，节点执行时按资源等待对应的future
+- 命令行入口：从本地镜像目录离线预热资源（用于构建容器镜像）
+
+命令行用法:
+    python asset_provisioner.py --mirror /path/to/mirror
+"""
+import os
+import sys
+import queue
+import shutil
+import argparse
+import threading
+from concurrent.futures import Future
+
+try:
+    from .lora_utils import LoraManifest, validate_safetensors, sha256_file
+except ImportError:  # 作为脚本直接运行
+    from lora_utils import LoraManifest, validate_safetensors, sha256_file
+
+PLUGIN_DIR = os.path.dirname(os.path.realpath(__file__))
+
+# ======== 资源清单 ========
+LORA_REPO = "https://huggingface.co/liguanwei/mymodels/resolve/main/"
+LORA_ASSETS = {
+    name: LORA_REPO + name
+    for name in [
+        "breast_size_lora.safetensors",
+        "breast_size_nswf.safetensors",
+        "hand_stability_lora.safetensors",
+        "sexy_style_lora.safetensors",
+        "Beautifulgirl_size_lora.safetensors",
+    ]
+}
+
+LUT_REPO = "https://huggingface.co/datasets/liguanwei/luts/resolve/main/"
+LUT_FILES = [
+    "快速电影.cube",
+    "时尚电影.cube",
+    "胶片颗粒质感电影.cube",
+]
+
+
+class AssetProvisioner:
+    """
+    后台资源下载管理器（进程级单例，全部为类方法）
+    - MUZI_ASSET_PREFETCH=0 可关闭插件加载时的后台下载
+    - MUZI_ASSET_WORKERS 设置后台线程数
+    """
+    enabled = os.environ.get("MUZI_ASSET_PREFETCH", "1") != "0"
+    max_workers = int(os.environ.get("MUZI_ASSET_WORKERS", "3"))
+    _futures = {}  # (类型, 名称) -> Future
+    _queue = queue.Queue()
+    _workers = []
+    _lock = threading.Lock()
+
+    @classmethod
+    def _worker(cls):
+        while True:
+            future, fetch, args = cls._queue.get()
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(fetch(*args))
+                except Exception as e:
+                    print(f"[资源预备] 后台下载失败 {args}: {str(e)}")
+                    future.set_exception(e)
+            cls._queue.task_done()
+
+    @classmethod
+    def _ensure_workers(cls):
+        # 使用守护线程，避免退出ComfyUI时等待未完成的下载
+        while len(cls._workers) < cls.max_workers:
+            worker = threading.Thread(target=cls._worker, daemon=True, name="MuziAssetProvisioner")
+            worker.start()
+            cls._workers.append(worker)
+
+    @classmethod
+    def submit(cls, kind, name, fetch, *args):
+        """提交一个资源下载任务，同一资源只提交一次"""
+        key = (kind, name)
+        with cls._lock:
+            future = cls._futures.get(key)
+            if future is not None:
+                return future
+            future = Future()
+            cls._futures[key] = future
+            cls._ensure_workers()
+        cls._queue.put((future, fetch, args))
+        return future
+
+    @classmethod
+    def start(cls, lora_fetch, lut_fetch):
+        """
+        插件加载时调用，后台下载清单中的全部资源
+        lora_fetch(url, name) / lut_fetch(name) 由节点模块提供
+        """
+        if not cls.enabled:
+            print("[资源预备] 已关闭后台下载(MUZI_ASSET_PREFETCH=0)")
+            return
+        for name, url in LORA_ASSETS.items():
+            cls.submit("lora", name, lora_fetch, url, name)
+        for name in LUT_FILES:
+            cls.submit("lut", name, lut_fetch, name)
+        print(f"[资源预备] 已在后台预备 {len(LORA_ASSETS)} 个Lora、{len(LUT_FILES)} 个LUT")
+
+    @classmethod
+    def wait(cls, kind, name, timeout=None):
+        """等待某个资源的后台任务结束，返回结果；未提交或失败时返回None"""
+        future = cls._futures.get((kind, name))
+        if future is None:
+            return None
+        if not future.done():
+            print(f"[资源预备] 等待后台下载完成: {name}")
+        try:
+            return future.result(timeout=timeout)
+        except Exception:
+            return None
+
+
+# ======== 离线预热 ========
+def _copy_atomic(src, dest):
+    part_path = dest + ".part"
+    shutil.copyfile(src, part_path)
+    os.replace(part_path, dest)
+
+
+def _find_in_mirror(mirror_dir, sub_dir, name):
+    for candidate in (os.path.join(mirror_dir, sub_dir, name), os.path.join(mirror_dir, name)):
+        if os.path.isfile(candidate):
+            return candidate
+    return None
+
+
+def prewarm_from_mirror(mirror_dir, plugin_dir=PLUGIN_DIR, force=False):
+    """
+    从本地镜像目录复制清单中的资源到插件目录
+    镜像目录可以是扁平结构，也可以包含loras/、luts/子目录
+    返回缺失的资源列表
+    """
+    lora_dir = os.path.join(plugin_dir, "loras")
+    lut_dir = os.path.join(plugin_dir, "luts")
+    os.makedirs(lora_dir, exist_ok=True)
+    os.makedirs(lut_dir, exist_ok=True)
+    manifest = LoraManifest(lora_dir)
+    missing = []
+
+    for name, url in LORA_ASSETS.items():
+        dest = os.path.join(lora_dir, name)
+        if os.path.exists(dest) and not force:
+            print(f"[资源预备] 已存在: {dest}")
+            continue
+        src = _find_in_mirror(mirror_dir, "loras", name)
+        if src is None:
+            print(f"[资源预备] 镜像中缺少: {name}")
+            missing.append(name)
+            continue
+        try:
+            validate_safetensors(src)
+        except ValueError as e:
+            print(f"[资源预备] 镜像文件无效 {src}: {str(e)}")
+            missing.append(name)
+            continue
+        _copy_atomic(src, dest)
+        manifest.record(name, dest, sha256_file(dest), url)
+        print(f"[资源预备] 已复制: {dest}")
+
+    for name in LUT_FILES:
+        dest = os.path.join(lut_dir, name)
+        if os.path.exists(dest) and not force:
+            print(f"[资源预备] 已存在: {dest}")
+            continue
+        src = _find_in_mirror(mirror_dir, "luts", name)
+        if src is None:
+            print(f"[资源预备] 镜像中缺少: {name}")
+            missing.append(name)
+            continue
+        _copy_atomic(src, dest)
+        print(f"[资源预备] 已复制: {dest}")
+
+    return missing
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="从本地镜像目录离线预热Lora/LUT资源")
+    parser.add_argument("--mirror", required=True, help="本地镜像目录")
+    parser.add_argument("--plugin-dir", default=PLUGIN_DIR, help="插件目录(默认为本文件所在目录)")
+    parser.add_argument("--force", action="store_true", help="覆盖已存在的文件")
+    args = parser.parse_args(argv)
+
+    missing = prewarm_from_mirror(args.mirror, args.plugin_dir, args.force)
+    if missing:
+        print(f"[资源预备] 缺少 {len(missing)} 个资源: {', '.join(missing)}")
+        return 1
+    print("[资源预备] 全部资源就绪")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
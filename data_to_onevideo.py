@@ -1,10 +1,8 @@
 import os
 import random
-import glob
-import cv2
-import torch
-import numpy as np
-from PIL import Image
+from .image_utils import DirectoryIndex
+from .media_catalog import MediaCatalog
+from .video_utils import FirstFrameCache, VIDEO_EXTENSIONS
 
 class RandomVideoLoadertwo:
     """
@@ -18,6 +16,24 @@ class RandomVideoLoadertwo:
             },
             "optional": {
                 "gpu_acceleration": ("BOOLEAN", {"default": True}),
+                "orientation": (["any", "landscape", "portrait", "square"], {
+                    "default": "any",
+                    "tooltip": "按画面方向筛选：不限/横屏/竖屏/方形（来自媒体目录中的容器元数据，不解码）"
+                }),
+                "min_duration": ("FLOAT", {
+                    "default": 0.0,
+                    "min": 0.0,
+                    "max": 86400.0,
+                    "step": 0.5,
+                    "tooltip": "最短时长（秒），0为不限"
+                }),
+                "max_duration": ("FLOAT", {
+                    "default": 0.0,
+                    "min": 0.0,
+                    "max": 86400.0,
+                    "step": 0.5,
+                    "tooltip": "最长时长（秒），0为不限，例如15表示只选15秒以内的视频"
+                }),
             }
         }
     
@@ -45,7 +61,7 @@ class RandomVideoLoadertwo:
         )
 
 
-    def load_random_video(self, seed, gpu_acceleration=True):
+    def load_random_video(self, seed, gpu_acceleration=True, orientation="any", min_duration=0.0, max_duration=0.0):
         # 设置固定目录名
         directory = "vdata"
         
@@ -58,37 +74,23 @@ class RandomVideoLoadertwo:
         # 构建视频目录路径(相对于插件目录)
         video_dir = os.path.join(current_dir, directory)
         
-        # 扫描目录下的视频文件
-        video_extensions = ['*.del', '*.mp4', '*.mov', '*.avi', '*.mkv', '*.webm']
-        video_files = []
-        for ext in video_extensions:
-            video_files.extend(glob.glob(os.path.join(video_dir, ext)))
+        # 扫描目录下的视频文件：共享的增量目录索引，按文件名排序，同一seed总是选中同一个视频
+        if not os.path.isdir(video_dir):
+            raise ValueError(f"Video directory not found: {video_dir}")
+        index = DirectoryIndex.get(video_dir, ('.del',) + VIDEO_EXTENSIONS)
+        
+        # 在媒体目录中按方向/时长筛选（只查询已记录的容器元数据，不解码）
+        video_files = MediaCatalog.view(index, "video", orientation, min_duration, max_duration).files()
         
         if not video_files:
-            raise ValueError(f"No video files found in directory: {video_dir}")
+            raise ValueError(f"No matching video files found in directory: {video_dir}")
         
         # 随机选择一个视频
         selected_video = random.choice(video_files)
         
-        # 读取视频
+        # 读取首帧：优先取磁盘首帧缓存，命中时不打开视频
         try:
-            if gpu_acceleration and torch.cuda.is_available():
-                cap = cv2.VideoCapture(selected_video, cv2.CAP_ANY)
-                cap.set(cv2.CAP_PROP_HW_ACCELERATION, cv2.VIDEO_ACCELERATION_ANY)
-            else:
-                cap = cv2.VideoCapture(selected_video)
-            
-            # 读取第一帧
-            success, frame = cap.read()
-            cap.release()
-            
-            if not success:
-                raise ValueError(f"Failed to read first frame from video: {selected_video}")
-            
-            # 转换图像格式
-            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            image = Image.fromarray(frame)
-            image_tensor = torch.from_numpy(np.array(image).astype(np.float32) / 255.0).unsqueeze(0)
+            image_tensor = FirstFrameCache.get_tensor(selected_video, gpu_acceleration)
             
             return (selected_video, image_tensor)
         except Exception as e:
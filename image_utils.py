@@ -0,0 +1,732 @@
+"""
+图片加载工具（不依赖ComfyUI）
+- 目录索引：基于os.scandir，进程内共享；Linux下用inotify、其他平台用目录修改时间检测变化，只增量应用新增/删除
+- 顺序模式的后台预解码队列（深度和内存上限）
+- 多张图片并行解码并合成为一个批次（尺寸不同时letterbox/裁剪/拉伸）
+- 进程级解码结果LRU缓存，所有图片加载节点共享
+- 降分辨率解码(max_side)：JPEG按DCT缩放直接解码到接近目标的尺寸，再做一次缩放
+- zip/tar归档内图片的索引与随机读取，无需解压
+"""
+import io
+import os
+import sys
+import json
+import time
+import struct
+import bisect
+import hashlib
+import tarfile
+import zipfile
+import threading
+from functools import partial
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import torch
+from PIL import Image, ImageOps
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp', '.bmp')
+
+ARCHIVE_EXTENSIONS = ('.zip', '.tar', '.tar.gz', '.tgz')
+
+# 批次中尺寸不一致时的处理方式
+RESIZE_MODES = ("letterbox", "crop", "resize")
+
+# 目录修改时间离当前不足该值时不信任(部分文件系统时间精度为秒级)，下次仍重新比对
+MTIME_SETTLE_NS = 2 * 1000 ** 3
+
+
+class _Inotify:
+    """
+    进程内共享的inotify实例(仅Linux)，按watch描述符把事件分发给各目录索引
+    不可用时(非Linux、实例数达到上限等)所有方法返回None，目录索引退回到修改时间检测
+    """
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_DELETE = 0x00000200
+    IN_DELETE_SELF = 0x00000400
+    IN_MOVE_SELF = 0x00000800
+    IN_Q_OVERFLOW = 0x00004000
+    IN_IGNORED = 0x00008000
+    IN_ISDIR = 0x40000000
+    IN_NONBLOCK = 0o4000
+    IN_CLOEXEC = 0o2000000
+
+    # 只在写入完成(关闭)或移入时加入索引，避免顺序模式读到其他流程还在写的文件
+    ADD_MASK = IN_CLOSE_WRITE | IN_MOVED_TO
+    REMOVE_MASK = IN_DELETE | IN_MOVED_FROM
+    INVALID_MASK = IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED
+
+    EVENT_HEADER = struct.Struct("iIII")
+
+    _libc = None
+    _fd = None
+    # 单个目录累积的事件超过该数量时丢弃事件，下次refresh改为完整比对(长期不刷新的目录不会无限增长)
+    MAX_PENDING_EVENTS = 4096
+
+    _pending = {}  # wd -> [(文件名, 是否存在)]，None表示该目录需要完整比对
+    _lock = threading.Lock()
+    _unavailable = sys.platform != "linux"
+
+    @classmethod
+    def _ensure(cls):
+        if cls._fd is not None or cls._unavailable:
+            return cls._fd
+        try:
+            import ctypes
+            import ctypes.util
+            libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+            fd = libc.inotify_init1(cls.IN_NONBLOCK | cls.IN_CLOEXEC)
+            if fd < 0:
+                raise OSError(ctypes.get_errno(), "inotify_init1失败")
+            cls._libc, cls._fd = libc, fd
+        except Exception as e:
+            print(f"[目录索引] inotify不可用，改用目录修改时间检测: {str(e)}")
+            cls._unavailable = True
+        return cls._fd
+
+    @classmethod
+    def add_watch(cls, directory):
+        """监视目录，返回watch描述符；失败返回None"""
+        with cls._lock:
+            if cls._ensure() is None:
+                return None
+            mask = cls.ADD_MASK | cls.REMOVE_MASK | cls.INVALID_MASK
+            wd = cls._libc.inotify_add_watch(cls._fd, os.fsencode(directory), mask)
+            if wd < 0:
+                return None
+            cls._pending[wd] = []
+            return wd
+
+    @classmethod
+    def _drain(cls):
+        while True:
+            try:
+                data = os.read(cls._fd, 64 * 1024)
+            except BlockingIOError:
+                return
+            offset = 0
+            while offset < len(data):
+                wd, mask, _cookie, length = cls.EVENT_HEADER.unpack_from(data, offset)
+                offset += cls.EVENT_HEADER.size
+                name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+                offset += length
+
+                if mask & cls.IN_Q_OVERFLOW:
+                    # 事件队列溢出，所有目录都需要完整比对
+                    for key in cls._pending:
+                        cls._pending[key] = None
+                    continue
+                events = cls._pending.get(wd)
+                if events is None:
+                    continue
+                if mask & cls.INVALID_MASK:
+                    cls._pending[wd] = None
+                elif len(events) >= cls.MAX_PENDING_EVENTS:
+                    cls._pending[wd] = None
+                elif not (mask & cls.IN_ISDIR):
+                    events.append((name, bool(mask & cls.ADD_MASK)))
+
+    @classmethod
+    def take_events(cls, wd):
+        """取出该目录累积的事件；返回None表示事件不可信，需要完整比对"""
+        with cls._lock:
+            cls._drain()
+            events = cls._pending.get(wd)
+            if events is None:
+                return None
+            cls._pending[wd] = []
+            return events
+
+    @classmethod
+    def remove_watch(cls, wd):
+        with cls._lock:
+            cls._pending.pop(wd, None)
+            if cls._fd is not None:
+                cls._libc.inotify_rm_watch(cls._fd, wd)
+
+
+class DirectoryIndex:
+    """
+    单个目录的图片文件索引（进程内按(目录, 扩展名)共享）
+    - 首次用os.scandir列出文件名并排序，之后每次refresh只应用新增和删除：
+      有inotify时直接使用事件中的文件名，不再列目录；否则仅在目录修改时间变化时重新列出并比对差集
+    - 顺序模式可用next_after按上次文件名定位下一张，新加入的文件按排序位置自然被读到
+    """
+    _instances = {}
+    _registry_lock = threading.Lock()
+
+    @classmethod
+    def get(cls, directory, extensions=IMAGE_EXTENSIONS):
+        key = (os.path.realpath(directory), tuple(sorted(ext.lower() for ext in extensions)))
+        with cls._registry_lock:
+            index = cls._instances.get(key)
+            if index is None:
+                index = cls(*key)
+                cls._instances[key] = index
+        return index
+
+    def __init__(self, directory, extensions):
+        self.directory = directory
+        self.extensions = frozenset(extensions)
+        self._names = []
+        self._name_set = set()
+        self._paths = None  # 完整路径列表缓存，索引变化时失效
+        self._dir_mtime_ns = None
+        self._wd = None
+        self._scanned = False
+        self._lock = threading.Lock()
+        self.full_scans = 0
+        self.incremental_updates = 0
+        self.version = 0  # 文件列表每次变化时加1，供媒体目录判断是否需要同步
+
+    def _accept(self, name):
+        return os.path.splitext(name)[1].lower() in self.extensions
+
+    def _name_of(self, path):
+        return os.path.basename(path)
+
+    def _list_names(self):
+        with os.scandir(self.directory) as entries:
+            return {entry.name for entry in entries if self._accept(entry.name) and entry.is_file()}
+
+    def _add(self, name):
+        if name not in self._name_set:
+            self._name_set.add(name)
+            bisect.insort(self._names, name)
+            self._paths = None
+            self.version += 1
+
+    def _remove(self, name):
+        if name in self._name_set:
+            self._name_set.discard(name)
+            del self._names[bisect.bisect_left(self._names, name)]
+            self._paths = None
+            self.version += 1
+
+    def _rescan(self):
+        """重新列出目录并与当前索引比对，只应用差集"""
+        stat = os.stat(self.directory)
+        names = self._list_names()
+        added = names - self._name_set
+        removed = self._name_set - names
+        if len(added) + len(removed) > len(self._names) // 4:
+            self._names = sorted(names)
+            self._name_set = names
+            self._paths = None
+            self.version += 1
+        else:
+            for name in removed:
+                self._remove(name)
+            for name in added:
+                self._add(name)
+        self.full_scans += 1
+        settled = time.time_ns() - stat.st_mtime_ns > MTIME_SETTLE_NS
+        self._dir_mtime_ns = stat.st_mtime_ns if settled else None
+
+    def refresh(self):
+        with self._lock:
+            if not os.path.isdir(self.directory):
+                raise ValueError(f"目录不存在: {self.directory}")
+
+            if not self._scanned:
+                # 先建立监视再列目录，避免漏掉两者之间新增的文件
+                self._wd = _Inotify.add_watch(self.directory)
+                self._rescan()
+                self._scanned = True
+                return
+
+            if self._wd is not None:
+                events = _Inotify.take_events(self._wd)
+                if events is None:
+                    _Inotify.remove_watch(self._wd)
+                    self._wd = _Inotify.add_watch(self.directory)
+                    self._rescan()
+                elif events:
+                    for name, present in events:
+                        if not self._accept(name):
+                            continue
+                        if present and os.path.isfile(os.path.join(self.directory, name)):
+                            self._add(name)
+                        elif not present:
+                            self._remove(name)
+                    self.incremental_updates += 1
+                return
+
+            if os.stat(self.directory).st_mtime_ns != self._dir_mtime_ns:
+                self._rescan()
+
+    def files(self):
+        """刷新后返回排序后的完整路径列表"""
+        self.refresh()
+        with self._lock:
+            if self._paths is None:
+                self._paths = [os.path.join(self.directory, name) for name in self._names]
+            return list(self._paths)
+
+    def __len__(self):
+        return len(self._names)
+
+    def following(self, path, count):
+        """排在path之后的最多count个路径(循环，不含path本身)，用于预取"""
+        with self._lock:
+            total = len(self._names)
+            if total <= 1 or count <= 0:
+                return []
+            start = bisect.bisect_right(self._names, self._name_of(path))
+            names = [self._names[(start + i) % total] for i in range(min(count, total - 1))]
+            return [os.path.join(self.directory, name) for name in names]
+
+    def next_after(self, last_path=None):
+        """
+        顺序模式：返回排在last_path之后的(序号, 路径)，到末尾后从头循环
+        last_path已被删除也能正确定位；目录为空时返回(None, None)
+        """
+        self.refresh()
+        with self._lock:
+            if not self._names:
+                return None, None
+            position = 0
+            if last_path:
+                position = bisect.bisect_right(self._names, self._name_of(last_path))
+                if position >= len(self._names):
+                    position = 0
+            return position, os.path.join(self.directory, self._names[position])
+
+
+class ArchiveIndex(DirectoryIndex):
+    """
+    zip/tar归档内的图片索引，接口与DirectoryIndex相同，图片路径形如 <归档路径>/<成员名>
+    - 成员表只构建一次，按归档的修改时间和大小持久化到插件.cache/archives，重启后不再遍历归档
+    - 读取时按成员随机访问：zip按中央目录定位；未压缩tar按记录的数据偏移直接读取
+      (.tar.gz等压缩tar无法随机定位，每次读取都要从头解压，大归档建议使用zip或未压缩tar)
+    - 批量读取文件头(iter_heads)时只读取各成员的开头部分，压缩tar也只顺序解压一遍
+    """
+    cache_dir = os.path.join(os.path.dirname(os.path.realpath(__file__)), ".cache", "archives")
+    _instances = {}
+    _registry_lock = threading.Lock()
+
+    def __init__(self, archive, extensions):
+        super().__init__(archive, extensions)
+        self._members = {}  # 成员名 -> [数据偏移, 大小](未压缩tar)或None
+        self._archive_key = None
+        self._zip = None
+        self._zip_lock = threading.Lock()
+
+    @classmethod
+    def owner_of(cls, path):
+        """返回path所在归档的索引；不是归档内路径时返回None"""
+        with cls._registry_lock:
+            indexes = list(cls._instances.values())
+        for index in indexes:
+            if path.startswith(index.directory + os.sep):
+                return index
+        return None
+
+    def _name_of(self, path):
+        return path[len(self.directory) + 1:]
+
+    def _cache_path(self):
+        digest = hashlib.sha1(self.directory.encode("utf-8")).hexdigest()[:16]
+        return os.path.join(self.cache_dir, f"{digest}.json")
+
+    def _build_members(self):
+        members = {}
+        if self.directory.lower().endswith(".zip"):
+            with zipfile.ZipFile(self.directory) as archive:
+                for info in archive.infolist():
+                    if not info.is_dir() and self._accept(info.filename):
+                        members[info.filename] = None
+        else:
+            seekable = self.directory.lower().endswith(".tar")
+            with tarfile.open(self.directory) as archive:
+                for info in archive:
+                    if info.isfile() and self._accept(info.name):
+                        members[info.name] = [info.offset_data, info.size] if seekable else None
+        return members
+
+    def _load_members(self, stat):
+        cache_path = self._cache_path()
+        try:
+            with open(cache_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data["mtime_ns"] == stat.st_mtime_ns and data["size"] == stat.st_size:
+                return data["members"]
+        except (OSError, ValueError, KeyError):
+            pass
+
+        print(f"[归档索引] 正在建立成员索引: {self.directory}")
+        members = self._build_members()
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = cache_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "members": members}, f, ensure_ascii=False)
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            print(f"[归档索引] 写入索引缓存失败: {str(e)}")
+        return members
+
+    def refresh(self):
+        with self._lock:
+            if not os.path.isfile(self.directory):
+                raise ValueError(f"归档文件不存在: {self.directory}")
+            stat = os.stat(self.directory)
+            if self._archive_key == (stat.st_mtime_ns, stat.st_size):
+                return
+            self._members = self._load_members(stat)
+            self._names = sorted(self._members)
+            self._name_set = set(self._names)
+            self._paths = None
+            self.version += 1
+            self._archive_key = (stat.st_mtime_ns, stat.st_size)
+            with self._zip_lock:
+                if self._zip is not None:
+                    self._zip.close()
+                    self._zip = None
+            self.full_scans += 1
+
+    def stat(self):
+        return os.stat(self.directory)
+
+    def is_compressed_tar(self):
+        return not self.directory.lower().endswith((".zip", ".tar"))
+
+    def read(self, path, limit=None):
+        """读取归档内成员的字节；limit为只读取开头的字节数(不读取整个成员)"""
+        name = self._name_of(path)
+        if name not in self._members:
+            raise FileNotFoundError(f"归档中没有该文件: {path}")
+        entry = self._members[name]
+        if self.directory.lower().endswith(".zip"):
+            with self._zip_lock:
+                if self._zip is None:
+                    self._zip = zipfile.ZipFile(self.directory)
+                archive = self._zip
+            # ZipFile在多个线程中读取不同成员是安全的
+            with archive.open(name) as f:
+                return f.read() if limit is None else f.read(limit)
+        if entry is not None:
+            offset, size = entry
+            with open(self.directory, "rb") as f:
+                f.seek(offset)
+                return f.read(size if limit is None else min(size, limit))
+        with tarfile.open(self.directory) as archive:
+            f = archive.extractfile(name)
+            return f.read() if limit is None else f.read(limit)
+
+    def iter_heads(self, paths, limit):
+        """
+        逐个给出(路径, 成员开头最多limit字节)，用于批量读取文件头
+        压缩tar按存放顺序流式解压一遍；zip和未压缩tar按成员随机读取
+        """
+        if not self.is_compressed_tar():
+            for path in paths:
+                yield path, self.read(path, limit)
+            return
+        wanted = {self._name_of(path): path for path in paths}
+        if not wanted:
+            return
+        with tarfile.open(self.directory, mode="r|*") as archive:
+            for info in archive:
+                path = wanted.pop(info.name, None)
+                if path is not None and info.isfile():
+                    yield path, archive.extractfile(info).read(limit)
+                if not wanted:
+                    break
+
+
+def is_archive(path):
+    return path.lower().endswith(ARCHIVE_EXTENSIONS) and os.path.isfile(path)
+
+
+def get_image_index(path, extensions=IMAGE_EXTENSIONS):
+    """目录返回DirectoryIndex，zip/tar归档返回ArchiveIndex"""
+    if is_archive(path):
+        return ArchiveIndex.get(path, extensions)
+    return DirectoryIndex.get(path, extensions)
+
+
+def open_image_source(path):
+    """普通文件直接返回路径；归档内的图片读出为内存文件"""
+    archive = ArchiveIndex.owner_of(path)
+    if archive is not None:
+        return io.BytesIO(archive.read(path))
+    return path
+
+
+def load_image_tensor(path, max_side=0):
+    """
+    解码为ComfyUI图像张量[1,H,W,3]，float32，取值0~1
+    max_side>0且长边超过它时降分辨率解码：JPEG用Image.draft按1/2、1/4、1/8的DCT缩放直接解码到
+    不小于目标的尺寸(其他格式照常解码)，再用一次LANCZOS缩放到长边等于max_side
+    """
+    with Image.open(open_image_source(path)) as image:
+        if max_side and max(image.size) > max_side:
+            scale = max_side / max(image.size)
+            target = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+            image.draft("RGB", target)
+            image = image.convert("RGB")
+            if image.size != target:
+                image = image.resize(target, Image.LANCZOS)
+        else:
+            image = image.convert("RGB")
+        return torch.from_numpy(np.array(image).astype(np.float32) / 255.0)[None, ]
+
+
+def load_image_tensor_exif(path):
+    """按EXIF方向旋转后再解码"""
+    with Image.open(open_image_source(path)) as image:
+        image = ImageOps.exif_transpose(image).convert("RGB")
+        return torch.from_numpy(np.array(image).astype(np.float32) / 255.0)[None, ]
+
+
+class DecodedImageCache:
+    """
+    进程级解码图片缓存，插件内所有图片加载节点共享
+    - 以(真实路径, 修改时间, 文件大小, 解码方式)为键，文件被替换后自动失效
+    - 按字节预算做LRU淘汰，预算可用环境变量MUZI_IMAGE_CACHE_MB或set_budget配置(0为关闭)
+    - 返回的张量被多次运行共享，调用方不应原地修改
+    """
+    max_bytes = int(float(os.environ.get("MUZI_IMAGE_CACHE_MB", "1024")) * 1024 * 1024)
+    hits = 0
+    misses = 0
+    evictions = 0
+    _entries = OrderedDict()  # key -> 张量
+    _bytes = 0
+    _lock = threading.Lock()
+
+    @staticmethod
+    def make_key(path, variant=""):
+        # 归档内的图片以归档文件的修改时间和大小判断是否失效
+        archive = ArchiveIndex.owner_of(path)
+        if archive is not None:
+            stat = archive.stat()
+            return (path, stat.st_mtime_ns, stat.st_size, variant)
+        stat = os.stat(path)
+        return (os.path.realpath(path), stat.st_mtime_ns, stat.st_size, variant)
+
+    @classmethod
+    def get(cls, path, loader=load_image_tensor, variant=""):
+        """返回path的解码结果，未命中时用loader解码并缓存；variant区分同一文件的不同解码方式"""
+        key = cls.make_key(path, variant)
+        with cls._lock:
+            tensor = cls._entries.get(key)
+            if tensor is not None:
+                cls._entries.move_to_end(key)
+                cls.hits += 1
+                return tensor
+            cls.misses += 1
+
+        # 解码不持锁，多个线程可并行解码不同文件
+        tensor = loader(path)
+        with cls._lock:
+            cls._put(key, tensor)
+        return tensor
+
+    @classmethod
+    def _put(cls, key, tensor):
+        # 同一路径同一解码方式的旧版本直接丢弃
+        for stale in [k for k in cls._entries if k[0] == key[0] and k[3] == key[3]]:
+            cls._bytes -= cls._entries.pop(stale).nbytes
+        if tensor.nbytes > cls.max_bytes:
+            return
+        cls._entries[key] = tensor
+        cls._bytes += tensor.nbytes
+        cls._evict()
+
+    @classmethod
+    def _evict(cls):
+        while cls._bytes > cls.max_bytes and cls._entries:
+            _, tensor = cls._entries.popitem(last=False)
+            cls._bytes -= tensor.nbytes
+            cls.evictions += 1
+
+    @classmethod
+    def set_budget(cls, megabytes):
+        with cls._lock:
+            cls.max_bytes = int(megabytes * 1024 * 1024)
+            cls._evict()
+
+    @classmethod
+    def clear(cls):
+        with cls._lock:
+            cls._entries.clear()
+            cls._bytes = 0
+
+    @classmethod
+    def stats(cls):
+        with cls._lock:
+            return {
+                "hits": cls.hits,
+                "misses": cls.misses,
+                "evictions": cls.evictions,
+                "entries": len(cls._entries),
+                "bytes": cls._bytes,
+                "max_bytes": cls.max_bytes,
+            }
+
+
+class ImagePrefetcher:
+    """
+    顺序模式的后台预解码队列（每个加载器节点实例一个，线程池进程内共享）
+    - 在线程池中提前解码接下来的最多depth张图片，节点执行时直接取走已就绪的float张量
+    - 队列占用(已解码的实际大小 + 解码中按上一张估计的大小)不超过memory_mb，至少保留一张
+    - 重置计数器、切换目录或关闭预取时调用flush()丢弃全部结果
+    - MUZI_PREFETCH_WORKERS 设置解码线程数
+    """
+    max_workers = int(os.environ.get("MUZI_PREFETCH_WORKERS", "4"))
+    _executor = None
+    _executor_lock = threading.Lock()
+
+    @classmethod
+    def _pool(cls):
+        with cls._executor_lock:
+            if cls._executor is None:
+                cls._executor = ThreadPoolExecutor(max_workers=cls.max_workers, thread_name_prefix="MuziImagePrefetch")
+            return cls._executor
+
+    def __init__(self, loader=load_image_tensor):
+        self.loader = loader
+        self.max_side = 0
+        self._queue = OrderedDict()  # 路径 -> Future
+        self._estimate = 0  # 最近一张解码结果的字节数
+        self.hits = 0
+        self.misses = 0
+
+    def _decode(self, path, max_side):
+        tensor = self.loader(path, max_side)
+        self._estimate = tensor.nbytes
+        return tensor
+
+    def _queued_bytes(self):
+        total = 0
+        for future in self._queue.values():
+            if future.done() and not future.cancelled() and future.exception() is None:
+                total += future.result().nbytes
+            else:
+                total += self._estimate
+        return total
+
+    def _set_max_side(self, max_side):
+        # 解码尺寸改变后队列中的结果都不再可用
+        if max_side != self.max_side:
+            self.flush()
+            self.max_side = max_side
+            self._estimate = 0
+
+    def take(self, path, max_side=0):
+        """取走path的预解码结果；未预取或解码失败返回None，由调用方同步解码"""
+        self._set_max_side(max_side)
+        future = self._queue.pop(path, None)
+        if future is None:
+            self.misses += 1
+            return None
+        try:
+            tensor = future.result()
+        except Exception:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return tensor
+
+    def schedule(self, paths, depth, memory_mb, max_side=0):
+        """按顺序预取paths中的前depth个，丢弃队列中不再需要的结果"""
+        self._set_max_side(max_side)
+        wanted = list(paths)[:depth]
+        for path in list(self._queue):
+            if path not in wanted:
+                self._queue.pop(path).cancel()
+
+        budget = memory_mb * 1024 * 1024
+        for path in wanted:
+            if path in self._queue:
+                continue
+            # 尚不知道单张大小时只预取一张，之后按估计值控制总量
+            if self._queue and (self._estimate == 0 or self._queued_bytes() + self._estimate > budget):
+                break
+            self._queue[path] = self._pool().submit(self._decode, path, max_side)
+
+    def flush(self):
+        for future in self._queue.values():
+            future.cancel()
+        self._queue.clear()
+
+    def __len__(self):
+        return len(self._queue)
+
+
+def load_images(paths, prefetcher=None, max_side=0):
+    """
+    解码多张图片，返回[1,H,W,3]张量列表
+    已预解码的直接取用，其余经解码缓存获取，未命中的在共享线程池中并行解码
+    """
+    images = [prefetcher.take(path, max_side) if prefetcher is not None else None for path in paths]
+    missing = [i for i, image in enumerate(images) if image is None]
+
+    def cached(path):
+        if not max_side:
+            return DecodedImageCache.get(path)
+        return DecodedImageCache.get(path, partial(load_image_tensor, max_side=max_side), f"max_side={max_side}")
+
+    if len(missing) == 1:
+        images[missing[0]] = cached(paths[missing[0]])
+    elif missing:
+        decoded = ImagePrefetcher._pool().map(cached, [paths[i] for i in missing])
+        for i, image in zip(missing, decoded):
+            images[i] = image
+    return images
+
+
+def _resize(batch, height, width):
+    x = batch.permute(0, 3, 1, 2)
+    x = torch.nn.functional.interpolate(x, size=(height, width), mode="bilinear", align_corners=False, antialias=True)
+    return x.permute(0, 2, 3, 1).clamp(0, 1)
+
+
+def _fit(batch, height, width, resize_mode):
+    """把同尺寸的一组图片[N,h,w,3]变换到目标尺寸"""
+    h, w = batch.shape[1:3]
+    if resize_mode == "resize":
+        return _resize(batch, height, width)
+
+    if resize_mode == "letterbox":
+        scale = min(height / h, width / w)
+        new_h, new_w = min(height, max(1, round(h * scale))), min(width, max(1, round(w * scale)))
+        out = torch.zeros((batch.shape[0], height, width, 3), dtype=batch.dtype)
+        top, left = (height - new_h) // 2, (width - new_w) // 2
+        out[:, top:top + new_h, left:left + new_w] = _resize(batch, new_h, new_w)
+        return out
+
+    scale = max(height / h, width / w)
+    new_h, new_w = max(height, round(h * scale)), max(width, round(w * scale))
+    top, left = (new_h - height) // 2, (new_w - width) // 2
+    return _resize(batch, new_h, new_w)[:, top:top + height, left:left + width]
+
+
+def stack_images(images, resize_mode="letterbox"):
+    """
+    把多张[1,H,W,3]图片合成为[K,H,W,3]批次，目标尺寸取第一张
+    尺寸不同的图片按原尺寸分组，每组只做一次torch插值：
+    - letterbox: 等比缩放到目标尺寸内，四周补黑边
+    - crop: 等比缩放铺满目标尺寸后居中裁剪
+    - resize: 直接拉伸到目标尺寸
+    """
+    if len(images) == 1:
+        return images[0]
+    height, width = images[0].shape[1:3]
+    groups = {}
+    for i, image in enumerate(images):
+        groups.setdefault(tuple(image.shape[1:3]), []).append(i)
+    if len(groups) == 1:
+        return torch.cat(images)
+
+    out = torch.empty((len(images), height, width, 3), dtype=torch.float32)
+    for (h, w), indices in groups.items():
+        batch = torch.cat([images[i] for i in indices])
+        if (h, w) != (height, width):
+            batch = _fit(batch, height, width, resize_mode)
+        out[indices] = batch
+    return out
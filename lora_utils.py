@@ -0,0 +1,252 @@
+"""
+Lora文件工具函数（不依赖ComfyUI，可在命令行环境单独使用）
+- safetensors头部解析与偏移校验（无需反序列化张量）
+- 流式sha256计算
+- 下载清单(sidecar manifest)读写
+- 各下载源历史吞吐量记录
+- safetensors内存映射懒加载
+"""
+import os
+import json
+import struct
+import hashlib
+import threading
+from collections.abc import Mapping
+from urllib.parse import urlparse
+
+# safetensors各数据类型占用字节数
+SAFETENSORS_DTYPE_SIZES = {
+    "BOOL": 1, "U8": 1, "I8": 1, "F8_E4M3": 1, "F8_E5M2": 1,
+    "I16": 2, "U16": 2, "F16": 2, "BF16": 2,
+    "I32": 4, "U32": 4, "F32": 4,
+    "I64": 8, "U64": 8, "F64": 8,
+}
+
+# 头部长度上限，防止损坏文件导致读入超大JSON
+MAX_HEADER_BYTES = 100 * 1024 * 1024
+
+# safetensors数据类型 -> torch数据类型名
+SAFETENSORS_TORCH_DTYPES = {
+    "BOOL": "bool", "U8": "uint8", "I8": "int8",
+    "F8_E4M3": "float8_e4m3fn", "F8_E5M2": "float8_e5m2",
+    "I16": "int16", "F16": "float16", "BF16": "bfloat16",
+    "I32": "int32", "F32": "float32",
+    "I64": "int64", "F64": "float64",
+}
+
+MANIFEST_NAME = "lora_manifest.json"
+MIRROR_STATS_NAME = "mirror_stats.json"
+
+
+def read_safetensors_header(path):
+    """
+    只读取safetensors文件头部
+    返回 (header字典, 数据区起始偏移)
+    """
+    with open(path, 'rb') as f:
+        prefix = f.read(8)
+        if len(prefix) != 8:
+            raise ValueError("文件过短，缺少safetensors头部")
+        header_len = struct.unpack('<Q', prefix)[0]
+        if header_len <= 0 or header_len > MAX_HEADER_BYTES:
+            raise ValueError(f"头部长度异常: {header_len}")
+        raw = f.read(header_len)
+    if len(raw) != header_len:
+        raise ValueError("头部被截断")
+    try:
+        header = json.loads(raw.decode('utf-8'))
+    except Exception as e:
+        raise ValueError(f"头部JSON解析失败: {str(e)}")
+    if not isinstance(header, dict):
+        raise ValueError("头部格式错误")
+    return header, 8 + header_len
+
+
+def validate_safetensors(path):
+    """
+    校验safetensors结构：解析头部，并检查每个张量的偏移与文件大小一致
+    返回张量数量，失败时抛出ValueError
+    """
+    header, data_start = read_safetensors_header(path)
+    data_len = os.path.getsize(path) - data_start
+    max_end = 0
+    count = 0
+    for key, info in header.items():
+        if key == "__metadata__":
+            continue
+        try:
+            dtype = info["dtype"]
+            shape = info["shape"]
+            begin, end = info["data_offsets"]
+        except Exception:
+            raise ValueError(f"张量描述不完整: {key}")
+        if dtype not in SAFETENSORS_DTYPE_SIZES:
+            raise ValueError(f"未知数据类型 {dtype}: {key}")
+        if not (0 <= begin <= end <= data_len):
+            raise ValueError(f"张量偏移越界: {key} [{begin}, {end}] / {data_len}")
+        numel = 1
+        for dim in shape:
+            numel *= dim
+        if end - begin != numel * SAFETENSORS_DTYPE_SIZES[dtype]:
+            raise ValueError(f"张量大小与形状不符: {key}")
+        max_end = max(max_end, end)
+        count += 1
+    if count == 0:
+        raise ValueError("文件中没有张量")
+    if max_end != data_len:
+        raise ValueError(f"数据区长度不符: 期望{max_end}字节，实际{data_len}字节")
+    return count
+
+
+class LazySafetensors(Mapping):
+    """
+    内存映射的safetensors只读字典
+    - 打开时只解析头部，张量在访问时才基于mmap创建，不复制数据
+    - 常驻内存只随实际访问(被模型匹配)的张量增长，页缓存可被同机多进程共享
+    - 以写时复制(copy-on-write)方式映射，修改张量不会写回文件
+    """
+    def __init__(self, path):
+        import numpy as np
+        self.path = path
+        header, self._data_start = read_safetensors_header(path)
+        self.metadata = header.pop("__metadata__", None)
+        self._header = header
+        self._buffer = np.memmap(path, dtype=np.uint8, mode='c')
+
+    def __getitem__(self, key):
+        import torch
+        info = self._header[key]
+        begin, end = info["data_offsets"]
+        raw = self._buffer[self._data_start + begin:self._data_start + end]
+        dtype = getattr(torch, SAFETENSORS_TORCH_DTYPES[info["dtype"]])
+        try:
+            tensor = torch.from_numpy(raw).view(dtype)
+        except RuntimeError:
+            # 偏移未按数据类型对齐时无法零拷贝，退回复制
+            tensor = torch.from_numpy(raw.copy()).view(dtype)
+        return tensor.reshape(info["shape"])
+
+    def __contains__(self, key):
+        return key in self._header
+
+    def __iter__(self):
+        return iter(self._header)
+
+    def __len__(self):
+        return len(self._header)
+
+    def keys(self):
+        return self._header.keys()
+
+
+def sha256_file(path, chunk_size=1024 * 1024):
+    """流式计算文件sha256"""
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+class LoraManifest:
+    """
+    Lora目录下的sidecar清单，记录下载时流式计算的sha256
+    格式: {文件名: {"sha256", "size", "mtime_ns", "url"}}
+    """
+    _lock = threading.Lock()
+
+    def __init__(self, lora_dir):
+        self.path = os.path.join(lora_dir, MANIFEST_NAME)
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"[Lora清单] 读取失败，将重建: {str(e)}")
+            return {}
+
+    def get(self, name):
+        return self.load().get(name)
+
+    def record(self, name, file_path, sha256, url=None):
+        stat = os.stat(file_path)
+        with self._lock:
+            data = self.load()
+            data[name] = {
+                "sha256": sha256,
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+                "url": url,
+            }
+            self._save(data)
+
+    def remove(self, name):
+        with self._lock:
+            data = self.load()
+            if data.pop(name, None) is not None:
+                self._save(data)
+
+    def _save(self, data):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+class MirrorStats:
+    """
+    各下载源(按主机名)的历史吞吐量，指数滑动平均后持久化到磁盘
+    格式: {主机名: {"bytes_per_sec", "samples"}}
+    """
+    _lock = threading.Lock()
+    smoothing = 0.5
+
+    def __init__(self, lora_dir):
+        self.path = os.path.join(lora_dir, MIRROR_STATS_NAME)
+
+    @staticmethod
+    def host_of(url):
+        return urlparse(url).netloc
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception:
+            return {}
+
+    def throughput(self, url):
+        entry = self.load().get(self.host_of(url))
+        return entry["bytes_per_sec"] if entry else None
+
+    def record(self, url, bytes_per_sec):
+        host = self.host_of(url)
+        with self._lock:
+            data = self.load()
+            entry = data.get(host)
+            if entry:
+                bytes_per_sec = (
+                    self.smoothing * bytes_per_sec
+                    + (1 - self.smoothing) * entry["bytes_per_sec"]
+                )
+                samples = entry["samples"] + 1
+            else:
+                samples = 1
+            data[host] = {"bytes_per_sec": bytes_per_sec, "samples": samples}
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+
+    def rank(self, urls):
+        """按历史吞吐量从高到低排序，无记录的源保持原顺序排在后面"""
+        data = self.load()
+        known = [u for u in urls if self.host_of(u) in data]
+        unknown = [u for u in urls if self.host_of(u) not in data]
+        known.sort(key=lambda u: data[self.host_of(u)]["bytes_per_sec"], reverse=True)
+        return known + unknown
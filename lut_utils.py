@@ -0,0 +1,591 @@
+"""
+LUT工具函数
+- 基于torch的批量3D/1D LUT插值（三线性/四面体），整批[N,H,W,3]分块处理，不经过numpy
+- 解析后LUT的进程内LRU缓存 + 持久化二进制旁路文件(.npz)
+- 把gamma和定义域缩放预先合成进LUT(BakedLUT)，应用时每像素只做查表
+- 性能对比：python lut_utils.py benchmark <lut文件>
+- 预合成LUT导出为.cube，供ffmpeg的lut1d/lut3d滤镜直接读取
+- 多个LUT串联时采样合成为一张表(并缓存到磁盘)，应用成本与串联数量无关
+- 参考图统计色彩迁移烘焙为3D LUT
+- 峰值内存：python lut_utils.py memory <lut文件> --sizes 10 50 100
+"""
+import os
+import sys
+import time
+import hashlib
+import argparse
+import threading
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+import torch
+
+# 每块处理的像素数，控制插值时的临时内存（约 像素数 x 8角点 x 3通道 x 4字节）
+DEFAULT_CHUNK_PIXELS = 1 << 20
+
+DEFAULT_DOMAIN = np.array([[0., 0., 0.], [1., 1., 1.]])
+
+# 解析后的LUT：3D表形状[S,S,S,3]，1D表形状[S,3]，domain形状[2,3]
+ParsedLUT = namedtuple("ParsedLUT", ["table", "domain"])
+
+# 预合成的LUT(定义域均为[0,1])：
+# shaper: [K,3]的1D表，把输入映射为3D表坐标(已含定义域缩放和预gamma)，None表示恒等
+# table: 3D表[S,S,S,3](已含后gamma和反缩放)，或逐通道1D表[K,3](整条流程直接采样)
+BakedLUT = namedtuple("BakedLUT", ["shaper", "table"])
+
+# shaper/1D表的采样点数
+BAKE_1D_SIZE = 4096
+
+# 多个LUT合成时可选的3D表边长
+CHAIN_SIZES = (33, 65)
+
+
+def lut_to_tensors(lut, device="cpu"):
+    """
+    把colour的LUT3D/LUT3x1D对象转换为torch张量
+    返回 (table, domain)：3D表形状[S,S,S,3]（按r,g,b索引），1D表形状[S,3]，domain形状[2,3]
+    """
+    table = torch.tensor(np.asarray(lut.table), dtype=torch.float32, device=device)
+    domain = torch.tensor(np.asarray(lut.domain)[:2], dtype=torch.float32, device=device)
+    return table, domain
+
+
+def clip_lut_table(table, domain):
+    """把表中的值裁剪到定义域内，返回新数组"""
+    if domain[0].max() == domain[0].min() and domain[1].max() == domain[1].min():
+        return np.clip(table, domain[0, 0], domain[1, 0])
+    return np.clip(table, domain[0], domain[1])
+
+
+def to_colour_lut(parsed, name=None):
+    """由ParsedLUT构造colour的LUT对象（用于colour引擎）"""
+    from colour.io.luts import LUT3D, LUT3x1D
+    lut_class = LUT3x1D if parsed.table.ndim == 2 else LUT3D
+    return lut_class(np.array(parsed.table), name=name, domain=np.array(parsed.domain))
+
+
+def write_cube(path, table, title=None):
+    """
+    把定义域为[0,1]的表写成Iridas .cube文本
+    3D表[S,S,S,3]按r变化最快的顺序写出(LUT_3D_SIZE)，1D表[K,3]写成LUT_1D_SIZE
+    先写临时文件再替换，避免并发读到半个文件
+    """
+    table = np.asarray(table, dtype=np.float32)
+    header = [f'TITLE "{title}"'] if title else []
+    if table.ndim == 4:
+        header.append(f"LUT_3D_SIZE {table.shape[0]}")
+        rows = table.transpose(2, 1, 0, 3).reshape(-1, 3)
+    else:
+        header.append(f"LUT_1D_SIZE {table.shape[0]}")
+        rows = table
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write("\n".join(header) + "\n")
+        np.savetxt(f, rows, fmt="%.7f")
+    os.replace(tmp_path, path)
+
+
+class LUTCache:
+    """
+    解析后的LUT缓存
+    - 进程内LRU，键为(真实路径, 修改时间, 文件大小, 是否裁剪)
+    - 首次解析后写入同目录.cache/<文件名>.npz，保存原始表和定义域
+      重启后的进程直接读取二进制文件，不再解析.cube文本
+    """
+    max_entries = 32
+    hits = 0
+    misses = 0
+    _entries = OrderedDict()
+    _lock = threading.Lock()
+
+    @staticmethod
+    def sidecar_path(path):
+        return os.path.join(os.path.dirname(path), ".cache", os.path.basename(path) + ".npz")
+
+    @classmethod
+    def get(cls, path, clip_values=True):
+        stat = os.stat(path)
+        key = (os.path.realpath(path), stat.st_mtime_ns, stat.st_size, bool(clip_values))
+        with cls._lock:
+            parsed = cls._entries.get(key)
+            if parsed is not None:
+                cls._entries.move_to_end(key)
+                cls.hits += 1
+                return parsed
+            cls.misses += 1
+
+        table, domain = cls._load_raw(path, stat)
+        if clip_values:
+            table = clip_lut_table(table, domain)
+        table = np.ascontiguousarray(table, dtype=np.float32)
+        table.setflags(write=False)
+        domain.setflags(write=False)
+        parsed = ParsedLUT(table, domain)
+
+        with cls._lock:
+            cls._entries[key] = parsed
+            while len(cls._entries) > cls.max_entries:
+                cls._entries.popitem(last=False)
+        return parsed
+
+    @classmethod
+    def get_baked(cls, path, clip_values=True, gamma_correction=True):
+        """按(LUT, 是否gamma, 是否裁剪)缓存预合成的LUT"""
+        stat = os.stat(path)
+        key = ("baked", os.path.realpath(path), stat.st_mtime_ns, stat.st_size,
+               bool(clip_values), bool(gamma_correction))
+        with cls._lock:
+            baked = cls._entries.get(key)
+            if baked is not None:
+                cls._entries.move_to_end(key)
+                cls.hits += 1
+                return baked
+
+        baked = bake_lut(cls.get(path, clip_values), gamma_correction)
+        with cls._lock:
+            cls._entries[key] = baked
+            while len(cls._entries) > cls.max_entries:
+                cls._entries.popitem(last=False)
+        return baked
+
+    @classmethod
+    def get_chain(cls, stages, clip_values=True, gamma_correction=True, size=33, interpolation="trilinear"):
+        """
+        按顺序串联的多个LUT合成为一张BakedLUT
+        stages: [(LUT路径, 强度), ...]
+        进程内LRU + 同目录.cache/chain_<哈希>.npz，键包含每个LUT的路径/修改时间/大小和强度
+        """
+        parts = []
+        for path, strength in stages:
+            stat = os.stat(path)
+            parts.append(f"{os.path.realpath(path)}|{stat.st_mtime_ns}|{stat.st_size}|{float(strength):.4f}")
+        parts.append(f"{bool(clip_values)}|{bool(gamma_correction)}|{int(size)}|{interpolation}")
+        digest = hashlib.sha1("\n".join(parts).encode("utf-8")).hexdigest()[:16]
+        key = ("chain", digest)
+        with cls._lock:
+            chain = cls._entries.get(key)
+            if chain is not None:
+                cls._entries.move_to_end(key)
+                cls.hits += 1
+                return chain
+
+        sidecar = os.path.join(os.path.dirname(stages[0][0]), ".cache", f"chain_{digest}.npz")
+        chain = None
+        if os.path.exists(sidecar):
+            try:
+                with np.load(sidecar) as data:
+                    shaper = torch.from_numpy(data["shaper"]) if data["shaper"].size else None
+                    chain = BakedLUT(shaper, torch.from_numpy(data["table"]))
+            except Exception as e:
+                print(f"[LUT缓存] 合成缓存无效，重新合成: {str(e)}")
+
+        if chain is None:
+            baked = [(cls.get_baked(path, clip_values, gamma_correction), strength) for path, strength in stages]
+            chain = compose_luts(baked, size, gamma_correction, interpolation)
+            try:
+                os.makedirs(os.path.dirname(sidecar), exist_ok=True)
+                tmp_path = sidecar + ".tmp.npz"
+                np.savez(
+                    tmp_path,
+                    shaper=chain.shaper.numpy() if chain.shaper is not None else np.empty(0, np.float32),
+                    table=chain.table.numpy(),
+                )
+                os.replace(tmp_path, sidecar)
+            except Exception as e:
+                print(f"[LUT缓存] 写入合成缓存失败: {str(e)}")
+
+        with cls._lock:
+            cls._entries[key] = chain
+            while len(cls._entries) > cls.max_entries:
+                cls._entries.popitem(last=False)
+        return chain
+
+    @classmethod
+    def get_baked_cubes(cls, path, clip_values=True, gamma_correction=True):
+        """
+        把预合成的LUT导出为.cube文件，供ffmpeg等外部程序使用
+        返回 (shaper路径或None, 表路径, 表是否为3D)
+        文件名取键的哈希，只含ASCII字符，可直接写进ffmpeg滤镜参数；shaper先于表写出，表文件存在即导出完整
+        """
+        stat = os.stat(path)
+        key = f"{os.path.realpath(path)}|{stat.st_mtime_ns}|{stat.st_size}|{bool(clip_values)}|{bool(gamma_correction)}"
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+        cache_dir = os.path.join(os.path.dirname(path), ".cache")
+        shaper_path = os.path.join(cache_dir, f"{digest}.shaper.cube")
+        table_paths = {True: os.path.join(cache_dir, f"{digest}.lut3d.cube"),
+                       False: os.path.join(cache_dir, f"{digest}.lut1d.cube")}
+
+        for is_3d, table_path in table_paths.items():
+            if os.path.exists(table_path):
+                return (shaper_path if os.path.exists(shaper_path) else None), table_path, is_3d
+
+        baked = cls.get_baked(path, clip_values, gamma_correction)
+        os.makedirs(cache_dir, exist_ok=True)
+        title = os.path.splitext(os.path.basename(path))[0]
+        if baked.shaper is not None:
+            write_cube(shaper_path, baked.shaper.cpu().numpy(), title + " shaper")
+        is_3d = baked.table.dim() == 4
+        write_cube(table_paths[is_3d], baked.table.cpu().numpy(), title)
+        return (shaper_path if baked.shaper is not None else None), table_paths[is_3d], is_3d
+
+    @classmethod
+    def _load_raw(cls, path, stat):
+        sidecar = cls.sidecar_path(path)
+        if os.path.exists(sidecar):
+            try:
+                with np.load(sidecar) as data:
+                    if (int(data["source_mtime_ns"]) == stat.st_mtime_ns
+                            and int(data["source_size"]) == stat.st_size):
+                        return data["table"], data["domain"]
+            except Exception as e:
+                print(f"[LUT缓存] 旁路文件无效，重新解析: {str(e)}")
+
+        from colour.io.luts.iridas_cube import read_LUT_IridasCube
+        lut = read_LUT_IridasCube(path)
+        table = np.asarray(lut.table, dtype=np.float32)
+        domain = np.asarray(lut.domain, dtype=np.float64)[:2]
+
+        try:
+            os.makedirs(os.path.dirname(sidecar), exist_ok=True)
+            tmp_path = sidecar + ".tmp.npz"
+            np.savez(
+                tmp_path,
+                table=table,
+                domain=domain,
+                source_mtime_ns=np.int64(stat.st_mtime_ns),
+                source_size=np.int64(stat.st_size),
+            )
+            os.replace(tmp_path, sidecar)
+        except Exception as e:
+            print(f"[LUT缓存] 写入旁路文件失败: {str(e)}")
+        return table, domain
+
+
+def _normalize(pixels, domain):
+    return (pixels - domain[0]) / (domain[1] - domain[0])
+
+
+def _interp_trilinear(coords, table_flat, size):
+    """coords: [P,3] 已缩放到[0, size-1]的坐标"""
+    base = coords.floor().clamp_(0, size - 2)
+    frac = coords - base
+    base = base.long()
+    stride_r, stride_g = size * size, size
+    index = base[:, 0] * stride_r + base[:, 1] * stride_g + base[:, 2]
+
+    fr, fg, fb = frac[:, 0:1], frac[:, 1:2], frac[:, 2:3]
+    out = None
+    for dr in (0, 1):
+        wr = fr if dr else 1 - fr
+        for dg in (0, 1):
+            wg = fg if dg else 1 - fg
+            for db in (0, 1):
+                wb = fb if db else 1 - fb
+                corner = table_flat[index + dr * stride_r + dg * stride_g + db]
+                term = corner * (wr * wg * wb)
+                out = term if out is None else out.add_(term)
+    return out
+
+
+def _interp_tetrahedral(coords, table_flat, size):
+    """四面体插值：按小数部分排序，只取立方体对角线上的4个顶点"""
+    base = coords.floor().clamp_(0, size - 2)
+    frac = coords - base
+    base = base.long()
+    strides = torch.tensor([size * size, size, 1], device=coords.device)
+    index = (base * strides).sum(dim=1)
+
+    frac_sorted, order = frac.sort(dim=1, descending=True)
+    step = strides[order]  # 按小数部分从大到小对应的轴步长
+    v0 = table_flat[index]
+    v1 = table_flat[index + step[:, 0]]
+    v2 = table_flat[index + step[:, 0] + step[:, 1]]
+    v3 = table_flat[index + strides.sum()]
+
+    f_max, f_mid, f_min = frac_sorted[:, 0:1], frac_sorted[:, 1:2], frac_sorted[:, 2:3]
+    return v0 * (1 - f_max) + v1 * (f_max - f_mid) + v2 * (f_mid - f_min) + v3 * f_min
+
+
+def _interp_1d(pixels, table, domain):
+    """逐通道线性插值，超出定义域时线性外推（与colour的LUT3x1D一致）"""
+    size = table.shape[0]
+    coords = _normalize(pixels, domain) * (size - 1)
+    base = coords.floor().clamp_(0, size - 2)
+    frac = coords - base
+    base = base.long()
+    low = torch.gather(table, 0, base)
+    high = torch.gather(table, 0, base + 1)
+    return low + (high - low) * frac
+
+
+def apply_lut(images, table, domain, interpolation="trilinear", chunk_pixels=DEFAULT_CHUNK_PIXELS,
+              shaper=None, strength=1.0, out=None):
+    """
+    对任意形状[..., 3]的图像应用LUT，结果与colour的LUT.apply一致
+    - 3D表：输入先按domain归一化并裁剪到[0,1]，(可选)经shaper映射，再做三线性或四面体插值
+    - 1D表：逐通道线性插值
+    - strength<1时在每块内与输入混合
+    按chunk_pixels分块处理并逐块写入out(未提供时预分配)，峰值内存 ≈ 输入 + 输出 + 单块临时内存
+    """
+    shape = images.shape
+    pixels = images.reshape(-1, 3)
+    table = table.to(device=pixels.device, dtype=torch.float32)
+    domain = domain.to(device=pixels.device, dtype=torch.float32)
+    if out is None:
+        out = torch.empty(shape, dtype=torch.float32, device=pixels.device)
+    out_pixels = out.view(-1, 3)
+
+    if table.dim() == 2:
+        def lookup(chunk):
+            return _interp_1d(chunk, table, domain)
+    else:
+        size = table.shape[0]
+        table_flat = table.reshape(-1, 3)
+        interp = _interp_tetrahedral if interpolation == "tetrahedral" else _interp_trilinear
+        if shaper is not None:
+            shaper = shaper.to(device=pixels.device, dtype=torch.float32)
+            unit_domain = torch.tensor(DEFAULT_DOMAIN, dtype=torch.float32, device=pixels.device)
+
+        def lookup(chunk):
+            coords = _normalize(chunk, domain).clamp_(0, 1)
+            if shaper is not None:
+                coords = _interp_1d(coords, shaper, unit_domain).clamp_(0, 1)
+            return interp(coords * (size - 1), table_flat, size)
+
+    for start in range(0, pixels.shape[0], chunk_pixels):
+        chunk = pixels[start:start + chunk_pixels].float()
+        result = lookup(chunk)
+        if strength < 1.0:
+            result = result.mul_(strength).add_(chunk, alpha=1 - strength)
+        out_pixels[start:start + chunk_pixels] = result
+    return out
+
+
+def grade_reference(images, table, domain, gamma_correction, interpolation="trilinear"):
+    """
+    未预合成的完整流程：定义域缩放 -> 预gamma -> LUT -> 后gamma -> 反缩放
+    与ESSImageApplyLUT原先逐帧colour路径的计算顺序一致
+    """
+    is_non_default_domain = not torch.equal(domain.cpu(), torch.tensor(DEFAULT_DOMAIN, dtype=domain.dtype))
+    x = images.float()
+    if is_non_default_domain:
+        dom_scale = domain[1] - domain[0]
+        x = x * dom_scale + domain[0]
+    if gamma_correction:
+        x = x ** (1/2.2)
+    x = apply_lut(x, table, domain, interpolation)
+    if gamma_correction:
+        x = x ** (2.2)
+    if is_non_default_domain:
+        x = (x - domain[0]) / dom_scale
+    return x
+
+
+def bake_lut(parsed, gamma_correction):
+    """
+    把gamma和定义域缩放合成进LUT，返回BakedLUT
+    - 1D LUT：整条流程逐通道独立，直接在[0,1]上采样为一张1D表
+    - 3D LUT：后gamma和反缩放逐顶点作用在表值上；定义域缩放和预gamma折叠为1D shaper
+      (暗部x^(1/2.2)斜率极大，直接重采样成单张3D表在阴影处误差可达0.2，因此保留1D shaper)
+    """
+    table, domain = lut_to_tensors(parsed)
+    is_non_default_domain = not np.array_equal(parsed.domain, DEFAULT_DOMAIN)
+    samples = torch.linspace(0, 1, BAKE_1D_SIZE)[:, None].expand(-1, 3)
+
+    if table.dim() == 2:
+        return BakedLUT(None, grade_reference(samples, table, domain, gamma_correction))
+
+    dom_scale = domain[1] - domain[0]
+    shaper = None
+    if gamma_correction:
+        # 定义域缩放后紧接着LUT自身的归一化，只有中间夹着gamma时才需要shaper
+        encoded = (samples * dom_scale + domain[0]) ** (1/2.2)
+        shaper = _normalize(encoded, domain).clamp(0, 1)
+
+    values = table
+    if gamma_correction:
+        values = values ** (2.2)
+    if is_non_default_domain:
+        values = (values - domain[0]) / dom_scale
+    return BakedLUT(shaper, values.contiguous())
+
+
+def apply_baked_lut(images, baked, interpolation="trilinear", chunk_pixels=DEFAULT_CHUNK_PIXELS,
+                    strength=1.0, out=None):
+    """应用预合成的LUT：每像素一次(shaper+)查表，没有逐像素的幂运算"""
+    unit_domain = torch.tensor(DEFAULT_DOMAIN, dtype=torch.float32)
+    return apply_lut(images, baked.table, unit_domain, interpolation, chunk_pixels,
+                     shaper=baked.shaper, strength=strength, out=out)
+
+
+def compose_luts(stages, size=33, gamma_correction=True, interpolation="trilinear"):
+    """
+    把按顺序串联的多个预合成LUT采样成一张3D表，返回BakedLUT
+    stages: [(BakedLUT, 强度), ...]，每一级 x = 强度*LUT(x) + (1-强度)*x
+    开启gamma时网格取在x^(1/2.2)空间(shaper为对应幂曲线)，暗部采样更密，与单个LUT预合成时保留shaper的原因相同
+    """
+    axis = torch.linspace(0, 1, size)
+    grid = torch.stack(torch.meshgrid(axis, axis, axis, indexing="ij"), dim=-1)
+    shaper = None
+    if gamma_correction:
+        shaper = (torch.linspace(0, 1, BAKE_1D_SIZE)[:, None].expand(-1, 3) ** (1/2.2)).contiguous()
+        grid = grid ** 2.2
+
+    values = grid
+    for baked, strength in stages:
+        values = apply_baked_lut(values, baked, interpolation, strength=min(float(strength), 1.0))
+    return BakedLUT(shaper, values.contiguous())
+
+
+def color_transfer_lut(reference, source, size=33, max_samples=1 << 20):
+    """
+    统计色彩迁移(Reinhard：Lab空间逐通道匹配均值和标准差)烘焙为3D LUT
+    reference/source: [N,H,W,3]的0~1图像张量，统计量最多取max_samples个像素
+    返回[size,size,size,3]的numpy表，定义域[0,1]，输入输出均为sRGB编码值(应用时无需gamma校正)
+    """
+    import cv2
+
+    def lab_stats(images):
+        pixels = images.reshape(-1, 3)
+        step = max(1, pixels.shape[0] // max_samples)
+        pixels = pixels[::step].float().clamp(0, 1).cpu().numpy()
+        lab = cv2.cvtColor(np.ascontiguousarray(pixels[:, None, :]), cv2.COLOR_RGB2Lab).reshape(-1, 3)
+        return lab.mean(axis=0), lab.std(axis=0)
+
+    src_mean, src_std = lab_stats(source)
+    ref_mean, ref_std = lab_stats(reference)
+    scale = ref_std / np.maximum(src_std, 1e-6)
+
+    axis = np.linspace(0, 1, size, dtype=np.float32)
+    grid = np.stack(np.meshgrid(axis, axis, axis, indexing="ij"), axis=-1).reshape(-1, 1, 3)
+    lab = (cv2.cvtColor(grid, cv2.COLOR_RGB2Lab) - src_mean) * scale + ref_mean
+    lab[..., 0] = np.clip(lab[..., 0], 0, 100)
+    rgb = cv2.cvtColor(lab.astype(np.float32), cv2.COLOR_Lab2RGB)
+    return np.clip(rgb, 0, 1).reshape(size, size, size, 3)
+
+
+# 插值时每像素的临时内存估计(字节)：坐标/索引/小数部分/角点/累加结果等
+WORKSPACE_BYTES_PER_PIXEL = 256
+
+
+def chunk_pixels_for_limit(memory_limit_mb):
+    """由临时内存上限(MB)计算每块像素数"""
+    return max(1 << 16, int(memory_limit_mb * 1024 * 1024) // WORKSPACE_BYTES_PER_PIXEL)
+
+
+# ======== 性能对比 ========
+def benchmark(lut_path, frames=30, height=540, width=960, repeat=3):
+    """对比colour逐帧路径与torch批量路径的精度和每秒帧数"""
+    from colour.io.luts.iridas_cube import read_LUT_IridasCube
+
+    lut = read_LUT_IridasCube(lut_path)
+    table, domain = lut_to_tensors(lut)
+    images = torch.rand(frames, height, width, 3)
+
+    def run_colour():
+        return torch.stack([torch.from_numpy(lut.apply(img.numpy())).float() for img in images])
+
+    def run_torch(interpolation):
+        return apply_lut(images, table, domain, interpolation)
+
+    baked = bake_lut(ParsedLUT(lut.table, lut.domain), gamma_correction=False)
+
+    results = {}
+    reference = None
+    for name, fn in [
+        ("colour", run_colour),
+        ("torch-trilinear", lambda: run_torch("trilinear")),
+        ("torch-tetrahedral", lambda: run_torch("tetrahedral")),
+        ("torch-baked", lambda: apply_baked_lut(images, baked)),
+    ]:
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            out = fn()
+            best = min(best, time.perf_counter() - start)
+        if reference is None:
+            reference = out
+        error = (out - reference).abs().max().item()
+        results[name] = (frames / best, error)
+        print(f"{name:>18}: {frames / best:8.2f} fps  最大误差(相对colour) {error:.2e}")
+    return results
+
+
+def _peak_rss_mb():
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux下单位为KB，macOS下为字节
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+def memory_probe(lut_path, frames, height, width, mode, memory_limit_mb):
+    """在独立进程中运行一次调色，返回(输入占用MB, 峰值RSS增量MB)"""
+    parsed = LUTCache.get(lut_path)
+    baked = bake_lut(parsed, gamma_correction=True)
+    images = torch.rand(frames, height, width, 3)
+    baseline = _peak_rss_mb()
+
+    if mode == "stacked":
+        # 旧流程：逐帧计算后torch.stack
+        out = torch.stack([apply_baked_lut(img, baked) for img in images])
+    else:
+        out = apply_baked_lut(images, baked, chunk_pixels=chunk_pixels_for_limit(memory_limit_mb))
+    del out
+    return images.numel() * 4 / 1024**2, _peak_rss_mb() - baseline
+
+
+def memory_benchmark(lut_path, batch_sizes, height, width, memory_limit_mb):
+    """对不同批大小分别起子进程，报告峰值RSS"""
+    import subprocess
+    print(f"{'批大小':>6} {'输入MB':>10} {'stacked峰值增量MB':>18} {'streaming峰值增量MB':>20}")
+    for frames in batch_sizes:
+        row = []
+        for mode in ("stacked", "streaming"):
+            result = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "memprobe", lut_path,
+                 "--frames", str(frames), "--height", str(height), "--width", str(width),
+                 "--mode", mode, "--memory-limit-mb", str(memory_limit_mb)],
+                capture_output=True, text=True, check=True,
+            )
+            row.append([float(v) for v in result.stdout.strip().splitlines()[-1].split()])
+        print(f"{frames:>6} {row[0][0]:>10.1f} {row[0][1]:>18.1f} {row[1][1]:>20.1f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="LUT工具")
+    sub = parser.add_subparsers(dest="command", required=True)
+    bench = sub.add_parser("benchmark", help="对比colour与torch LUT路径")
+    bench.add_argument("lut_path")
+    bench.add_argument("--frames", type=int, default=30)
+    bench.add_argument("--height", type=int, default=540)
+    bench.add_argument("--width", type=int, default=960)
+    mem = sub.add_parser("memory", help="报告不同批大小下的峰值RSS")
+    mem.add_argument("lut_path")
+    mem.add_argument("--sizes", type=int, nargs="+", default=[10, 50, 100])
+    mem.add_argument("--height", type=int, default=1080)
+    mem.add_argument("--width", type=int, default=1920)
+    mem.add_argument("--memory-limit-mb", type=int, default=256)
+    probe = sub.add_parser("memprobe")
+    probe.add_argument("lut_path")
+    probe.add_argument("--frames", type=int)
+    probe.add_argument("--height", type=int)
+    probe.add_argument("--width", type=int)
+    probe.add_argument("--mode", choices=["stacked", "streaming"])
+    probe.add_argument("--memory-limit-mb", type=int)
+    args = parser.parse_args(argv)
+
+    if args.command == "benchmark":
+        print(f"torch线程数: {torch.get_num_threads()}")
+        benchmark(args.lut_path, args.frames, args.height, args.width)
+    elif args.command == "memory":
+        memory_benchmark(args.lut_path, args.sizes, args.height, args.width, args.memory_limit_mb)
+    elif args.command == "memprobe":
+        input_mb, peak_mb = memory_probe(
+            args.lut_path, args.frames, args.height, args.width, args.mode, args.memory_limit_mb
+        )
+        print(f"{input_mb} {peak_mb}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,441 @@
+"""
+媒体目录（不依赖ComfyUI）
+- 图片/视频加载节点共享的SQLite目录，持久化在插件.cache/media_catalog.sqlite3
+- 后台线程只读取文件头填充：图片尺寸来自图片头部(不解码像素)，视频时长、帧率、分辨率来自容器元数据
+  (归档内的图片只读取成员开头的一段，压缩tar在一次流式解压中探测全部成员)
+  (mp4/mov直接解析moov盒子，其他格式用OpenCV读取容器属性，均不解码帧)
+- 加载节点按方向(横屏/竖屏)、时长等条件筛选，选择时不解码任何文件
+
+命令行用法（预先填充目录并查看筛选结果）:
+    python media_catalog.py /path/to/dir --video --orientation portrait --max-duration 15
+"""
+import io
+import os
+import sys
+import time
+import queue
+import struct
+import sqlite3
+import argparse
+import bisect
+import threading
+
+from PIL import Image
+
+try:
+    from .image_utils import IMAGE_EXTENSIONS, ArchiveIndex, DirectoryIndex, get_image_index
+    from .video_utils import VIDEO_EXTENSIONS, iter_mp4_boxes, read_mp4_moov
+except ImportError:  # 作为脚本直接运行
+    from image_utils import IMAGE_EXTENSIONS, ArchiveIndex, DirectoryIndex, get_image_index
+    from video_utils import VIDEO_EXTENSIONS, iter_mp4_boxes, read_mp4_moov
+
+PLUGIN_DIR = os.path.dirname(os.path.realpath(__file__))
+
+ORIENTATIONS = ("any", "landscape", "portrait", "square")
+
+# 归档内图片探测时读取的成员开头字节数(JPEG的EXIF/ICC等段位于尺寸信息之前)
+PROBE_HEADER_BYTES = 256 * 1024
+
+
+# ======== 文件头探测 ========
+def _image_size(source):
+    with Image.open(source) as image:
+        return image.size
+
+
+def probe_image(path, head=None):
+    """
+    只读取图片头部获取尺寸，不解码像素
+    归档内的图片只读取成员开头PROBE_HEADER_BYTES字节(head为已读出的开头)，头部超出该范围时才读取整个成员
+    """
+    archive = ArchiveIndex.owner_of(path)
+    if archive is None:
+        width, height = _image_size(path)
+    else:
+        if head is None:
+            head = archive.read(path, PROBE_HEADER_BYTES)
+        try:
+            width, height = _image_size(io.BytesIO(head))
+        except Exception:
+            if len(head) < PROBE_HEADER_BYTES:
+                raise
+            width, height = _image_size(io.BytesIO(archive.read(path)))
+    return {"width": width, "height": height}
+
+
+def _parse_trak(data, start, end):
+    """解析单个trak，视频轨返回分辨率/时长/帧率，其他轨返回None"""
+    width = height = 0
+    handler = None
+    timescale = duration = 0
+    samples = 0
+    pending = [(start, end)]
+    while pending:
+        box_start, box_end = pending.pop()
+        for kind, s, e in iter_mp4_boxes(data, box_start, box_end):
+            if kind in (b"mdia", b"minf", b"stbl"):
+                pending.append((s, e))
+            elif kind == b"tkhd" and e - s >= 84:
+                # 末尾依次为3x3变换矩阵(36字节)和16.16定点的宽高
+                a, b = struct.unpack_from(">ii", data, e - 44)
+                width, height = struct.unpack_from(">II", data, e - 8)
+                width >>= 16
+                height >>= 16
+                if a == 0 and abs(b) == 0x10000:
+                    # 旋转90/270度(手机竖拍)，按显示方向交换宽高
+                    width, height = height, width
+            elif kind == b"hdlr" and e - s >= 12:
+                handler = data[s + 8:s + 12]
+            elif kind == b"mdhd" and e - s >= 20:
+                if data[s] == 1:
+                    timescale, duration = struct.unpack_from(">IQ", data, s + 20)
+                else:
+                    timescale, duration = struct.unpack_from(">II", data, s + 12)
+            elif kind == b"stsz" and e - s >= 12:
+                samples = struct.unpack_from(">I", data, s + 8)[0]
+    if handler != b"vide" or not width or not height:
+        return None
+    track = {"width": width, "height": height}
+    if timescale and duration:
+        track["duration"] = duration / timescale
+        if samples:
+            track["frame_count"] = samples
+            track["fps"] = samples * timescale / duration
+    return track
+
+
+def _probe_mp4(path):
+    moov = read_mp4_moov(path)
+    if not moov:
+        return None
+    info = {}
+    movie_duration = None
+    for kind, s, e in iter_mp4_boxes(moov, 0, len(moov)):
+        if kind == b"mvhd" and e - s >= 20:
+            if moov[s] == 1:
+                timescale, duration = struct.unpack_from(">IQ", moov, s + 20)
+            else:
+                timescale, duration = struct.unpack_from(">II", moov, s + 12)
+            if timescale:
+                movie_duration = duration / timescale
+        elif kind == b"trak" and "width" not in info:
+            info.update(_parse_trak(moov, s, e) or {})
+    if "width" not in info:
+        return None
+    if movie_duration:
+        info["duration"] = movie_duration
+    return info
+
+
+def _probe_cv2(path):
+    """用OpenCV读取容器属性（只打开文件，不读取帧）"""
+    import cv2
+    cap = cv2.VideoCapture(path)
+    try:
+        if not cap.isOpened():
+            raise ValueError(f"无法打开视频: {path}")
+        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    finally:
+        cap.release()
+    info = {"width": width, "height": height}
+    if fps > 0:
+        info["fps"] = fps
+        if frame_count > 0:
+            info["frame_count"] = frame_count
+            info["duration"] = frame_count / fps
+    return info
+
+
+def probe_video(path):
+    """读取视频的分辨率、时长、帧率；mp4/mov解析容器头部，其他格式或碎片化mp4退回OpenCV"""
+    info = _probe_mp4(path)
+    if info is None or "fps" not in info:
+        info = _probe_cv2(path)
+    return info
+
+
+# ======== 筛选结果视图 ========
+class CatalogView:
+    """
+    筛选后的路径列表，接口与DirectoryIndex的files/next_after/following相同，
+    加载节点的顺序/随机/预取逻辑无需区分是否筛选
+    """
+    def __init__(self, paths):
+        self._paths = paths  # 已按文件名排序(同一目录下完整路径的顺序与文件名一致)
+
+    def files(self):
+        return list(self._paths)
+
+    def __len__(self):
+        return len(self._paths)
+
+    def following(self, path, count):
+        total = len(self._paths)
+        if total <= 1 or count <= 0:
+            return []
+        start = bisect.bisect_right(self._paths, path)
+        return [self._paths[(start + i) % total] for i in range(min(count, total - 1))]
+
+    def next_after(self, last_path=None):
+        if not self._paths:
+            return None, None
+        position = 0
+        if last_path:
+            position = bisect.bisect_right(self._paths, last_path)
+            if position >= len(self._paths):
+                position = 0
+        return position, self._paths[position]
+
+
+# ======== 目录 ========
+class MediaCatalog:
+    """
+    持久化的媒体元数据目录（进程级单例，全部为类方法）
+    - 以完整路径为键，记录文件修改时间和大小，文件变化后重新探测
+    - 目录索引变化时在后台线程中同步：探测新增/修改的文件，删除已不存在的记录
+    """
+    db_path = os.path.join(PLUGIN_DIR, ".cache", "media_catalog.sqlite3")
+    _conn = None
+    _db_lock = threading.Lock()
+    _queue = queue.Queue()
+    _worker_thread = None
+    _synced = {}  # (目录, 类型) -> 已同步的索引版本
+    _lock = threading.Lock()
+    write_batch = 256
+
+    @classmethod
+    def _connection(cls):
+        if cls._conn is None:
+            try:
+                os.makedirs(os.path.dirname(cls.db_path), exist_ok=True)
+                conn = sqlite3.connect(cls.db_path, timeout=30, check_same_thread=False)
+                conn.execute("PRAGMA journal_mode=WAL")
+            except sqlite3.Error as e:
+                print(f"[媒体目录] 无法打开数据库，改为仅在内存中记录: {str(e)}")
+                conn = sqlite3.connect(":memory:", check_same_thread=False)
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS media ("
+                "path TEXT PRIMARY KEY, directory TEXT NOT NULL, kind TEXT NOT NULL, "
+                "mtime_ns INTEGER, size INTEGER, width INTEGER, height INTEGER, "
+                "duration REAL, fps REAL, frame_count INTEGER, error TEXT)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS media_directory ON media(directory)")
+            conn.commit()
+            cls._conn = conn
+        return cls._conn
+
+    @classmethod
+    def _execute(cls, sql, params=()):
+        with cls._db_lock:
+            return cls._connection().execute(sql, params).fetchall()
+
+    @classmethod
+    def _write(cls, rows):
+        if not rows:
+            return
+        with cls._db_lock:
+            conn = cls._connection()
+            conn.executemany("INSERT OR REPLACE INTO media VALUES (?,?,?,?,?,?,?,?,?,?,?)", rows)
+            conn.commit()
+
+    @staticmethod
+    def _stat_of(index, path):
+        # 归档内的文件以归档本身的修改时间和大小为准
+        if isinstance(index, ArchiveIndex):
+            return index.stat()
+        return os.stat(path)
+
+    @staticmethod
+    def _probe_row(index, path, kind, stat, head=None):
+        info = {}
+        error = None
+        try:
+            info = probe_image(path, head) if kind == "image" else probe_video(path)
+        except Exception as e:
+            error = str(e)
+        return (
+            path, index.directory, kind, stat.st_mtime_ns, stat.st_size,
+            info.get("width"), info.get("height"), info.get("duration"),
+            info.get("fps"), info.get("frame_count"), error,
+        )
+
+    @classmethod
+    def _probe_rows(cls, index, kind, pending):
+        """探测[(路径, stat)]；归档内的图片批量读取成员开头，压缩tar只解压一遍"""
+        if kind == "image" and isinstance(index, ArchiveIndex):
+            stats = dict(pending)
+            for path, head in index.iter_heads(list(stats), PROBE_HEADER_BYTES):
+                yield cls._probe_row(index, path, kind, stats[path], head)
+            return
+        for path, stat in pending:
+            yield cls._probe_row(index, path, kind, stat)
+
+    @classmethod
+    def _sync_directory(cls, index, kind):
+        """探测目录中新增/修改的文件，删除已不存在的记录"""
+        paths = index.files()
+        known = {
+            path: (mtime_ns, size)
+            for path, mtime_ns, size in cls._execute(
+                "SELECT path, mtime_ns, size FROM media WHERE directory=?", (index.directory,)
+            )
+        }
+        removed = set(known).difference(paths)
+        if removed:
+            with cls._db_lock:
+                conn = cls._connection()
+                conn.executemany("DELETE FROM media WHERE path=?", [(path,) for path in removed])
+                conn.commit()
+
+        pending = []
+        for path in paths:
+            try:
+                stat = cls._stat_of(index, path)
+            except OSError:
+                continue
+            if known.get(path) != (stat.st_mtime_ns, stat.st_size):
+                pending.append((path, stat))
+
+        rows = []
+        probed = 0
+        for row in cls._probe_rows(index, kind, pending):
+            rows.append(row)
+            if len(rows) >= cls.write_batch:
+                cls._write(rows)
+                probed += len(rows)
+                rows = []
+        cls._write(rows)
+        probed += len(rows)
+        return probed, len(removed)
+
+    @classmethod
+    def _worker(cls):
+        while True:
+            index, kind = cls._queue.get()
+            try:
+                probed, removed = cls._sync_directory(index, kind)
+                if probed or removed:
+                    print(f"[媒体目录] 已同步 {index.directory}: 探测 {probed} 个，移除 {removed} 个")
+            except Exception as e:
+                print(f"[媒体目录] 后台同步失败 {index.directory}: {str(e)}")
+                with cls._lock:
+                    cls._synced.pop((index.directory, kind), None)
+            cls._queue.task_done()
+
+    @classmethod
+    def sync(cls, index, kind):
+        """索引版本变化(或本进程首次见到该目录)时提交后台同步"""
+        key = (index.directory, kind)
+        with cls._lock:
+            if cls._synced.get(key) == index.version:
+                return
+            cls._synced[key] = index.version
+            if cls._worker_thread is None:
+                # 使用守护线程，避免退出ComfyUI时等待未完成的探测
+                cls._worker_thread = threading.Thread(target=cls._worker, daemon=True, name="MuziMediaCatalog")
+                cls._worker_thread.start()
+        cls._queue.put((index, kind))
+
+    @classmethod
+    def lookup(cls, path):
+        """返回单个文件的元数据字典，未收录时返回None"""
+        rows = cls._execute(
+            "SELECT width, height, duration, fps, frame_count FROM media WHERE path=?", (path,)
+        )
+        if not rows:
+            return None
+        return dict(zip(("width", "height", "duration", "fps", "frame_count"), rows[0]))
+
+    @staticmethod
+    def _matches(row, orientation, min_duration, max_duration):
+        width, height, duration = row
+        if orientation != "any":
+            if not width or not height:
+                return False
+            if orientation == "landscape" and width <= height:
+                return False
+            if orientation == "portrait" and height <= width:
+                return False
+            if orientation == "square" and width != height:
+                return False
+        if min_duration or max_duration:
+            if duration is None:
+                return False
+            if min_duration and duration < min_duration:
+                return False
+            if max_duration and duration > max_duration:
+                return False
+        return True
+
+    @classmethod
+    def view(cls, index, kind, orientation="any", min_duration=0.0, max_duration=0.0):
+        """
+        无筛选条件时直接返回索引本身(不刷新、不探测)；否则刷新索引并提交后台同步，返回筛选后的CatalogView
+        后台尚未探测到的文件在这里只读文件头补探测，不解码
+        """
+        if orientation == "any" and not min_duration and not max_duration:
+            return index
+        paths = index.files()
+        cls.sync(index, kind)
+
+        rows = {
+            path: (width, height, duration)
+            for path, width, height, duration in cls._execute(
+                "SELECT path, width, height, duration FROM media WHERE directory=?", (index.directory,)
+            )
+        }
+        pending = []
+        for path in paths:
+            if path in rows:
+                continue
+            try:
+                pending.append((path, cls._stat_of(index, path)))
+            except OSError:
+                continue
+        missing = list(cls._probe_rows(index, kind, pending))
+        if missing:
+            cls._write(missing)
+            rows.update((row[0], (row[5], row[6], row[7])) for row in missing)
+
+        matched = [
+            path for path in paths
+            if path in rows and cls._matches(rows[path], orientation, min_duration, max_duration)
+        ]
+        return CatalogView(matched)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="填充媒体目录并按条件筛选")
+    parser.add_argument("directory", help="图片/视频目录(图片也可以是zip/tar归档)")
+    parser.add_argument("--video", action="store_true", help="按视频处理(默认图片)")
+    parser.add_argument("--orientation", choices=ORIENTATIONS, default="any")
+    parser.add_argument("--min-duration", type=float, default=0.0, help="最短时长(秒)，仅视频")
+    parser.add_argument("--max-duration", type=float, default=0.0, help="最长时长(秒)，仅视频")
+    args = parser.parse_args(argv)
+
+    directory = os.path.realpath(args.directory)
+    if args.video:
+        index, kind = DirectoryIndex.get(directory, VIDEO_EXTENSIONS), "video"
+    else:
+        index, kind = get_image_index(directory, IMAGE_EXTENSIONS), "image"
+
+    start = time.perf_counter()
+    probed, removed = MediaCatalog._sync_directory(index, kind)
+    MediaCatalog._synced[(index.directory, kind)] = index.version
+    elapsed = time.perf_counter() - start
+    print(f"[媒体目录] {len(index)} 个文件，探测 {probed} 个，移除 {removed} 个，用时 {elapsed:.2f}s")
+
+    start = time.perf_counter()
+    view = MediaCatalog.view(index, kind, args.orientation, args.min_duration, args.max_duration)
+    elapsed = time.perf_counter() - start
+    for path in view.files():
+        print(path, MediaCatalog.lookup(path))
+    print(f"[媒体目录] 符合条件 {len(view)} 个，筛选用时 {elapsed * 1000:.1f}ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,22 +3,48 @@ import folder_paths
 import torch
 import comfy.utils
 from comfy.sd import load_lora_for_models
+import comfy.lora
+import safetensors
+import safetensors.torch
+try:
+    from comfy.lora_convert import convert_lora
+except ImportError:  # 旧版ComfyUI没有lora_convert
+    convert_lora = None
 from nodes import LoraLoader
 from tqdm import tqdm
 import requests
 import time
 import traceback
 import numpy as np
-from PIL import Image, ImageOps
 import node_helpers
-from colour.io.luts.iridas_cube import read_LUT_IridasCube
 import inspect  # 新增关键导入
+import threading
+import weakref
+import hashlib
+import json
+import shutil
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from collections import OrderedDict
+from .lora_utils import (
+    LoraManifest, MirrorStats, LazySafetensors,
+    read_safetensors_header, validate_safetensors, sha256_file,
+)
+from .asset_provisioner import AssetProvisioner, LORA_ASSETS, LUT_REPO, LUT_FILES
+from .image_utils import (
+    ImagePrefetcher, DecodedImageCache, IMAGE_EXTENSIONS,
+    get_image_index, is_archive, load_images, stack_images, load_image_tensor_exif,
+)
+from .media_catalog import MediaCatalog
+from .lut_utils import (
+    DEFAULT_DOMAIN, DEFAULT_CHUNK_PIXELS, CHAIN_SIZES, LUTCache, to_colour_lut, apply_lut, apply_baked_lut,
+    chunk_pixels_for_limit, color_transfer_lut, write_cube,
+)
 #-------
 import comfy.sd
 from comfy.cli_args import args
 import random
-import glob
-from PIL import Image
 import folder_paths
 
 
@@ -28,7 +54,22 @@ import folder_paths
 class LoraDownloader:
     """
     完整的Lora文件下载器，支持多源下载和自动重试
+    校验模式(MUZI_LORA_VALIDATION):
+    - fast: 只解析safetensors头部并比对清单中的sha256（文件未变动时不重新计算）
+    - sha256: 每次都重新计算sha256并与清单比对
+    - full: 旧行为，完整加载一次文件验证
+    下载先写入.part文件，中断后用HTTP Range续传；MUZI_LORA_CONNECTIONS>1时启用多连接分段下载
+    多个下载源同时探测，优先使用首字节最先返回的源，并记录各源吞吐量供下次排序
     """
+    validation_mode = os.environ.get("MUZI_LORA_VALIDATION", "fast")
+    # 并行下载连接数(1为单连接断点续传)
+    parallel_connections = int(os.environ.get("MUZI_LORA_CONNECTIONS", "1"))
+    min_segment_size = 8 * 1024 * 1024
+    chunk_size = 1024 * 1024
+    # 镜像竞速：探测超时，以及等待历史最快源的宽限时间
+    probe_timeout = 10
+    race_grace = 0.5
+
     @classmethod
     def get_lora_dir(cls):
         """获取Lora存储目录"""
@@ -37,6 +78,304 @@ class LoraDownloader:
         os.makedirs(loras_dir, exist_ok=True)
         return loras_dir
 
+    @classmethod
+    def get_manifest(cls):
+        return LoraManifest(cls.get_lora_dir())
+
+    @classmethod
+    def verify_lora_file(cls, lora_path, lora_name, mode=None):
+        """
+        校验本地Lora文件，不做完整反序列化
+        返回True表示文件可用，校验失败抛出异常
+        """
+        mode = mode or cls.validation_mode
+        if mode == "full":
+            comfy.utils.load_torch_file(lora_path, safe_load=True)
+            return True
+
+        if lora_path.endswith(".safetensors"):
+            validate_safetensors(lora_path)
+
+        manifest = cls.get_manifest()
+        entry = manifest.get(lora_name)
+        stat = os.stat(lora_path)
+        if entry is None:
+            # 手动放入的文件：头部合法即可，补记一次sha256供后续比对
+            manifest.record(lora_name, lora_path, sha256_file(lora_path))
+            return True
+
+        if entry.get("size") != stat.st_size:
+            raise ValueError(f"文件大小与清单不符: {stat.st_size} != {entry.get('size')}")
+        if mode == "fast" and entry.get("mtime_ns") == stat.st_mtime_ns:
+            return True
+
+        digest = sha256_file(lora_path)
+        if digest != entry.get("sha256"):
+            raise ValueError(f"sha256不匹配: {digest}")
+        if entry.get("mtime_ns") != stat.st_mtime_ns:
+            manifest.record(lora_name, lora_path, digest, entry.get("url"))
+        return True
+
+    @classmethod
+    def _remove_lora(cls, lora_path, lora_name):
+        if os.path.exists(lora_path):
+            os.remove(lora_path)
+        cls.get_manifest().remove(lora_name)
+
+    @classmethod
+    def _discard_part(cls, part_path):
+        for path in (part_path, part_path + ".json"):
+            if os.path.exists(path):
+                os.remove(path)
+
+    @staticmethod
+    def _total_size(response):
+        """从Content-Range或Content-Length解析文件总大小"""
+        content_range = response.headers.get('content-range', '')
+        if '/' in content_range:
+            total = content_range.rsplit('/', 1)[1].strip()
+            if total.isdigit():
+                return int(total)
+        return int(response.headers.get('content-length', 0))
+
+    @staticmethod
+    def _expected_sha(response):
+        """Hugging Face的LFS文件会在(重定向前的)x-linked-etag中给出sha256"""
+        for r in [*response.history, response]:
+            etag = r.headers.get('x-linked-etag', '').strip('"')
+            if len(etag) == 64:
+                return etag
+        return None
+
+    @classmethod
+    def _fetch(cls, url, part_path, lora_name, headers, timeout):
+        """
+        下载到.part文件，返回(总大小, sha256, 服务器给出的sha256, 本次实际传输的字节数)
+        启用多连接且服务器支持Range时走并行分段下载，否则单连接断点续传
+        """
+        if cls.parallel_connections > 1:
+            probe = requests.get(
+                url,
+                headers={**headers, 'Range': 'bytes=0-0'},
+                stream=True,
+                timeout=timeout
+            )
+            probe.raise_for_status()
+            probe.close()
+            total_size = cls._total_size(probe)
+            if total_size < 1024*1024:
+                raise ValueError(f"文件大小异常: {total_size}字节")
+            if probe.status_code == 206 and total_size >= 2 * cls.min_segment_size:
+                digest, transferred = cls._download_parallel(
+                    url, part_path, lora_name, headers, timeout, total_size
+                )
+                return total_size, digest, cls._expected_sha(probe), transferred
+
+        return cls._download_stream(url, part_path, lora_name, headers, timeout)
+
+    @classmethod
+    def _download_stream(cls, url, part_path, lora_name, headers, timeout):
+        """单连接下载，已有.part文件时用Range续传"""
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        request_headers = dict(headers)
+        if offset:
+            request_headers['Range'] = f'bytes={offset}-'
+
+        response = requests.get(
+            url,
+            headers=request_headers,
+            stream=True,
+            timeout=timeout
+        )
+        if response.status_code == 416:
+            response.close()
+            raise ValueError(f"续传位置无效: {offset}字节")
+        response.raise_for_status()
+
+        if offset and response.status_code != 206:
+            print("[Lora下载器] 服务器不支持断点续传，从头下载")
+            offset = 0
+        elif offset:
+            print(f"[Lora下载器] 从 {offset} 字节处续传")
+
+        total_size = cls._total_size(response) if offset else int(response.headers.get('content-length', 0))
+        if total_size < 1024*1024:
+            raise ValueError(f"文件大小异常: {total_size}字节")
+
+        # 续传时先对已有部分计算哈希，保证最终sha256覆盖整个文件
+        hasher = hashlib.sha256()
+        if offset:
+            with open(part_path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1024*1024), b''):
+                    hasher.update(chunk)
+
+        transferred = 0
+        with open(part_path, 'ab' if offset else 'wb') as f:
+            with tqdm(
+                total=total_size,
+                initial=offset,
+                unit='B',
+                unit_scale=True,
+                unit_divisor=1024,
+                desc=f"下载 {lora_name}",
+                miniters=1
+            ) as pbar:
+                for chunk in response.iter_content(chunk_size=cls.chunk_size):
+                    if chunk:
+                        f.write(chunk)
+                        hasher.update(chunk)
+                        transferred += len(chunk)
+                        pbar.update(len(chunk))
+
+        if os.path.getsize(part_path) != total_size:
+            raise IOError("文件下载不完整")
+        return total_size, hasher.hexdigest(), cls._expected_sha(response), transferred
+
+    @classmethod
+    def _download_parallel(cls, url, part_path, lora_name, headers, timeout, total_size):
+        """
+        N路并行分段下载到预分配的.part文件，返回(sha256, 本次实际传输的字节数)
+        各段进度记录在.part.json中，中断后按段续传
+        """
+        state_path = part_path + ".json"
+        connections = cls.parallel_connections
+        segment_size = -(-total_size // connections)
+        segments = [
+            (start, min(start + segment_size, total_size) - 1)
+            for start in range(0, total_size, segment_size)
+        ]
+
+        done = [0] * len(segments)
+        if os.path.exists(state_path) and os.path.exists(part_path):
+            try:
+                with open(state_path, 'r', encoding='utf-8') as f:
+                    state = json.load(f)
+                if state.get("total") == total_size and [tuple(s) for s in state.get("segments", [])] == segments:
+                    done = state["done"]
+                    print(f"[Lora下载器] 续传并行下载，已完成 {sum(done)} 字节")
+            except Exception:
+                pass
+        if not any(done) or os.path.getsize(part_path) != total_size:
+            done = [0] * len(segments)
+            with open(part_path, 'wb') as f:
+                f.truncate(total_size)
+
+        lock = threading.Lock()
+        transferred = [0]
+
+        def save_state():
+            with open(state_path, 'w', encoding='utf-8') as f:
+                json.dump({"total": total_size, "segments": segments, "done": done}, f)
+
+        def fetch_segment(index, pbar):
+            start, end = segments[index]
+            position = start + done[index]
+            if position > end:
+                return
+            response = requests.get(
+                url,
+                headers={**headers, 'Range': f'bytes={position}-{end}'},
+                stream=True,
+                timeout=timeout
+            )
+            response.raise_for_status()
+            if response.status_code != 206:
+                raise IOError("服务器未返回分段数据")
+            try:
+                with open(part_path, 'r+b') as f:
+                    f.seek(position)
+                    for chunk in response.iter_content(chunk_size=cls.chunk_size):
+                        if chunk:
+                            f.write(chunk)
+                            with lock:
+                                done[index] += len(chunk)
+                                transferred[0] += len(chunk)
+                                pbar.update(len(chunk))
+            finally:
+                with lock:
+                    save_state()
+
+        with tqdm(
+            total=total_size,
+            initial=sum(done),
+            unit='B',
+            unit_scale=True,
+            unit_divisor=1024,
+            desc=f"下载 {lora_name} x{len(segments)}",
+            miniters=1
+        ) as pbar:
+            with ThreadPoolExecutor(max_workers=len(segments)) as executor:
+                futures = [executor.submit(fetch_segment, i, pbar) for i in range(len(segments))]
+                errors = [f.exception() for f in futures if f.exception() is not None]
+        if errors:
+            raise errors[0]
+
+        if sum(done) != total_size:
+            raise IOError("分段下载不完整")
+        os.remove(state_path)
+        # 分段乱序写入，完成后统一计算sha256
+        return sha256_file(part_path), transferred[0]
+
+    @classmethod
+    def get_mirror_stats(cls):
+        return MirrorStats(cls.get_lora_dir())
+
+    @classmethod
+    def _probe_first_byte(cls, url, headers):
+        """发送1字节的Range请求，返回首字节到达耗时"""
+        start = time.time()
+        response = requests.get(
+            url,
+            headers={**headers, 'Range': 'bytes=0-0'},
+            stream=True,
+            timeout=cls.probe_timeout
+        )
+        try:
+            response.raise_for_status()
+            next(response.iter_content(chunk_size=1), b'')
+        finally:
+            response.close()
+        return time.time() - start
+
+    @classmethod
+    def _race_mirrors(cls, urls, headers):
+        """
+        同时探测所有下载源，返回排好序的源列表(胜出者在前)
+        首个响应的源胜出；若历史最快源在宽限时间内也响应，则优先使用历史最快源
+        """
+        stats = cls.get_mirror_stats()
+        ranked = stats.rank(urls)
+        if len(ranked) < 2:
+            return ranked
+
+        executor = ThreadPoolExecutor(max_workers=len(ranked))
+        futures = {executor.submit(cls._probe_first_byte, url, headers): url for url in ranked}
+        responded = []
+        try:
+            for future in as_completed(futures, timeout=cls.probe_timeout):
+                if future.exception() is None:
+                    responded.append(futures[future])
+                    break
+        except Exception:
+            pass
+
+        winner = responded[0] if responded else None
+        favourite = ranked[0]
+        if winner and winner != favourite and stats.throughput(favourite):
+            fav_future = next(f for f, u in futures.items() if u == favourite)
+            try:
+                fav_future.result(timeout=cls.race_grace)
+                winner = favourite
+            except Exception:
+                pass
+        executor.shutdown(wait=False, cancel_futures=True)
+
+        if not winner:
+            print("[Lora下载器] 所有下载源探测失败，按历史顺序依次尝试")
+            return ranked
+        print(f"[Lora下载器] 选择下载源: {MirrorStats.host_of(winner)}")
+        return [winner] + [u for u in ranked if u != winner]
+
     @classmethod
     def download_lora(cls, lora_url, lora_name, max_retries=3, timeout=60):
         """
@@ -48,13 +387,13 @@ class LoraDownloader:
         # 检查文件是否已存在且完整
         if os.path.exists(lora_path) and os.path.getsize(lora_path) > 1024*1024:
             try:
-                # 验证文件是否可加载
-                comfy.utils.load_torch_file(lora_path, safe_load=True)
+                # 只校验头部和清单哈希，完整加载留给apply_lora
+                cls.verify_lora_file(lora_path, lora_name)
                 print(f"[Lora下载器] 使用现有有效文件: {lora_path}")
                 return lora_path
-            except:
-                print(f"[Lora下载器] 文件损坏，将重新下载: {lora_path}")
-                os.remove(lora_path)
+            except Exception as e:
+                print(f"[Lora下载器] 文件损坏，将重新下载: {lora_path} ({str(e)})")
+                cls._remove_lora(lora_path, lora_name)
 
         # 准备备用下载源
         mirror_url = lora_url.replace(
@@ -67,57 +406,43 @@ class LoraDownloader:
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64)'
         }
 
+        part_path = lora_path + ".part"
+        stats = cls.get_mirror_stats()
         last_error = None
         for retry in range(max_retries):
-            for url in urls_to_try:
+            for url in cls._race_mirrors(urls_to_try, headers):
                 try:
                     print(f"\n[Lora下载器] 尝试下载(源: {url})...")
-                    response = requests.get(
-                        url,
-                        headers=headers,
-                        stream=True,
-                        timeout=timeout
+                    started = time.time()
+                    total_size, digest, expected_sha, transferred = cls._fetch(
+                        url, part_path, lora_name, headers, timeout
                     )
-                    response.raise_for_status()
-
-                    total_size = int(response.headers.get('content-length', 0))
-                    if total_size < 1024*1024:
-                        raise ValueError(f"文件大小异常: {total_size}字节")
-
-                    # 下载文件
-                    with open(lora_path, 'wb') as f:
-                        with tqdm(
-                            total=total_size,
-                            unit='B',
-                            unit_scale=True,
-                            unit_divisor=1024,
-                            desc=f"下载 {lora_name}",
-                            miniters=1
-                        ) as pbar:
-                            for chunk in response.iter_content(chunk_size=8192):
-                                if chunk:
-                                    f.write(chunk)
-                                    pbar.update(len(chunk))
+                    # 按本次实际传输的字节计算吞吐量(续传时不含已有部分，服务器忽略Range时包含重下的部分)
+                    elapsed = max(time.time() - started, 1e-3)
+                    stats.record(url, transferred / elapsed)
 
                     # 验证文件完整性
-                    if os.path.getsize(lora_path) == total_size:
-                        try:
-                            # 验证文件可加载
-                            comfy.utils.load_torch_file(lora_path, safe_load=True)
-                            print(f"[Lora下载器] 下载成功: {lora_path}")
-                            return lora_path
-                        except Exception as e:
-                            os.remove(lora_path)
-                            raise ValueError(f"下载文件无法加载: {str(e)}")
-                    else:
-                        os.remove(lora_path)
-                        raise IOError("文件下载不完整")
+                    if expected_sha and digest != expected_sha:
+                        raise ValueError(f"sha256校验失败: {digest} != {expected_sha}")
+                    try:
+                        if lora_path.endswith(".safetensors"):
+                            validate_safetensors(part_path)
+                    except Exception as e:
+                        raise ValueError(f"下载文件结构无效: {str(e)}")
+
+                    os.replace(part_path, lora_path)
+                    cls.get_manifest().record(lora_name, lora_path, digest, lora_url)
+                    print(f"[Lora下载器] 下载成功: {lora_path}")
+                    return lora_path
 
                 except Exception as e:
                     last_error = e
                     print(f"[Lora下载器] 下载失败: {str(e)}")
-                    if os.path.exists(lora_path):
-                        os.remove(lora_path)
+                    # 网络中断保留.part文件以便续传，内容错误则丢弃
+                    if isinstance(e, ValueError):
+                        cls._discard_part(part_path)
+                    else:
+                        stats.record(url, 0)
                     
                     if retry < max_retries - 1:
                         wait_time = 2 ** retry
@@ -130,6 +455,377 @@ class LoraDownloader:
         print(f"保存到: {loras_dir}")
         return None
 
+##############################################
+#             Lora全局缓存                   #
+##############################################
+class LoraStateDictCache:
+    """
+    进程级Lora状态字典缓存，所有BaseLoraLoader子类共享
+    - 以(真实路径, 修改时间, 文件大小)为键，文件被替换后自动失效
+    - 按字节预算做LRU淘汰，预算可用环境变量MUZI_LORA_CACHE_MB或set_budget配置
+    - 记录命中/未命中次数，用于确认同一文件在进程内只读盘一次
+    - MUZI_LORA_MMAP=1时以内存映射方式懒加载safetensors，只为模型匹配到的键创建张量
+      （Windows下映射期间文件无法被删除或替换，因此默认关闭）
+    """
+    max_bytes = int(float(os.environ.get("MUZI_LORA_CACHE_MB", "4096")) * 1024 * 1024)
+    use_mmap = os.environ.get("MUZI_LORA_MMAP", "0") == "1"
+    hits = 0
+    misses = 0
+    evictions = 0
+    _entries = OrderedDict()  # key -> (state_dict, nbytes)
+    _lock = threading.RLock()
+
+    @staticmethod
+    def make_key(path):
+        stat = os.stat(path)
+        return (os.path.realpath(path), stat.st_mtime_ns, stat.st_size)
+
+    @staticmethod
+    def state_dict_bytes(state_dict):
+        # 内存映射的字典不占用堆内存，页缓存由系统管理，不计入预算
+        if isinstance(state_dict, LazySafetensors):
+            return 0
+        return sum(
+            t.numel() * t.element_size()
+            for t in state_dict.values()
+            if isinstance(t, torch.Tensor)
+        )
+
+    @classmethod
+    def _default_loader(cls, path):
+        path = LoraPrecisionCache.resolve(path)
+        if cls.use_mmap and path.lower().endswith(".safetensors"):
+            return LazySafetensors(path)
+        return comfy.utils.load_torch_file(path, safe_load=True)
+
+    @classmethod
+    def get(cls, path, loader=None):
+        """返回path对应的状态字典，未命中时用loader从磁盘加载并缓存"""
+        key = cls.make_key(path)
+        with cls._lock:
+            entry = cls._entries.get(key)
+            if entry is not None:
+                cls._entries.move_to_end(key)
+                cls.hits += 1
+                return entry[0]
+
+            cls.misses += 1
+            state_dict = (loader or cls._default_loader)(path)
+            cls._put(key, state_dict)
+            return state_dict
+
+    @classmethod
+    def _put(cls, key, state_dict):
+        # 同一路径的旧版本(修改时间或大小不同)直接丢弃
+        for stale in [k for k in cls._entries if k[0] == key[0]]:
+            del cls._entries[stale]
+
+        nbytes = cls.state_dict_bytes(state_dict)
+        if nbytes > cls.max_bytes:
+            print(f"[Lora缓存] 文件超出缓存预算，不缓存: {key[0]} ({nbytes / 1024**2:.1f}MB)")
+            return
+
+        cls._entries[key] = (state_dict, nbytes)
+        cls._evict()
+
+    @classmethod
+    def _evict(cls):
+        total = sum(n for _, n in cls._entries.values())
+        while total > cls.max_bytes and cls._entries:
+            old_key, (_, nbytes) = cls._entries.popitem(last=False)
+            total -= nbytes
+            cls.evictions += 1
+            print(f"[Lora缓存] LRU淘汰: {old_key[0]}")
+
+    @classmethod
+    def set_budget(cls, megabytes):
+        with cls._lock:
+            cls.max_bytes = int(megabytes * 1024 * 1024)
+            cls._evict()
+
+    @classmethod
+    def clear(cls):
+        with cls._lock:
+            cls._entries.clear()
+
+    @classmethod
+    def stats(cls):
+        with cls._lock:
+            return {
+                "hits": cls.hits,
+                "misses": cls.misses,
+                "evictions": cls.evictions,
+                "entries": len(cls._entries),
+                "bytes": sum(n for _, n in cls._entries.values()),
+                "max_bytes": cls.max_bytes,
+            }
+
+##############################################
+#             Lora精度压缩缓存               #
+##############################################
+class LoraPrecisionCache:
+    """
+    Lora精度压缩缓存（MUZI_LORA_PRECISION=fp16或bf16开启）
+    - 首次加载时把fp32/fp64张量转换为目标精度，写入loras/compact/下的旁路文件
+    - 之后的加载直接读取压缩文件，加载时间和常驻内存约减半
+    - MUZI_LORA_PRECISION_CHECK=1时，生成时在CPU上与原文件逐张量比对，误差超限则继续使用原文件
+      （各精度的误差范围由测试覆盖，默认不在每次生成时重复比对）
+    """
+    precision = os.environ.get("MUZI_LORA_PRECISION", "").lower()
+    verify = os.environ.get("MUZI_LORA_PRECISION_CHECK", "0") == "1"
+    DTYPES = {"fp16": torch.float16, "bf16": torch.bfloat16}
+    # 允许的最大误差(相对于各张量的最大绝对值)
+    MAX_RELATIVE_ERROR = {"fp16": 1e-3, "bf16": 1e-2}
+
+    @classmethod
+    def get_cache_dir(cls):
+        cache_dir = os.path.join(LoraDownloader.get_lora_dir(), "compact")
+        os.makedirs(cache_dir, exist_ok=True)
+        return cache_dir
+
+    @classmethod
+    def resolve(cls, path):
+        """返回应当加载的文件路径：有效的压缩文件，或原文件"""
+        if cls.precision not in cls.DTYPES or not path.lower().endswith(".safetensors"):
+            return path
+
+        stat = os.stat(path)
+        name = os.path.splitext(os.path.basename(path))[0]
+        compact_path = os.path.join(cls.get_cache_dir(), f"{name}.{cls.precision}.safetensors")
+        if os.path.exists(compact_path):
+            try:
+                header, _ = read_safetensors_header(compact_path)
+                metadata = header.get("__metadata__") or {}
+                if (metadata.get("source_size") == str(stat.st_size)
+                        and metadata.get("source_mtime_ns") == str(stat.st_mtime_ns)):
+                    return compact_path
+            except ValueError:
+                pass
+
+        try:
+            return cls._build(path, compact_path, stat)
+        except Exception as e:
+            print(f"[Lora精度缓存] 生成失败，使用原文件: {str(e)}")
+            return path
+
+    @staticmethod
+    def parity_error(original, converted):
+        """逐张量比较，返回最大相对误差"""
+        worst = 0.0
+        for key, tensor in original.items():
+            if not tensor.is_floating_point():
+                continue
+            reference = tensor.double()
+            scale = reference.abs().max().item() or 1.0
+            error = (converted[key].double() - reference).abs().max().item() / scale
+            worst = max(worst, error)
+        return worst
+
+    @classmethod
+    def _build(cls, path, compact_path, stat):
+        dtype = cls.DTYPES[cls.precision]
+        with safetensors.safe_open(path, framework="pt", device="cpu") as f:
+            source_metadata = f.metadata() or {}
+            original = {key: f.get_tensor(key) for key in f.keys()}
+
+        converted = {
+            key: (t.to(dtype) if t.is_floating_point() and t.element_size() > 2 else t).contiguous()
+            for key, t in original.items()
+        }
+        if all(converted[key] is original[key] for key in original):
+            # 已经是半精度，无需另存
+            return path
+
+        metadata = {
+            **source_metadata,
+            "source_size": str(stat.st_size),
+            "source_mtime_ns": str(stat.st_mtime_ns),
+            "precision": cls.precision,
+        }
+        error_text = ""
+        if cls.verify:
+            error = cls.parity_error(original, converted)
+            if not error <= cls.MAX_RELATIVE_ERROR[cls.precision]:
+                print(f"[Lora精度缓存] {cls.precision}误差过大({error:.2e})，使用原文件: {path}")
+                return path
+            metadata["max_relative_error"] = f"{error:.2e}"
+            error_text = f", 误差{error:.2e}"
+
+        tmp_path = compact_path + ".tmp"
+        safetensors.torch.save_file(converted, tmp_path, metadata=metadata)
+        os.replace(tmp_path, compact_path)
+        print(f"[Lora精度缓存] 已生成{cls.precision}压缩文件: {compact_path} "
+              f"({stat.st_size / 1024**2:.1f}MB -> {os.path.getsize(compact_path) / 1024**2:.1f}MB{error_text})")
+        return compact_path
+
+##############################################
+#             Lora增量磁盘缓存               #
+##############################################
+class LoraDeltaCache:
+    """
+    预计算Lora融合增量的磁盘缓存（可选，MUZI_LORA_DELTA_CACHE=1开启）
+    - 键: 基础模型指纹 + Lora哈希 + 强度
+    - 增量按权重键以fp16保存为safetensors
+    - 命中后以diff补丁直接挂载，跳过键映射和up/down矩阵乘
+    - 按磁盘预算做LRU清理（命中时刷新修改时间），预算可用环境变量MUZI_LORA_DELTA_CACHE_MB配置(0为不限制)
+    - 先写入唯一的临时文件再原子替换，多个进程/线程同时写同一个键互不干扰
+    """
+    enabled = os.environ.get("MUZI_LORA_DELTA_CACHE", "0") == "1"
+    max_bytes = int(float(os.environ.get("MUZI_LORA_DELTA_CACHE_MB", "8192")) * 1024 * 1024)
+    stale_tmp_seconds = 3600  # 超过该时间的临时文件视为中断写入的残留
+    fingerprint_samples = 8
+    _fingerprints = {}  # id(模型) -> (弱引用, 指纹)
+    _lock = threading.Lock()
+
+    @classmethod
+    def get_cache_dir(cls):
+        cache_dir = os.path.join(LoraDownloader.get_lora_dir(), "delta_cache")
+        os.makedirs(cache_dir, exist_ok=True)
+        return cache_dir
+
+    @classmethod
+    def fingerprint(cls, patcher):
+        """由权重键名/形状/类型及少量权重采样值计算基础模型指纹"""
+        model = patcher.model
+        cached = cls._fingerprints.get(id(model))
+        if cached is not None and cached[0]() is model:
+            return cached[1]
+
+        state_dict = patcher.model_state_dict()
+        keys = sorted(state_dict.keys())
+        hasher = hashlib.sha256()
+        for key in keys:
+            tensor = state_dict[key]
+            hasher.update(f"{key}:{tuple(tensor.shape)}:{tensor.dtype};".encode())
+        step = max(1, len(keys) // cls.fingerprint_samples)
+        for key in keys[::step]:
+            flat = state_dict[key].detach().flatten()
+            sample = torch.cat([flat[:16], flat[-16:]]).float().cpu()
+            hasher.update(sample.numpy().tobytes())
+
+        digest = hasher.hexdigest()[:16]
+        cls._fingerprints[id(model)] = (weakref.ref(model), digest)
+        return digest
+
+    @staticmethod
+    def lora_hash(lora_path, lora_name):
+        entry = LoraDownloader.get_manifest().get(lora_name)
+        if entry and entry.get("size") == os.path.getsize(lora_path):
+            return entry["sha256"][:16]
+        stat = os.stat(lora_path)
+        ident = f"{os.path.realpath(lora_path)}:{stat.st_mtime_ns}:{stat.st_size}"
+        return hashlib.sha256(ident.encode()).hexdigest()[:16]
+
+    @classmethod
+    def cache_path(cls, model, clip, lora_path, lora_name, strength):
+        model_fp = cls.fingerprint(model) if model is not None else "none"
+        clip_fp = cls.fingerprint(clip.patcher) if clip is not None else "none"
+        lora_fp = cls.lora_hash(lora_path, lora_name)
+        file_name = f"{model_fp}_{clip_fp}_{lora_fp}_{strength:.4f}.safetensors"
+        return os.path.join(cls.get_cache_dir(), file_name)
+
+    @classmethod
+    def enforce_budget(cls, keep=None):
+        """按修改时间从旧到新删除缓存文件，直到总大小不超过预算；keep为刚写入的文件，不会被删除"""
+        cache_dir = cls.get_cache_dir()
+        now = time.time()
+        entries = []
+        with cls._lock:
+            for entry in os.scandir(cache_dir):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                if entry.name.endswith(".tmp"):
+                    if now - stat.st_mtime > cls.stale_tmp_seconds:
+                        cls._remove(entry.path)
+                    continue
+                if entry.name.endswith(".safetensors"):
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+            if cls.max_bytes <= 0:
+                return
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= cls.max_bytes:
+                    break
+                if path == keep:
+                    continue
+                if cls._remove(path):
+                    total -= size
+                    print(f"[Lora增量缓存] 超出磁盘预算，清理: {os.path.basename(path)}")
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            # 其他进程已删除或文件正在被使用
+            return False
+
+    @staticmethod
+    def compute_deltas(patcher, loaded, strength):
+        """对每个被补丁的权重计算 (补丁后 - 原始) 的增量"""
+        state_dict = patcher.model_state_dict()
+        grouped = {}
+        for patch_key, value in loaded.items():
+            if isinstance(patch_key, str):
+                key, offset = patch_key, None
+            else:
+                key, offset = patch_key[0], patch_key[1]
+            if key in state_dict:
+                grouped.setdefault(key, []).append((strength, value, 1.0, offset, None))
+
+        calculate_weight = getattr(comfy.lora, "calculate_weight", None) or patcher.calculate_weight
+        deltas = {}
+        for key, patches in grouped.items():
+            base = state_dict[key].float()
+            patched = calculate_weight(patches, base.clone(), key)
+            deltas[key] = (patched - base).to(torch.float16).cpu().contiguous()
+        return deltas
+
+    @classmethod
+    def apply(cls, model, clip, lora_path, lora_name, strength):
+        path = cls.cache_path(model, clip, lora_path, lora_name, strength)
+        if os.path.exists(path):
+            print(f"[Lora增量缓存] 命中: {os.path.basename(path)}")
+            tensors = safetensors.torch.load_file(path)
+            # 刷新修改时间，作为LRU清理的依据
+            os.utime(path)
+            model_deltas = {k[len("model::"):]: v for k, v in tensors.items() if k.startswith("model::")}
+            clip_deltas = {k[len("clip::"):]: v for k, v in tensors.items() if k.startswith("clip::")}
+        else:
+            print(f"[Lora增量缓存] 未命中，计算增量: {os.path.basename(path)}")
+            lora = LoraStateDictCache.get(lora_path)
+            if convert_lora is not None:
+                lora = convert_lora(lora)
+            loaded = comfy.lora.load_lora(lora, build_lora_key_map(model, clip))
+            model_deltas = cls.compute_deltas(model, loaded, strength) if model is not None else {}
+            clip_deltas = cls.compute_deltas(clip.patcher, loaded, strength) if clip is not None else {}
+
+            tensors = {f"model::{k}": v for k, v in model_deltas.items()}
+            tensors.update({f"clip::{k}": v for k, v in clip_deltas.items()})
+            fd, tmp_path = tempfile.mkstemp(
+                prefix=os.path.basename(path) + ".", suffix=".tmp", dir=os.path.dirname(path)
+            )
+            os.close(fd)
+            try:
+                safetensors.torch.save_file(tensors, tmp_path, metadata={"lora": lora_name, "strength": str(strength)})
+                os.replace(tmp_path, path)
+            except BaseException:
+                cls._remove(tmp_path)
+                raise
+            cls.enforce_budget(keep=path)
+
+        new_model = model.clone() if model is not None else None
+        new_clip = clip.clone() if clip is not None else None
+        if new_model is not None:
+            new_model.add_patches({k: ("diff", (v,)) for k, v in model_deltas.items()}, 1.0)
+        if new_clip is not None:
+            new_clip.add_patches({k: ("diff", (v,)) for k, v in clip_deltas.items()}, 1.0)
+        return (new_model, new_clip)
+
 ##############################################
 #             基础Lora加载类                 #
 ##############################################
@@ -138,7 +834,6 @@ class BaseLoraLoader:
     完整的Lora加载基类
     """
     def __init__(self):
-        self.loaded_lora = None
         self.lora_name = None
         self.lora_url = None
 
@@ -148,6 +843,8 @@ class BaseLoraLoader:
             raise ValueError("Lora文件名或URL未设置")
 
         print(f"\n[Lora加载器] 检查Lora文件: {self.lora_name}")
+        # 插件加载时已在后台下载，先等待对应任务结束，再做快速校验
+        AssetProvisioner.wait("lora", self.lora_name)
         return LoraDownloader.download_lora(self.lora_url, self.lora_name)
 
     def apply_lora(self, model, clip, strength, info_text=None):
@@ -161,27 +858,23 @@ class BaseLoraLoader:
             print("[Lora加载器] 无法获取Lora文件，使用原始模型")
             return (model, clip)
 
-        # 检查是否已加载相同的Lora
-        if self.loaded_lora and self.loaded_lora[0] == lora_path:
-            print("[Lora加载器] 使用已加载的Lora缓存")
-            lora = self.loaded_lora[1]
-        else:
-            # 清理旧Lora
-            if self.loaded_lora:
-                old_lora = self.loaded_lora
-                self.loaded_lora = None
-                del old_lora
-
-            # 加载新Lora
+        # 命中增量缓存时直接挂载预计算的权重增量
+        if LoraDeltaCache.enabled:
             try:
-                print(f"[Lora加载器] 加载Lora文件: {lora_path}")
-                lora = comfy.utils.load_torch_file(lora_path, safe_load=True)
-                self.loaded_lora = (lora_path, lora)
-                print("[Lora加载器] Lora文件加载成功")
+                return LoraDeltaCache.apply(model, clip, lora_path, self.lora_name, strength)
             except Exception as e:
-                print(f"[Lora加载器] 加载失败: {str(e)}")
+                print(f"[Lora增量缓存] 失败，改用常规方式: {str(e)}")
                 traceback.print_exc()
-                return (model, clip)
+
+        # 从进程级缓存获取Lora（各节点实例共享同一份状态字典）
+        try:
+            print(f"[Lora加载器] 加载Lora文件: {lora_path}")
+            lora = LoraStateDictCache.get(lora_path)
+            print(f"[Lora加载器] Lora文件加载成功 (缓存统计: {LoraStateDictCache.stats()})")
+        except Exception as e:
+            print(f"[Lora加载器] 加载失败: {str(e)}")
+            traceback.print_exc()
+            return (model, clip)
 
         # 应用Lora
         try:
@@ -200,6 +893,38 @@ class BaseLoraLoader:
             traceback.print_exc()
             return (model, clip)
 
+def build_lora_key_map(model, clip):
+    """构建Lora键名到模型权重键名的映射(与load_lora_for_models一致)"""
+    key_map = {}
+    if model is not None:
+        key_map = comfy.lora.model_lora_keys_unet(model.model, key_map)
+    if clip is not None:
+        key_map = comfy.lora.model_lora_keys_clip(clip.cond_stage_model, key_map)
+    return key_map
+
+def load_lora_stack_for_models(model, clip, loras):
+    """
+    等价于对loras中每一项依次调用load_lora_for_models
+    但键映射只构建一次，模型和CLIP也只克隆一次，所有补丁挂在同一份克隆上
+    loras: [(状态字典, 强度), ...]
+    """
+    key_map = build_lora_key_map(model, clip)
+    new_model = model.clone() if model is not None else None
+    new_clip = clip.clone() if clip is not None else None
+    for lora, strength in loras:
+        if convert_lora is not None:
+            lora = convert_lora(lora)
+        loaded = comfy.lora.load_lora(lora, key_map)
+        applied = set()
+        if new_model is not None:
+            applied.update(new_model.add_patches(loaded, strength))
+        if new_clip is not None:
+            applied.update(new_clip.add_patches(loaded, strength))
+        missing = [k for k in loaded if k not in applied]
+        if missing:
+            print(f"[Lora加载器] {len(missing)}个Lora键未匹配到模型")
+    return (new_model, new_clip)
+
 ##############################################
 #             各功能调节器实现                #
 ##############################################
@@ -209,7 +934,7 @@ class BreastSizeAdjuster(BaseLoraLoader):
     def __init__(self):
         super().__init__()
         self.lora_name = "breast_size_lora.safetensors"
-        self.lora_url = "https://huggingface.co/liguanwei/mymodels/resolve/main/breast_size_lora.safetensors"
+        self.lora_url = LORA_ASSETS[self.lora_name]
     
     @classmethod
     def INPUT_TYPES(cls):
@@ -254,7 +979,7 @@ class BreastSizeAdjusternswf(BaseLoraLoader):
     def __init__(self):
         super().__init__()
         self.lora_name = "breast_size_nswf.safetensors"
-        self.lora_url = "https://huggingface.co/liguanwei/mymodels/resolve/main/breast_size_nswf.safetensors"
+        self.lora_url = LORA_ASSETS[self.lora_name]
     
     @classmethod
     def INPUT_TYPES(cls):
@@ -300,7 +1025,7 @@ class HandStabilityAdjuster(BaseLoraLoader):
     def __init__(self):
         super().__init__()
         self.lora_name = "hand_stability_lora.safetensors"
-        self.lora_url = "https://huggingface.co/liguanwei/mymodels/resolve/main/hand_stability_lora.safetensors"
+        self.lora_url = LORA_ASSETS[self.lora_name]
     
     @classmethod
     def INPUT_TYPES(cls):
@@ -346,7 +1071,7 @@ class SexyStyleAdjuster(BaseLoraLoader):
     def __init__(self):
         super().__init__()
         self.lora_name = "sexy_style_lora.safetensors"
-        self.lora_url = "https://huggingface.co/liguanwei/mymodels/resolve/main/sexy_style_lora.safetensors"
+        self.lora_url = LORA_ASSETS[self.lora_name]
     
     @classmethod
     def INPUT_TYPES(cls):
@@ -392,7 +1117,7 @@ class Influencer_regulator(BaseLoraLoader):
     def __init__(self):
         super().__init__()
         self.lora_name = "Beautifulgirl_size_lora.safetensors"
-        self.lora_url = "https://huggingface.co/liguanwei/mymodels/resolve/main/Beautifulgirl_size_lora.safetensors"
+        self.lora_url = LORA_ASSETS[self.lora_name]
     
     @classmethod
     def INPUT_TYPES(cls):
@@ -434,16 +1159,88 @@ class Influencer_regulator(BaseLoraLoader):
     def apply_breast_size(self, model, clip, size_strength, info_text=None):
         return self.apply_lora(model, clip, size_strength, info_text)
 
+#==============🧩调节器合并版=================
+class LoraAdjusterStack:
+    """
+    多Lora合并调节器
+    把内置的各调节器Lora一次性挂到模型上，强度为0的Lora直接跳过
+    相比串联多个调节器节点，只克隆一次模型/CLIP、只构建一次键映射
+    """
+    # (输入名, 调节器类, 最小值, 最大值, 步长)
+    ADJUSTERS = [
+        ("breast_size_strength", BreastSizeAdjuster, -1.0, 2.0, 0.1),
+        ("breast_size_nswf_strength", BreastSizeAdjusternswf, -1.0, 2.0, 0.1),
+        ("hand_stability_strength", HandStabilityAdjuster, 0.0, 2.0, 0.05),
+        ("sexy_style_strength", SexyStyleAdjuster, 0.0, 2.0, 0.05),
+        ("influencer_strength", Influencer_regulator, 0.0, 2.0, 0.1),
+    ]
+
+    @classmethod
+    def INPUT_TYPES(cls):
+        required = {
+            "model": ("MODEL",),
+            "clip": ("CLIP",),
+        }
+        for input_name, _, min_value, max_value, step in cls.ADJUSTERS:
+            required[input_name] = ("FLOAT", {
+                "default": 0.0,
+                "min": min_value,
+                "max": max_value,
+                "step": step,
+                "display": "slider"
+            })
+        return {
+            "required": required,
+            "optional": {
+                "info_text": ("STRING", {
+                    "multiline": True,
+                    "default": "🧩调节器合并版使用说明:\n"
+                              "1. 连接模型和CLIP到本节点\n"
+                              "2. 分别设置各调节器强度，0表示不启用\n"
+                              "3. 效果等同于串联对应的调节器节点，但只打一次补丁\n"
+                              "4. 首次使用会自动下载启用的LoRA模型"
+                }),
+            }
+        }
+
+    RETURN_TYPES = ("MODEL", "CLIP")
+    FUNCTION = "apply_stack"
+    CATEGORY = "🎨公众号懂AI的木子做号工具/人物增强调节"
+    OUTPUT_NODE = True
+
+    def apply_stack(self, model, clip, info_text=None, **strengths):
+        loras = []
+        for input_name, adjuster_cls, *_ in self.ADJUSTERS:
+            strength = strengths.get(input_name, 0.0)
+            if strength == 0:
+                continue
+            lora_path = adjuster_cls().get_lora_path()
+            if not lora_path:
+                print(f"[Lora合并] 无法获取Lora文件，跳过: {input_name}")
+                continue
+            try:
+                loras.append((LoraStateDictCache.get(lora_path), strength))
+            except Exception as e:
+                print(f"[Lora合并] 加载失败，跳过 {lora_path}: {str(e)}")
+
+        if not loras:
+            print("[Lora合并] 没有启用的Lora，使用原始模型")
+            return (model, clip)
+
+        try:
+            print(f"[Lora合并] 一次性应用 {len(loras)} 个Lora")
+            return load_lora_stack_for_models(model, clip, loras)
+        except Exception as e:
+            print(f"[Lora合并] 应用失败: {str(e)}")
+            traceback.print_exc()
+            return (model, clip)
+
 ##############################################
 #                LUT滤镜相关                 #
 ##############################################
 class LUTDownloader:
-    LUT_REPO = "https://huggingface.co/datasets/liguanwei/luts/resolve/main/"
-    LUT_FILES = [
-        "快速电影.cube",
-        "时尚电影.cube", 
-        "胶片颗粒质感电影.cube"
-    ]
+    LUT_REPO = LUT_REPO
+    LUT_FILES = LUT_FILES
     
     @classmethod
     def get_lut_dir(cls):
@@ -453,61 +1250,74 @@ class LUTDownloader:
         os.makedirs(lut_dir, exist_ok=True)
         return lut_dir
     
-    @classmethod 
-    def download_luts(cls):
+    @classmethod
+    def download_lut(cls, lut_file, timeout=60):
+        """下载单个LUT文件，已存在则直接返回路径"""
+        dest_path = os.path.join(cls.get_lut_dir(), lut_file)
+        if os.path.exists(dest_path):
+            return dest_path
+
+        url = cls.LUT_REPO + lut_file
+        part_path = dest_path + ".part"
+        print(f"[LUT下载器] 正在下载: {url}")
         try:
-            lut_dir = cls.get_lut_dir()
+            response = requests.get(url, stream=True, timeout=timeout)
+            response.raise_for_status()
             
-            for lut_file in cls.LUT_FILES:
-                dest_path = os.path.join(lut_dir, lut_file)
-                if not os.path.exists(dest_path):
-                    try:
-                        url = cls.LUT_REPO + lut_file
-                        print(f"[LUT下载器] 正在下载: {url}")
-                        response = requests.get(url, stream=True)
-                        response.raise_for_status()
-                        
-                        total_size = int(response.headers.get('content-length', 0))
-                        with open(dest_path, 'wb') as f:
-                            with tqdm(
-                                desc=f"下载 {lut_file}",
-                                total=total_size,
-                                unit='iB',
-                                unit_scale=True,
-                                unit_divisor=1024,
-                            ) as bar:
-                                for data in response.iter_content(chunk_size=1024):
-                                    size = f.write(data)
-                                    bar.update(size)
-                        print(f"[LUT下载器] 成功下载到: {dest_path}")
-                    except Exception as e:
-                        print(f"[LUT下载器] 下载失败 {lut_file}: {str(e)}")
-        except Exception as e:
-            print(f"[LUT下载器] 初始化错误: {str(e)}")
+            total_size = int(response.headers.get('content-length', 0))
+            with open(part_path, 'wb') as f:
+                with tqdm(
+                    desc=f"下载 {lut_file}",
+                    total=total_size,
+                    unit='iB',
+                    unit_scale=True,
+                    unit_divisor=1024,
+                ) as bar:
+                    for data in response.iter_content(chunk_size=64 * 1024):
+                        size = f.write(data)
+                        bar.update(size)
+            os.replace(part_path, dest_path)
         finally:
-            return True  # 确保始终返回，避免阻塞节点注册
+            if os.path.exists(part_path):
+                os.remove(part_path)
+        print(f"[LUT下载器] 成功下载到: {dest_path}")
+        return dest_path
 
-class ESSImageApplyLUT:
     @classmethod
-    def INPUT_TYPES(s):
-        # 添加异常捕获防止下载失败影响节点注册
+    def list_lut_files(cls):
+        """清单中的LUT + luts目录下的本地.cube文件，不做网络请求"""
+        lut_dir = cls.get_lut_dir()
+        lut_files = list(cls.LUT_FILES)
         try:
-            LUTDownloader.download_luts()
-        except Exception as e:
-            print(f"[滤镜节点] LUT预下载失败: {str(e)}")
-        
-        lut_dir = LUTDownloader.get_lut_dir()
-        lut_files = []
-        try:
-            lut_files = [f for f in os.listdir(lut_dir) 
+            lut_files += [f for f in os.listdir(lut_dir) 
                         if f.lower().endswith('.cube') and os.path.isfile(os.path.join(lut_dir, f))]
         except Exception as e:
-            print(f"[滤镜节点] 获取LUT列表错误: {str(e)}")
-        
+            print(f"[LUT下载器] 获取LUT列表错误: {str(e)}")
+        return sorted(set(lut_files))
+
+    @classmethod
+    def ensure_lut(cls, lut_file):
+        """返回可读的LUT路径；清单中的LUT尚未就绪时，等待后台下载或同步补下载"""
+        lut_file_path = os.path.join(cls.get_lut_dir(), lut_file)
+        if lut_file in cls.LUT_FILES and not os.path.isfile(lut_file_path):
+            AssetProvisioner.wait("lut", lut_file)
+            if not os.path.isfile(lut_file_path):
+                cls.download_lut(lut_file)
+
+        if not os.path.isfile(lut_file_path):
+            raise FileNotFoundError(f"LUT文件不存在: {lut_file_path}")
+        if not os.access(lut_file_path, os.R_OK):
+            raise PermissionError(f"无法读取LUT文件: {lut_file_path}")
+        return lut_file_path
+
+class ESSImageApplyLUT:
+    @classmethod
+    def INPUT_TYPES(s):
+        # LUT由资源预备管理器在后台下载，这里只列出本地文件和清单中的文件，不做网络请求
         return {
             "required": {
                 "image": ("IMAGE",),
-                "lut_file": (sorted(lut_files),),
+                "lut_file": (LUTDownloader.list_lut_files(),),
                 "gamma_correction": ("BOOLEAN", { "default": True }),
                 "clip_values": ("BOOLEAN", { "default": True }),
                 "strength": ("FLOAT", {
@@ -524,6 +1334,23 @@ class ESSImageApplyLUT:
                     "default": "😍图像调色滤镜:\n"
                               "1. 连接到图片节点\n"
                 }),
+                "engine": (["colour", "torch"], {
+                    "default": "colour",
+                    "tooltip": "colour: 逐帧numpy路径(默认，已保存的工作流输出不变)；"
+                               "torch: 整批张量插值(快)，开启gamma_correction时为近似结果"
+                }),
+                "interpolation": (["trilinear", "tetrahedral"], {
+                    "default": "trilinear",
+                    "tooltip": "torch引擎的插值方式。关闭gamma_correction时trilinear与colour结果一致；"
+                               "开启时gamma已预先合成进LUT，与colour相差约1e-2"
+                }),
+                "memory_limit_mb": ("INT", {
+                    "default": 0,
+                    "min": 0,
+                    "max": 65536,
+                    "step": 64,
+                    "tooltip": "torch引擎分块处理时的临时内存上限(MB)，0为默认分块；输出直接写入预分配张量"
+                }),
             }
         }
 
@@ -532,58 +1359,292 @@ class ESSImageApplyLUT:
     CATEGORY = "🎨公众号懂AI的木子做号工具/人物增强调节"  # 与截图分类保持一致
     OUTPUT_NODE = True
 
-    def execute(self, image, lut_file, gamma_correction, clip_values, strength, info_text=None):
+    def execute(self, image, lut_file, gamma_correction, clip_values, strength, info_text=None,
+                engine="colour", interpolation="trilinear", memory_limit_mb=0):
         try:
-            lut_dir = LUTDownloader.get_lut_dir()
-            lut_file_path = os.path.join(lut_dir, lut_file)
+            lut_file_path = LUTDownloader.ensure_lut(lut_file)
             
-            if not os.path.isfile(lut_file_path):
-                raise FileNotFoundError(f"LUT文件不存在: {lut_file_path}")
-            if not os.access(lut_file_path, os.R_OK):
-                raise PermissionError(f"无法读取LUT文件: {lut_file_path}")
-            
-            lut = read_LUT_IridasCube(lut_file_path)
-            lut.name = lut_file
-
-            if clip_values:
-                if lut.domain[0].max() == lut.domain[0].min() and lut.domain[1].max() == lut.domain[1].min():
-                    lut.table = np.clip(lut.table, lut.domain[0, 0], lut.domain[1, 0])
-                else:
-                    if len(lut.table.shape) == 2:
-                        for dim in range(3):
-                            lut.table[:, dim] = np.clip(lut.table[:, dim], lut.domain[0, dim], lut.domain[1, dim])
-                    else:
-                        for dim in range(3):
-                            lut.table[:, :, :, dim] = np.clip(lut.table[:, :, :, dim], lut.domain[0, dim], lut.domain[1, dim])
-
-            out = []
-            for img in image:
-                lut_img = img.cpu().numpy().copy()
-
-                is_non_default_domain = not np.array_equal(lut.domain, np.array([[0., 0., 0.], [1., 1., 1.]]))
-                dom_scale = None
-                if is_non_default_domain:
-                    dom_scale = lut.domain[1] - lut.domain[0]
-                    lut_img = lut_img * dom_scale + lut.domain[0]
-                if gamma_correction:
-                    lut_img = lut_img ** (1/2.2)
-                lut_img = lut.apply(lut_img)
-                if gamma_correction:
-                    lut_img = lut_img ** (2.2)
-                if is_non_default_domain:
-                    lut_img = (lut_img - lut.domain[0]) / dom_scale
-
-                lut_img = torch.from_numpy(lut_img).to(image.device)
-                if strength < 1.0:
-                    lut_img = strength * lut_img + (1 - strength) * img
-                out.append(lut_img)
-
-            return (torch.stack(out), )
+            if engine == "colour":
+                # 解析结果按(路径, 修改时间, 是否裁剪)缓存，并持久化为二进制旁路文件
+                lut = to_colour_lut(LUTCache.get(lut_file_path, clip_values), lut_file)
+                return (self._apply_colour(image, lut, gamma_correction, strength), )
+
+            # gamma和定义域缩放已预先合成进LUT，按(LUT, gamma, 裁剪)缓存
+            baked = LUTCache.get_baked(lut_file_path, clip_values, gamma_correction)
+            return (self._apply_torch(image, baked, strength, interpolation, memory_limit_mb), )
             
         except Exception as e:
             print(f"[滤镜节点] 处理错误: {str(e)}")
             return (image, )
 
+    def _apply_torch(self, image, baked, strength, interpolation, memory_limit_mb=0):
+        """
+        整批在torch中查预合成的LUT，不经过numpy，也没有逐像素的gamma幂运算
+        分块查表并与原图混合后直接写入预分配的输出，峰值内存约为输入+输出+单块临时内存
+        (不原地改写输入：上游节点的输出会被ComfyUI缓存复用)
+        """
+        chunk_pixels = chunk_pixels_for_limit(memory_limit_mb) if memory_limit_mb > 0 else DEFAULT_CHUNK_PIXELS
+        return apply_baked_lut(image, baked, interpolation, chunk_pixels, strength=strength)
+
+    def _apply_colour(self, image, lut, gamma_correction, strength):
+        # 逐帧写入预分配的输出，避免先收集列表再torch.stack产生第二份整批拷贝
+        out = torch.empty(image.shape, dtype=torch.float32, device=image.device)
+        for i, img in enumerate(image):
+            lut_img = img.cpu().numpy().copy()
+
+            is_non_default_domain = not np.array_equal(lut.domain, DEFAULT_DOMAIN)
+            dom_scale = None
+            if is_non_default_domain:
+                dom_scale = lut.domain[1] - lut.domain[0]
+                lut_img = lut_img * dom_scale + lut.domain[0]
+            if gamma_correction:
+                lut_img = lut_img ** (1/2.2)
+            lut_img = lut.apply(lut_img)
+            if gamma_correction:
+                lut_img = lut_img ** (2.2)
+            if is_non_default_domain:
+                lut_img = (lut_img - lut.domain[0]) / dom_scale
+
+            lut_img = torch.from_numpy(lut_img).to(image.device)
+            if strength < 1.0:
+                lut_img = strength * lut_img + (1 - strength) * img
+            out[i] = lut_img
+
+        return out
+
+class ESSImageApplyLUTChain:
+    """
+    多滤镜合成：按顺序串联最多4个LUT(各自强度)，先采样合成为一张33³/65³的表再一次性应用
+    - 合成表按(各LUT文件, 强度, gamma, 裁剪, 尺寸)缓存到luts/.cache，串联多少个LUT应用成本都相同
+    - 与多个滤镜风格调节器串联相比，只做一次整帧查表
+    """
+    MAX_LUTS = 4
+    NONE_LUT = "无"
+
+    @classmethod
+    def INPUT_TYPES(s):
+        lut_files = LUTDownloader.list_lut_files()
+        required = {"image": ("IMAGE",)}
+        for i in range(1, s.MAX_LUTS + 1):
+            required[f"lut_{i}"] = (lut_files if i == 1 else [s.NONE_LUT] + lut_files,)
+            required[f"strength_{i}"] = ("FLOAT", {
+                "default": 1.0,
+                "min": 0.0,
+                "max": 1.0,
+                "step": 0.01,
+                "display": "slider"
+            })
+        required.update({
+            "gamma_correction": ("BOOLEAN", { "default": True }),
+            "clip_values": ("BOOLEAN", { "default": True }),
+            "lut_size": ([str(size) for size in CHAIN_SIZES], {"default": "33"}),
+            "interpolation": (["trilinear", "tetrahedral"], {"default": "trilinear"}),
+        })
+        return {"required": required}
+
+    RETURN_TYPES = ("IMAGE",)
+    FUNCTION = "execute"
+    CATEGORY = "🎨公众号懂AI的木子做号工具/人物增强调节"
+    OUTPUT_NODE = True
+
+    def execute(self, image, gamma_correction, clip_values, lut_size, interpolation, **kwargs):
+        try:
+            stages = []
+            for i in range(1, self.MAX_LUTS + 1):
+                lut_file = kwargs.get(f"lut_{i}", self.NONE_LUT)
+                strength = kwargs.get(f"strength_{i}", 1.0)
+                if lut_file == self.NONE_LUT or strength <= 0:
+                    continue
+                stages.append((LUTDownloader.ensure_lut(lut_file), strength))
+
+            if not stages:
+                print("[多滤镜合成] 没有启用的LUT，返回原图")
+                return (image, )
+
+            chain = LUTCache.get_chain(stages, clip_values, gamma_correction, int(lut_size), interpolation)
+            print(f"[多滤镜合成] 已合成 {len(stages)} 个LUT，一次性应用")
+            return (apply_baked_lut(image, chain, interpolation), )
+
+        except Exception as e:
+            print(f"[多滤镜合成] 处理错误: {str(e)}")
+            return (image, )
+
+class ESSColorTransferLUT:
+    """
+    参考图调色LUT生成：由参考图和源图样本计算一次统计色彩迁移，烘焙为3D LUT保存到luts目录
+    - 之后成千上万帧直接用滤镜风格调节器的快速LUT路径，不再逐帧计算统计量，结果在帧间一致
+    - 迁移在sRGB编码值上计算，应用生成的LUT时应关闭gamma_correction
+    """
+    @classmethod
+    def INPUT_TYPES(s):
+        return {
+            "required": {
+                "reference": ("IMAGE",),
+                "source": ("IMAGE",),
+                "lut_name": ("STRING", {"default": "参考调色", "multiline": False}),
+                "lut_size": ([str(size) for size in CHAIN_SIZES], {"default": "33"}),
+                "overwrite": ("BOOLEAN", { "default": False }),
+            }
+        }
+
+    RETURN_TYPES = ("IMAGE", "STRING")
+    RETURN_NAMES = ("preview", "lut_file")
+    FUNCTION = "execute"
+    CATEGORY = "🎨公众号懂AI的木子做号工具/人物增强调节"
+    OUTPUT_NODE = True
+
+    def execute(self, reference, source, lut_name, lut_size, overwrite):
+        size = int(lut_size)
+        table = color_transfer_lut(reference, source, size)
+
+        lut_file = self._output_name(lut_name, overwrite)
+        lut_file_path = os.path.join(LUTDownloader.get_lut_dir(), lut_file)
+        write_cube(lut_file_path, table, os.path.splitext(lut_file)[0])
+        print(f"[参考调色] 已生成 {size}³ LUT: {lut_file_path}")
+
+        unit_domain = torch.tensor(DEFAULT_DOMAIN, dtype=torch.float32)
+        preview = apply_lut(source, torch.from_numpy(table), unit_domain)
+        return (preview, lut_file)
+
+    def _output_name(self, lut_name, overwrite):
+        base = os.path.basename(lut_name.strip()) or "参考调色"
+        if base.lower().endswith(".cube"):
+            base = base[:-len(".cube")]
+        lut_dir = LUTDownloader.get_lut_dir()
+        name = base + ".cube"
+        index = 1
+        while not overwrite and os.path.exists(os.path.join(lut_dir, name)):
+            name = f"{base}_{index}.cube"
+            index += 1
+        return name
+
+class ESSVideoApplyLUT:
+    """
+    视频直接调色：由ffmpeg的lut1d/lut3d滤镜逐帧查表并编码成文件
+    - 帧不转换为Python张量，长视频按编码器速度处理
+    - 与滤镜风格调节器使用同一份预合成LUT(gamma/定义域/裁剪)，导出为.cube供ffmpeg读取
+    - 中间格式为16位平面RGB，strength<1时用blend滤镜与原画面混合
+    - 音频流直接复制，容器不支持该音频编码时改为AAC重新编码
+    """
+    PRESETS = ["ultrafast", "superfast", "veryfast", "faster", "fast", "medium", "slow", "slower", "veryslow"]
+
+    @classmethod
+    def INPUT_TYPES(s):
+        return {
+            "required": {
+                "video_path": ("STRING", {"default": "input/video.mp4", "multiline": False}),
+                "lut_file": (LUTDownloader.list_lut_files(),),
+                "gamma_correction": ("BOOLEAN", { "default": True }),
+                "clip_values": ("BOOLEAN", { "default": True }),
+                "strength": ("FLOAT", {
+                    "default": 1.0, 
+                    "min": 0.0, 
+                    "max": 1.0, 
+                    "step": 0.01,
+                    "display": "slider"
+                }),
+                "output_path": ("STRING", {"default": "[time]/graded_video.mp4", "multiline": False}),
+            },
+            "optional": {
+                "interpolation": (["trilinear", "tetrahedral"], {"default": "trilinear"}),
+                "video_codec": (["libx264", "libx265"], {"default": "libx264"}),
+                "crf": ("INT", {"default": 18, "min": 0, "max": 51}),
+                "preset": (s.PRESETS, {"default": "medium"}),
+                "threads": ("INT", {
+                    "default": 0,
+                    "min": 0,
+                    "max": 128,
+                    "tooltip": "编码器线程数，0为ffmpeg自动选择"
+                }),
+            }
+        }
+
+    RETURN_TYPES = ("STRING",)
+    RETURN_NAMES = ("video_path",)
+    FUNCTION = "execute"
+    CATEGORY = "🎨公众号懂AI的木子做号工具/人物增强调节"
+    OUTPUT_NODE = True
+
+    def execute(self, video_path, lut_file, gamma_correction, clip_values, strength, output_path,
+                interpolation="trilinear", video_codec="libx264", crf=18, preset="medium", threads=0):
+        if shutil.which("ffmpeg") is None:
+            raise RuntimeError("未找到ffmpeg，请先安装并加入PATH")
+        if not os.path.isfile(video_path):
+            raise ValueError(f"视频文件不存在: {video_path}")
+
+        lut_file_path = LUTDownloader.ensure_lut(lut_file)
+        shaper_path, table_path, is_3d = LUTCache.get_baked_cubes(lut_file_path, clip_values, gamma_correction)
+        filter_graph = self.build_filter(shaper_path, table_path, is_3d, interpolation, strength)
+        output_path = self._process_output_path(output_path)
+
+        cmd = [
+            'ffmpeg', '-y', '-hide_banner',
+            '-i', os.path.abspath(video_path),
+            '-filter_complex', filter_graph,
+            '-map', '[v]', '-map', '0:a?',
+            '-c:v', video_codec, '-crf', str(crf), '-preset', preset,
+            '-threads', str(threads),
+            '-c:a', 'copy',
+            os.path.abspath(output_path),
+        ]
+        # .cube文件名只含ASCII，在缓存目录下运行ffmpeg，滤镜参数里只写文件名，避免路径转义问题
+        cube_dir = os.path.dirname(table_path)
+        try:
+            self._run_ffmpeg(cmd, cube_dir)
+        except RuntimeError as e:
+            if "codec not currently supported in container" not in str(e) and "Could not find tag for codec" not in str(e):
+                raise
+            print("[视频滤镜] 容器不支持原音频编码，改为AAC重新编码")
+            cmd[cmd.index('-c:a') + 1] = 'aac'
+            self._run_ffmpeg(cmd, cube_dir)
+
+        print(f"[视频滤镜] 调色完成: {output_path}")
+        return (output_path,)
+
+    @staticmethod
+    def build_filter(shaper_path, table_path, is_3d, interpolation, strength):
+        """生成ffmpeg滤镜图，输出标签为[v]"""
+        lut_chain = []
+        if shaper_path:
+            lut_chain.append(f"lut1d=file={os.path.basename(shaper_path)}:interp=linear")
+        if is_3d:
+            lut_chain.append(f"lut3d=file={os.path.basename(table_path)}:interp={interpolation}")
+        else:
+            lut_chain.append(f"lut1d=file={os.path.basename(table_path)}:interp=linear")
+
+        if strength >= 1.0:
+            return f"[0:v]format=gbrp16le,{','.join(lut_chain)},format=yuv420p[v]"
+        return (
+            f"[0:v]format=gbrp16le,split[src][tmp];"
+            f"[tmp]{','.join(lut_chain)}[graded];"
+            f"[graded][src]blend=all_mode=normal:all_opacity={strength:.4f},format=yuv420p[v]"
+        )
+
+    def _run_ffmpeg(self, cmd, cwd):
+        print(f"[视频滤镜] 执行: {' '.join(cmd)}")
+        result = subprocess.run(
+            cmd,
+            cwd=cwd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            encoding='utf-8',
+            errors='replace',
+        )
+        if result.returncode != 0:
+            raise RuntimeError(f"ffmpeg调色失败: {result.stderr[-2000:]}")
+
+    def _process_output_path(self, raw_path):
+        if "[time]" in raw_path:
+            timestamp = time.strftime("%Y%m%d-%H%M%S")
+            raw_path = raw_path.replace("[time]", timestamp)
+        if os.path.splitext(raw_path)[1].lower() not in ('.mp4', '.mov', '.mkv', '.avi'):
+            raw_path += ".mp4"
+        dir_path = os.path.dirname(raw_path)
+        if dir_path:
+            os.makedirs(dir_path, exist_ok=True)
+        return raw_path
+
 ##############################################
 #               字符选择器                 #
 ##############################################
@@ -636,10 +1697,8 @@ class LoadImagecode:
         if not os.path.exists(image_path):
             raise FileNotFoundError(f"图片未找到: {image_path}")
 
-        img = Image.open(image_path)
-        img = ImageOps.exif_transpose(img).convert("RGB")
-        img_np = np.array(img).astype(np.float32) / 255.0
-        img_tensor = torch.from_numpy(img_np)[None,]
+        # 静态图片只解码一次，之后从进程级解码缓存取用
+        img_tensor = DecodedImageCache.get(image_path, load_image_tensor_exif, variant="exif")
         
         return (img_tensor,)
 
@@ -703,8 +1762,9 @@ class ImageLoaderFromPath:
     微信：stone_liwei
     """
     def __init__(self):
-        self.current_index = 0  # 用于顺序模式
-        self.image_cache = []  # 缓存图片列表
+        self.last_image = None  # 顺序模式上一次读取的文件，新增/删除文件后仍能按排序位置继续
+        self.last_directory = None
+        self.prefetcher = ImagePrefetcher()
     
     @classmethod
     def INPUT_TYPES(cls):
@@ -712,7 +1772,7 @@ class ImageLoaderFromPath:
             "required": {
                 "directory": ("STRING", {
                     "default": "请输入完整路径",
-                    "tooltip": "相对于ComfyUI输入目录的路径"
+                    "tooltip": "相对于ComfyUI输入目录的路径（也可以是zip/tar归档文件）"
                 }),
                 "mode": (["sequential", "random"], {
                     "default": "sequential",
@@ -730,71 +1790,118 @@ class ImageLoaderFromPath:
                     "default": False,
                     "tooltip": "重置顺序模式的计数器"
                 }),
+                "batch_size": ("INT", {
+                    "default": 1,
+                    "min": 1,
+                    "max": 256,
+                    "tooltip": "一次加载的图片数量，输出[K,H,W,3]批次（图片不足时按实际数量）"
+                }),
+                "resize_mode": (["letterbox", "crop", "resize"], {
+                    "default": "letterbox",
+                    "tooltip": "批次中图片尺寸与第一张不一致时：补黑边/居中裁剪/拉伸"
+                }),
+                "max_side": ("INT", {
+                    "default": 0,
+                    "min": 0,
+                    "max": 16384,
+                    "step": 64,
+                    "tooltip": "长边上限，超过时降分辨率解码（JPEG按DCT缩放直接解码，速度和内存大幅下降）；0为原图"
+                }),
+                "prefetch_depth": ("INT", {
+                    "default": 0,
+                    "min": 0,
+                    "max": 64,
+                    "tooltip": "顺序模式后台预解码的图片数量（0为关闭）"
+                }),
+                "prefetch_memory_mb": ("INT", {
+                    "default": 1024,
+                    "min": 64,
+                    "max": 65536,
+                    "step": 64,
+                    "tooltip": "预解码队列的内存上限（MB）"
+                }),
+                "orientation": (["any", "landscape", "portrait", "square"], {
+                    "default": "any",
+                    "tooltip": "按图片方向筛选：不限/横图/竖图/方图（尺寸来自媒体目录，只读文件头，不解码）"
+                }),
             }
         }
     
-    RETURN_TYPES = ("STRING", "IMAGE", "INT")
-    RETURN_NAMES = ("image_path", "image", "当前序号")
+    RETURN_TYPES = ("STRING", "IMAGE", "INT", "STRING")
+    RETURN_NAMES = ("image_path", "image", "当前序号", "image_paths")
     FUNCTION = "load_image"
     CATEGORY = "🎨公众号懂AI的木子做号工具/懒人做号/图片相关"
     OUTPUT_NODE = True
 
-    def scan_image_files(self, directory):
-        """扫描目录中的图片文件"""
+    def get_index(self, directory):
+        """
+        目录索引在进程内共享，其他流程新增/删除的文件会被增量同步
+        directory也可以是zip/tar归档文件，按成员索引随机读取，无需解压
+        """
         base_dir = folder_paths.get_input_directory()
         image_dir = os.path.join(base_dir, directory)
-        
-        image_extensions = ['*.png', '*.jpg', '*.jpeg', '*.webp', '*.bmp']
-        image_files = []
-        for ext in image_extensions:
-            image_files.extend(sorted(glob.glob(os.path.join(image_dir, ext))))
-        
-        if not image_files:
-            raise ValueError(f"目录中没有图片文件: {image_dir}")
-        
-        return image_files
+        if not os.path.isdir(image_dir) and not is_archive(image_dir):
+            raise ValueError(f"图片目录不存在: {image_dir}")
+        return get_image_index(image_dir, IMAGE_EXTENSIONS)
 
-    def load_image(self, directory, mode, seed=0, reset_counter=False):
-        # 重置计数器
-        if reset_counter:
-            self.current_index = 0
-        
-        # 扫描图片文件（如果目录改变或首次运行）
-        if not hasattr(self, 'last_directory') or self.last_directory != directory or not self.image_cache:
-            self.image_cache = self.scan_image_files(directory)
+    def load_image(self, directory, mode, seed=0, reset_counter=False, prefetch_depth=0, prefetch_memory_mb=1024,
+                   batch_size=1, resize_mode="letterbox", max_side=0, orientation="any"):
+        # 重置计数器；目录改变时从头开始，并丢弃预解码结果
+        if reset_counter or self.last_directory != directory:
+            self.last_image = None
             self.last_directory = directory
-            self.current_index = 0
+            self.prefetcher.flush()
         
-        if not self.image_cache:
-            raise ValueError("没有可用的图片文件")
+        # 按方向筛选时在媒体目录中查询，顺序/随机/预取都在筛选结果中进行
+        index = MediaCatalog.view(self.get_index(directory), "image", orientation)
+        if orientation != "any" and not len(index):
+            raise ValueError(f"没有符合方向筛选({orientation})的图片: {directory}")
         
         # 选择图片
         if mode == "random":
+            image_files = index.files()
+            if not image_files:
+                raise ValueError("没有可用的图片文件")
             random.seed(seed if seed != 0 else None)
-            selected_index = random.randint(0, len(self.image_cache) - 1)
+            if batch_size == 1:
+                picks = [random.randint(0, len(image_files) - 1)]
+            else:
+                picks = random.sample(range(len(image_files)), min(batch_size, len(image_files)))
+            selected_index = picks[0]
+            selected_images = [image_files[i] for i in picks]
         else:
-            # 顺序模式
-            if self.current_index >= len(self.image_cache):
-                self.current_index = 0  # 循环读取
-            selected_index = self.current_index
-            self.current_index += 1
+            # 顺序模式：按文件名排在上一张之后的文件，读到末尾后循环
+            selected_index, selected_image = index.next_after(self.last_image)
+            if selected_image is None:
+                raise ValueError("没有可用的图片文件")
+            selected_images = [selected_image] + index.following(selected_image, batch_size - 1)
+            self.last_image = selected_images[-1]
         
-        selected_image = self.image_cache[selected_index]
-        
-        # 读取图片
+        # 读取图片：优先取后台预解码结果，其余并行解码，并预取接下来的图片
         try:
-            image = Image.open(selected_image)
-            image = image.convert("RGB")
-            image_tensor = torch.from_numpy(np.array(image).astype(np.float32) / 255.0)
-            image_tensor = image_tensor.unsqueeze(0)
+            if mode == "sequential" and prefetch_depth > 0:
+                images = load_images(selected_images, self.prefetcher, max_side)
+                self.prefetcher.schedule(
+                    index.following(selected_images[-1], prefetch_depth), prefetch_depth, prefetch_memory_mb, max_side
+                )
+            else:
+                self.prefetcher.flush()
+                images = load_images(selected_images, max_side=max_side)
+            image_tensor = stack_images(images, resize_mode)
+            image_paths = "\n".join(selected_images)
             
-            return (selected_image, image_tensor, selected_index + 1)  # 返回1-based序号
+            return (selected_images[0], image_tensor, selected_index + 1, image_paths)  # 返回1-based序号
         except Exception as e:
             raise ValueError(f"图片加载错误: {str(e)}")
  
  
 
 
+##############################################
+#               后台资源预备                 #
+##############################################
+AssetProvisioner.start(LoraDownloader.download_lora, LUTDownloader.download_lut)
+
 ##############################################
 #               节点注册部分                 #
 ##############################################
@@ -804,7 +1911,11 @@ NODE_CLASS_MAPPINGS = {
     "HandStabilityAdjuster": HandStabilityAdjuster,
     "SexyStyleAdjuster": SexyStyleAdjuster,
     "Influencer_regulator": Influencer_regulator,
+    "LoraAdjusterStack": LoraAdjusterStack,
     "ESSImageApplyLUT": ESSImageApplyLUT,  # 确保注册
+    "ESSImageApplyLUTChain": ESSImageApplyLUTChain,
+    "ESSColorTransferLUT": ESSColorTransferLUT,
+    "ESSVideoApplyLUT": ESSVideoApplyLUT,
     "HiddenStringSwitch": HiddenStringSwitch,
     "LoadImagecode": LoadImagecode,
     "TextDisplayNode": TextDisplayNode, 
@@ -817,7 +1928,11 @@ NODE_DISPLAY_NAME_MAPPINGS = {
     "HandStabilityAdjuster": "✋手部稳定调节器", 
     "SexyStyleAdjuster": "🔥性感风格调节器",
     "Influencer_regulator": "😍网感调节器",
+    "LoraAdjusterStack": "🧩人物调节器合并版",
     "ESSImageApplyLUT": "🔧 滤镜风格调节器",  # 显示名称
+    "ESSImageApplyLUTChain": "🔗 多滤镜合成调节器",
+    "ESSColorTransferLUT": "🎯 参考图调色LUT生成",
+    "ESSVideoApplyLUT": "🎬 视频滤镜直出(ffmpeg)",
     "HiddenStringSwitch": "字符串切换器",
     "LoadImagecode": "微信公众号二维码",
     "TextDisplayNode": "📝文本/提示词输入",
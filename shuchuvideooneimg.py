@@ -1,9 +1,9 @@
 import os
 import cv2
-import torch
 import comfy.utils
 import folder_paths
 from pathlib import Path
+from .video_utils import FirstFrameCache, frame_to_tensor
 
 class VideoFirstFrameNode:
     @classmethod
@@ -32,20 +32,11 @@ class VideoFirstFrameNode:
         # 创建输出目录
         Path(output_dir).mkdir(parents=True, exist_ok=True)
         
-        # 读取视频第一帧
-        cap = cv2.VideoCapture(video_path)
-        success, frame = cap.read()
-        cap.release()
-        
-        if not success:
-            raise ValueError("无法读取视频首帧")
-            
-        # 转换颜色空间 BGR->RGB
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        # 读取视频第一帧（RGB），优先取磁盘首帧缓存
+        rgb_frame = FirstFrameCache.get(video_path)
         
         # 转换为Tensor
-        tensor_frame = torch.from_numpy(rgb_frame).float() / 255.0
-        tensor_frame = tensor_frame.unsqueeze(0)
+        tensor_frame = frame_to_tensor(rgb_frame)
         
         # 保存图片
         save_path = os.path.join(output_dir, f"{filename_prefix}.{format}")
@@ -1,10 +1,9 @@
 import os
 import random
-from PIL import Image
-import numpy as np
-import torch
 import folder_paths
 import comfy.utils
+from .image_utils import ImagePrefetcher, ARCHIVE_EXTENSIONS, get_image_index, load_images, stack_images
+from .media_catalog import MediaCatalog
 
 class ImageLoaderFromFolder:
     """
@@ -21,8 +20,9 @@ class ImageLoaderFromFolder:
         self.base_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), "picdata")
         # 支持的图片扩展名
         self.allowed_extensions = ['.del', '.jpg', '.jpeg', '.png', '.webp']
-        self.current_index = 0  # 用于顺序模式
-        self.image_cache = []   # 图片缓存
+        self.last_image = None  # 顺序模式上一次读取的文件
+        self.last_subfolder = None
+        self.prefetcher = ImagePrefetcher()
         self.available_subfolders = []  # 可用的子目录列表
 
     @classmethod
@@ -31,8 +31,10 @@ class ImageLoaderFromFolder:
         base_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), "picdata")
         available_subfolders = []
         if os.path.exists(base_folder):
+            # 子目录和zip/tar归档文件都可以作为图片来源
             available_subfolders = [d for d in os.listdir(base_folder) 
-                                  if os.path.isdir(os.path.join(base_folder, d))]
+                                  if os.path.isdir(os.path.join(base_folder, d))
+                                  or d.lower().endswith(ARCHIVE_EXTENSIONS)]
             available_subfolders.sort()
         
         # 如果没有子目录，则添加一个默认选项
@@ -61,66 +63,101 @@ class ImageLoaderFromFolder:
                     "default": False,
                     "tooltip": "重置顺序模式的计数器"
                 }),
+                "batch_size": ("INT", {
+                    "default": 1,
+                    "min": 1,
+                    "max": 256,
+                    "tooltip": "一次加载的图片数量，输出[K,H,W,3]批次（图片不足时按实际数量）"
+                }),
+                "resize_mode": (["letterbox", "crop", "resize"], {
+                    "default": "letterbox",
+                    "tooltip": "批次中图片尺寸与第一张不一致时：补黑边/居中裁剪/拉伸"
+                }),
+                "max_side": ("INT", {
+                    "default": 0,
+                    "min": 0,
+                    "max": 16384,
+                    "step": 64,
+                    "tooltip": "长边上限，超过时降分辨率解码（JPEG按DCT缩放直接解码，速度和内存大幅下降）；0为原图"
+                }),
+                "prefetch_depth": ("INT", {
+                    "default": 0,
+                    "min": 0,
+                    "max": 64,
+                    "tooltip": "顺序模式后台预解码的图片数量（0为关闭）"
+                }),
+                "prefetch_memory_mb": ("INT", {
+                    "default": 1024,
+                    "min": 64,
+                    "max": 65536,
+                    "step": 64,
+                    "tooltip": "预解码队列的内存上限（MB）"
+                }),
+                "orientation": (["any", "landscape", "portrait", "square"], {
+                    "default": "any",
+                    "tooltip": "按图片方向筛选：不限/横图/竖图/方图（尺寸来自媒体目录，只读文件头，不解码）"
+                }),
             }
         }
 
-    RETURN_TYPES = ("IMAGE", "INT")
-    RETURN_NAMES = ("image", "当前序号")
+    RETURN_TYPES = ("IMAGE", "INT", "STRING")
+    RETURN_NAMES = ("image", "当前序号", "image_paths")
     FUNCTION = "load_image"
     CATEGORY = "🎨公众号懂AI的木子做号工具/懒人做号/图片相关"
     OUTPUT_NODE = True
 
-    def scan_images(self, subfolder):
-        """扫描指定子目录中的图片文件"""
-        image_folder = os.path.join(self.base_folder, subfolder)
+    def load_image(self, subfolder, mode, seed=0, reset_counter=False, prefetch_depth=0, prefetch_memory_mb=1024,
+                   batch_size=1, resize_mode="letterbox", max_side=0, orientation="any"):
+        # 重置计数器；子目录改变时从头开始，并丢弃预解码结果
+        if reset_counter or self.last_subfolder != subfolder:
+            self.last_image = None
+            self.last_subfolder = subfolder
+            self.prefetcher.flush()
         
+        image_folder = os.path.join(self.base_folder, subfolder)
         if not os.path.exists(image_folder):
             raise ValueError(f"图片目录不存在: {image_folder}")
-        
-        image_files = []
-        for f in sorted(os.listdir(image_folder)):  # 排序保证顺序一致性
-            ext = os.path.splitext(f)[1].lower()
-            if ext in self.allowed_extensions:
-                image_files.append(os.path.join(image_folder, f))
-        
-        if not image_files:
-            raise ValueError(f"目录中没有图片文件: {image_folder}")
-        
-        return image_files
 
-    def load_image(self, subfolder, mode, seed=0, reset_counter=False):
-        # 扫描图片文件（如果首次运行或缓存为空）
-        if not self.image_cache or reset_counter:
-            self.image_cache = self.scan_images(subfolder)
-        
-        if not self.image_cache:
-            raise ValueError("没有可用的图片文件")
-        
-        # 重置计数器
-        if reset_counter:
-            self.current_index = 0
+        # 共享的增量目录索引，每次运行同步一次，其他流程新增的图片可以被读到
+        # 按方向筛选时在媒体目录中查询，顺序/随机/预取都在筛选结果中进行
+        index = MediaCatalog.view(get_image_index(image_folder, self.allowed_extensions), "image", orientation)
+        if orientation != "any" and not len(index):
+            raise ValueError(f"没有符合方向筛选({orientation})的图片: {subfolder}")
         
         # 选择图片
         if mode == "random":
+            image_files = index.files()
+            if not image_files:
+                raise ValueError(f"目录中没有图片文件: {image_folder}")
             random.seed(seed if seed != 0 else None)
-            selected_index = random.randint(0, len(self.image_cache) - 1)
+            if batch_size == 1:
+                picks = [random.randint(0, len(image_files) - 1)]
+            else:
+                picks = random.sample(range(len(image_files)), min(batch_size, len(image_files)))
+            selected_index = picks[0]
+            selected_images = [image_files[i] for i in picks]
         else:
-            # 顺序模式
-            if self.current_index >= len(self.image_cache):
-                self.current_index = 0  # 循环读取
-            selected_index = self.current_index
-            self.current_index += 1
-        
-        selected_image = self.image_cache[selected_index]
+            # 顺序模式：按文件名排在上一张之后的文件，读到末尾后循环
+            selected_index, selected_image = index.next_after(self.last_image)
+            if selected_image is None:
+                raise ValueError(f"目录中没有图片文件: {image_folder}")
+            selected_images = [selected_image] + index.following(selected_image, batch_size - 1)
+            self.last_image = selected_images[-1]
         
-        # 加载图片并转换为ComfyUI兼容格式
+        # 读取图片：优先取后台预解码结果，其余并行解码，并预取接下来的图片
         try:
-            image = Image.open(selected_image)
-            image = image.convert("RGB")
-            image = np.array(image).astype(np.float32) / 255.0
-            image_tensor = torch.from_numpy(image)[None, ]
+            if mode == "sequential" and prefetch_depth > 0:
+                images = load_images(selected_images, self.prefetcher, max_side)
+                self.prefetcher.schedule(
+                    index.following(selected_images[-1], prefetch_depth), prefetch_depth, prefetch_memory_mb, max_side
+                )
+            else:
+                self.prefetcher.flush()
+                images = load_images(selected_images, max_side=max_side)
+            image_tensor = stack_images(images, resize_mode)
+            image_paths = "\n".join(selected_images)
             
-            return (image_tensor, selected_index + 1)  # 只返回图像张量和序号
+            return (image_tensor, selected_index + 1, image_paths)  # 图像张量、序号和路径列表
         except Exception as e:
             raise ValueError(f"图片加载错误: {str(e)}")
 
@@ -0,0 +1,74 @@
+"""
+测试公共设置
+- 不在ComfyUI中运行时，为插件依赖的宿主模块(comfy、folder_paths、nodes等)注册最小替身
+- 插件目录以包的形式导入(模块中使用了相对导入)，包名与pytest为插件根目录__init__.py推算的模块名一致，
+  并预先注册到sys.modules，避免pytest执行根__init__.py(需要ComfyUI服务端依赖)
+"""
+import os
+import sys
+import types
+import importlib
+import importlib.util
+
+import pytest
+
+PLUGIN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PACKAGE = os.path.basename(PLUGIN_DIR)
+
+# 不在插件加载时后台下载资源
+os.environ.setdefault("MUZI_ASSET_PREFETCH", "0")
+# 本地测试服务器不走代理
+os.environ.setdefault("NO_PROXY", "127.0.0.1,localhost")
+
+
+def _stub(name, **attrs):
+    module = types.ModuleType(name)
+    module.__dict__.update(attrs)
+    sys.modules[name] = module
+    return module
+
+
+def _install_host_stubs():
+    if "comfy" in sys.modules or importlib.util.find_spec("comfy") is not None:
+        return
+    import safetensors.torch
+
+    comfy = _stub("comfy")
+    comfy.utils = _stub(
+        "comfy.utils",
+        load_torch_file=lambda path, safe_load=True: safetensors.torch.load_file(path),
+    )
+    comfy.sd = _stub("comfy.sd", load_lora_for_models=lambda model, clip, lora, s1, s2: (model, clip))
+    comfy.lora = _stub("comfy.lora")
+    comfy.cli_args = _stub("comfy.cli_args", args=None)
+    _stub("nodes", LoraLoader=object)
+    _stub("node_helpers")
+    _stub(
+        "folder_paths",
+        get_input_directory=lambda: os.path.join(PLUGIN_DIR, "input"),
+        get_output_directory=lambda: os.path.join(PLUGIN_DIR, "output"),
+        get_temp_directory=lambda: os.path.join(PLUGIN_DIR, "temp"),
+    )
+
+
+def _register_package():
+    if PACKAGE in sys.modules:
+        return
+    package = types.ModuleType(PACKAGE)
+    package.__file__ = os.path.join(PLUGIN_DIR, "__init__.py")
+    package.__path__ = [PLUGIN_DIR]
+    sys.modules[PACKAGE] = package
+
+
+_register_package()
+
+
+def load_plugin_module(name):
+    """以 <插件目录名>.<name> 导入插件模块"""
+    _install_host_stubs()
+    return importlib.import_module(f"{PACKAGE}.{name}")
+
+
+@pytest.fixture(scope="session")
+def plugin_nodes():
+    return load_plugin_module("nodes")
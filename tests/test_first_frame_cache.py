@@ -0,0 +1,111 @@
+"""
+视频首帧磁盘缓存测试：默认格式、磁盘预算与LRU清理
+"""
+import os
+
+import numpy as np
+import pytest
+
+from conftest import load_plugin_module
+
+video_utils = load_plugin_module("video_utils")
+FirstFrameCache = video_utils.FirstFrameCache
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(FirstFrameCache, "cache_dir", str(tmp_path / "first_frames"))
+    monkeypatch.setattr(FirstFrameCache, "mode", "png")
+    decoded = []
+
+    def fake_first_frame(path, gpu_acceleration=False):
+        decoded.append(os.path.basename(path))
+        rng = np.random.default_rng(len(path))
+        return rng.integers(0, 256, (64, 64, 3), dtype=np.uint8)
+
+    monkeypatch.setattr(video_utils, "read_first_frame", fake_first_frame)
+    monkeypatch.setattr(FirstFrameCache, "decoded", decoded, raising=False)
+    return FirstFrameCache
+
+
+def make_videos(directory, count):
+    paths = []
+    for i in range(count):
+        path = directory / f"clip{i}.mp4"
+        path.write_bytes(b"\0" * (i + 1))
+        paths.append(str(path))
+    return paths
+
+
+def cache_files(cache):
+    return sorted(os.listdir(cache.cache_dir))
+
+
+def backdate(cache, seconds):
+    """把已有缓存文件的修改时间统一往前推，便于控制LRU顺序"""
+    for name in os.listdir(cache.cache_dir):
+        path = os.path.join(cache.cache_dir, name)
+        mtime = os.stat(path).st_mtime - seconds
+        os.utime(path, (mtime, mtime))
+
+
+def test_png_is_default_format():
+    if "MUZI_FIRST_FRAME_CACHE" in os.environ:
+        pytest.skip("环境变量覆盖了默认格式")
+    assert FirstFrameCache.mode == "png"
+
+
+def test_hit_returns_same_frame_without_decoding(cache, tmp_path):
+    (video,) = make_videos(tmp_path, 1)
+    first = cache.get(video)
+    second = cache.get(video)
+
+    assert np.array_equal(first, second)
+    assert cache.decoded == ["clip0.mp4"]
+    assert all(name.endswith(".png") for name in cache_files(cache))
+
+
+def test_budget_evicts_least_recently_used(cache, tmp_path, monkeypatch):
+    videos = make_videos(tmp_path, 4)
+    cache.get(videos[0])
+    entry_size = os.path.getsize(os.path.join(cache.cache_dir, cache_files(cache)[0]))
+    monkeypatch.setattr(cache, "max_bytes", int(entry_size * 2.5))
+
+    cache.get(videos[1])
+    backdate(cache, 100)
+    # 命中clip0，刷新其修改时间；写入clip2时应清理最久未用的clip1
+    cache.get(videos[0])
+    cache.get(videos[2])
+
+    assert cache.decoded == ["clip0.mp4", "clip1.mp4", "clip2.mp4"]
+    assert len(cache_files(cache)) == 2
+    cache.get(videos[0])
+    cache.get(videos[2])
+    assert cache.decoded == ["clip0.mp4", "clip1.mp4", "clip2.mp4"]
+    cache.get(videos[1])
+    assert cache.decoded[-1] == "clip1.mp4"
+
+
+def test_entries_of_deleted_videos_are_eventually_evicted(cache, tmp_path, monkeypatch):
+    videos = make_videos(tmp_path, 6)
+    for video in videos[:3]:
+        cache.get(video)
+    old_entries = set(cache_files(cache))
+    for video in videos[:3]:
+        os.remove(video)
+    backdate(cache, 100)
+    entry_size = os.path.getsize(os.path.join(cache.cache_dir, cache_files(cache)[0]))
+    monkeypatch.setattr(cache, "max_bytes", int(entry_size * 3.5))
+
+    for video in videos[3:]:
+        cache.get(video)
+
+    assert not old_entries & set(cache_files(cache))
+    assert len(cache_files(cache)) == 3
+
+
+def test_zero_budget_keeps_everything(cache, tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, "max_bytes", 0)
+    for video in make_videos(tmp_path, 3):
+        cache.get(video)
+    assert len(cache_files(cache)) == 3
@@ -0,0 +1,54 @@
+"""
+目录索引的inotify增量更新测试(仅Linux)
+"""
+import os
+import sys
+
+import pytest
+
+from conftest import load_plugin_module
+
+image_utils = load_plugin_module("image_utils")
+
+pytestmark = pytest.mark.skipif(
+    sys.platform != "linux" or image_utils._Inotify._ensure() is None, reason="需要inotify"
+)
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = image_utils.DirectoryIndex.get(str(tmp_path))
+    assert index.files() == []
+    return index
+
+
+def test_file_added_only_after_write_completes(index, tmp_path):
+    path = tmp_path / "a.png"
+    with open(path, "wb") as f:
+        f.write(b"\x89PNG")
+        f.flush()
+        # 其他流程仍在写入：不能出现在索引中
+        assert index.files() == []
+
+    assert index.files() == [str(path)]
+    assert index.full_scans == 1
+
+
+def test_file_moved_in_is_added(index, tmp_path):
+    source = tmp_path / "incoming.tmp"
+    source.write_bytes(b"\x89PNG")
+    os.replace(source, tmp_path / "b.png")
+
+    assert index.files() == [str(tmp_path / "b.png")]
+    assert index.full_scans == 1
+
+
+def test_pending_events_are_capped(index, tmp_path, monkeypatch):
+    monkeypatch.setattr(image_utils._Inotify, "MAX_PENDING_EVENTS", 8)
+    names = [f"{i:03d}.png" for i in range(20)]
+    for name in names:
+        (tmp_path / name).write_bytes(b"\x89PNG")
+
+    # 超过上限后不再累积事件，refresh改为完整比对
+    assert index.files() == [str(tmp_path / name) for name in names]
+    assert index.full_scans == 2
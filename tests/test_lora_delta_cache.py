@@ -0,0 +1,102 @@
+"""
+Lora融合增量缓存的磁盘预算清理与并发写入测试
+"""
+import os
+import threading
+
+import pytest
+import torch
+
+
+@pytest.fixture
+def delta_cache(plugin_nodes, tmp_path, monkeypatch):
+    lora_dir = tmp_path / "loras"
+    lora_dir.mkdir()
+    monkeypatch.setattr(plugin_nodes.LoraDownloader, "get_lora_dir", classmethod(lambda c: str(lora_dir)))
+    return plugin_nodes.LoraDeltaCache
+
+
+def write_entry(cache_dir, name, nbytes, mtime):
+    path = os.path.join(cache_dir, name)
+    with open(path, "wb") as f:
+        f.write(b"\0" * nbytes)
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_budget_evicts_least_recently_used(delta_cache, monkeypatch):
+    monkeypatch.setattr(delta_cache, "max_bytes", 2500)
+    cache_dir = delta_cache.get_cache_dir()
+    oldest = write_entry(cache_dir, "a.safetensors", 1000, 1000)
+    middle = write_entry(cache_dir, "b.safetensors", 1000, 2000)
+    # keep 虽然最旧，但它是刚写入的文件，不能被删
+    keep = write_entry(cache_dir, "c.safetensors", 1000, 500)
+    stale_tmp = write_entry(cache_dir, "d.safetensors.x.tmp", 1000, 1)
+
+    delta_cache.enforce_budget(keep=keep)
+
+    assert not os.path.exists(oldest)
+    assert os.path.exists(middle)
+    assert os.path.exists(keep)
+    assert not os.path.exists(stale_tmp)
+
+
+def test_zero_budget_keeps_everything(delta_cache, monkeypatch):
+    monkeypatch.setattr(delta_cache, "max_bytes", 0)
+    cache_dir = delta_cache.get_cache_dir()
+    paths = [write_entry(cache_dir, f"{i}.safetensors", 1000, 1000 + i) for i in range(3)]
+
+    delta_cache.enforce_budget()
+
+    assert all(os.path.exists(path) for path in paths)
+
+
+def test_concurrent_writers_of_same_key(delta_cache, plugin_nodes, tmp_path, monkeypatch):
+    """多个线程同时写同一个键：各自使用独立的临时文件，最终文件完整可读"""
+    path = os.path.join(delta_cache.get_cache_dir(), "same_key.safetensors")
+    lora_path = str(tmp_path / "lora.safetensors")
+    deltas = {"w": torch.ones(256, 256, dtype=torch.float16)}
+    tmp_paths = []
+    errors = []
+
+    monkeypatch.setattr(delta_cache, "cache_path", classmethod(lambda cls, *args: path))
+    monkeypatch.setattr(plugin_nodes.LoraStateDictCache, "get", classmethod(lambda cls, p, loader=None: {}))
+    monkeypatch.setattr(plugin_nodes, "convert_lora", None)
+    monkeypatch.setattr(plugin_nodes, "build_lora_key_map", lambda model, clip: {})
+    monkeypatch.setattr(plugin_nodes.comfy.lora, "load_lora", lambda lora, key_map: {}, raising=False)
+    monkeypatch.setattr(delta_cache, "compute_deltas", staticmethod(lambda patcher, loaded, strength: deltas))
+
+    save_file = plugin_nodes.safetensors.torch.save_file
+    barrier = threading.Barrier(4)
+
+    def slow_save(tensors, filename, metadata=None):
+        tmp_paths.append(filename)
+        barrier.wait(timeout=10)
+        save_file(tensors, filename, metadata=metadata)
+
+    monkeypatch.setattr(plugin_nodes.safetensors.torch, "save_file", slow_save)
+
+    class Model:
+        def add_patches(self, patches, strength):
+            pass
+
+        def clone(self):
+            return Model()
+
+    def worker():
+        try:
+            delta_cache.apply(Model(), None, lora_path, "lora.safetensors", 1.0)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert len(set(tmp_paths)) == 4
+    assert sorted(os.listdir(os.path.dirname(path))) == ["same_key.safetensors"]
+    loaded = plugin_nodes.safetensors.torch.load_file(path)
+    assert torch.equal(loaded["model::w"], deltas["w"])
@@ -0,0 +1,311 @@
+"""
+Lora下载器的断点续传、并行分段、坏文件丢弃与镜像竞速测试
+使用本地http.server作为下载源：支持Range请求，可注入断流、首字节延迟和限速
+"""
+import os
+import json
+import time
+import types
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+import torch
+import safetensors.torch
+
+HEADERS = {'User-Agent': 'pytest'}
+
+
+class MirrorServer:
+    """
+    本地下载源
+    - cut_after/cut_responses: 前cut_responses个响应体(不含1字节探测)发送cut_after字节后直接断开连接
+    - latency: 每个响应开始前的等待秒数；bytes_per_sec: 限速
+    - bad_etag_responses: 前N个响应体在x-linked-etag中给出错误的sha256
+    """
+    def __init__(self, payload):
+        self.payload = payload
+        self.sha256 = hashlib.sha256(payload).hexdigest()
+        self.cut_after = None
+        self.cut_responses = 0
+        self.latency = 0.0
+        self.bytes_per_sec = None
+        self.bad_etag_responses = 0
+        self.ranges = []  # 每个请求的Range头(没有时为None)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self._server.server_address[1]}/lora.safetensors"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def body_ranges(self):
+        """去掉1字节探测后的Range头"""
+        return [r for r in self.ranges if r != "bytes=0-0"]
+
+    def _take(self, attr):
+        with self._lock:
+            remaining = getattr(self, attr)
+            if remaining > 0:
+                setattr(self, attr, remaining - 1)
+                return True
+            return False
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                total = len(server.payload)
+                range_header = self.headers.get("Range")
+                with server._lock:
+                    server.ranges.append(range_header)
+                if server.latency:
+                    threading.Event().wait(server.latency)
+
+                start, end = 0, total - 1
+                if range_header:
+                    first, _, last = range_header[len("bytes="):].partition("-")
+                    start = int(first)
+                    end = min(int(last), total - 1) if last else total - 1
+                    if start >= total:
+                        self.send_response(416)
+                        self.send_header("Content-Range", f"bytes */{total}")
+                        self.send_header("Content-Length", "0")
+                        self.end_headers()
+                        return
+
+                body = server.payload[start:end + 1]
+                is_body = len(body) > 1
+                self.send_response(206 if range_header else 200)
+                if range_header:
+                    self.send_header("Content-Range", f"bytes {start}-{end}/{total}")
+                self.send_header("Content-Length", str(len(body)))
+                etag = server.sha256
+                if is_body and server._take("bad_etag_responses"):
+                    etag = "0" * 64
+                self.send_header("x-linked-etag", f'"{etag}"')
+                self.end_headers()
+
+                limit = len(body)
+                if is_body and server.cut_after is not None and server._take("cut_responses"):
+                    limit = min(limit, server.cut_after)
+                sent = 0
+                while sent < limit:
+                    chunk = body[sent:min(sent + 64 * 1024, limit)]
+                    self.wfile.write(chunk)
+                    sent += len(chunk)
+                    if server.bytes_per_sec:
+                        threading.Event().wait(len(chunk) / server.bytes_per_sec)
+                if limit < len(body):
+                    # 模拟网络中断：响应体未发完就关闭连接
+                    self.wfile.flush()
+                    self.close_connection = True
+                    self.connection.shutdown(2)
+
+        return Handler
+
+
+def make_payload(path, megabytes):
+    """生成一个合法的safetensors文件作为下载内容"""
+    numel = megabytes * 1024 * 1024 // 4
+    safetensors.torch.save_file({"weight": torch.randn(numel)}, str(path))
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def file_sha256(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+@pytest.fixture
+def downloader(plugin_nodes, tmp_path, monkeypatch):
+    """下载目录指向临时目录，重试不等待"""
+    lora_dir = tmp_path / "loras"
+    lora_dir.mkdir()
+    cls = plugin_nodes.LoraDownloader
+    monkeypatch.setattr(cls, "get_lora_dir", classmethod(lambda c: str(lora_dir)))
+    monkeypatch.setattr(cls, "parallel_connections", 1)
+    monkeypatch.setattr(
+        plugin_nodes, "time",
+        types.SimpleNamespace(time=time.time, strftime=time.strftime, sleep=lambda seconds: None),
+    )
+    return cls
+
+
+@pytest.fixture(scope="module")
+def payload(tmp_path_factory):
+    return make_payload(tmp_path_factory.mktemp("src") / "lora.safetensors", 3)
+
+
+def test_single_stream_resumes_from_part(downloader, payload, tmp_path):
+    part_path = str(tmp_path / "loras" / "lora.safetensors.part")
+    with MirrorServer(payload) as server:
+        server.cut_after = 1024 * 1024
+        server.cut_responses = 1
+        with pytest.raises(requests.exceptions.RequestException):
+            downloader._fetch(server.url, part_path, "lora.safetensors", HEADERS, 10)
+        resumed = os.path.getsize(part_path)
+        assert 0 < resumed < len(payload)
+
+        total, digest, expected, transferred = downloader._fetch(
+            server.url, part_path, "lora.safetensors", HEADERS, 10
+        )
+
+    assert server.ranges == [None, f"bytes={resumed}-"]
+    assert total == len(payload)
+    assert transferred == len(payload) - resumed
+    assert digest == expected == hashlib.sha256(payload).hexdigest()
+    with open(part_path, "rb") as f:
+        assert f.read() == payload
+
+
+def test_parallel_resumes_segments_from_state(downloader, payload, tmp_path, monkeypatch):
+    monkeypatch.setattr(downloader, "parallel_connections", 4)
+    monkeypatch.setattr(downloader, "min_segment_size", 256 * 1024)
+    monkeypatch.setattr(downloader, "chunk_size", 64 * 1024)
+    part_path = str(tmp_path / "loras" / "lora.safetensors.part")
+    state_path = part_path + ".json"
+
+    with MirrorServer(payload) as server:
+        server.cut_after = 256 * 1024
+        server.cut_responses = 4
+        with pytest.raises(requests.exceptions.RequestException):
+            downloader._fetch(server.url, part_path, "lora.safetensors", HEADERS, 10)
+        with open(state_path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+        assert os.path.getsize(part_path) == len(payload)
+        assert len(state["segments"]) == 4
+        assert 0 < sum(state["done"]) < len(payload)
+
+        server.ranges.clear()
+        total, digest, expected, transferred = downloader._fetch(
+            server.url, part_path, "lora.safetensors", HEADERS, 10
+        )
+
+    # 第二次只请求各段未完成的部分
+    expected_ranges = {
+        f"bytes={start + done}-{end}"
+        for (start, end), done in zip(state["segments"], state["done"])
+        if start + done <= end
+    }
+    assert set(server.body_ranges()) == expected_ranges
+    assert not os.path.exists(state_path)
+    assert total == len(payload)
+    assert transferred == len(payload) - sum(state["done"])
+    assert digest == expected == hashlib.sha256(payload).hexdigest()
+    with open(part_path, "rb") as f:
+        assert f.read() == payload
+
+
+def test_part_discarded_after_416(downloader, payload, tmp_path):
+    lora_path = tmp_path / "loras" / "lora.safetensors"
+    part_path = str(lora_path) + ".part"
+    # 比源文件还长的残留.part，续传位置越界
+    with open(part_path, "wb") as f:
+        f.write(b"\0" * (len(payload) + 10))
+
+    with MirrorServer(payload) as server:
+        result = downloader.download_lora(server.url, "lora.safetensors")
+
+    body_ranges = server.body_ranges()
+    assert body_ranges[0] == f"bytes={len(payload) + 10}-"
+    assert body_ranges[1] is None  # 丢弃.part后从头下载
+    assert result == str(lora_path)
+    assert not os.path.exists(part_path)
+    assert file_sha256(lora_path) == hashlib.sha256(payload).hexdigest()
+    assert downloader.get_manifest().get("lora.safetensors")["sha256"] == hashlib.sha256(payload).hexdigest()
+
+
+def test_part_discarded_after_sha256_mismatch(downloader, payload, tmp_path):
+    lora_path = tmp_path / "loras" / "lora.safetensors"
+    part_path = str(lora_path) + ".part"
+
+    with MirrorServer(payload) as server:
+        server.bad_etag_responses = 1
+        result = downloader.download_lora(server.url, "lora.safetensors")
+
+    # 第一次下载完整但sha256不符，.part被丢弃，第二次不带Range从头下载
+    assert server.body_ranges()[:2] == [None, None]
+    assert result == str(lora_path)
+    assert not os.path.exists(part_path)
+    with open(lora_path, "rb") as f:
+        assert f.read() == payload
+
+
+def test_slow_mirror_loses_race(downloader, payload, tmp_path):
+    part_path = str(tmp_path / "loras" / "lora.safetensors.part")
+    with MirrorServer(payload) as fast, MirrorServer(payload) as slow:
+        slow.latency = 1.5
+        slow.bytes_per_sec = 256 * 1024
+        # 慢源在历史记录中更快，也只在宽限时间内等它
+        stats = downloader.get_mirror_stats()
+        stats.record(slow.url, 100 * 1024 * 1024)
+        stats.record(fast.url, 1024)
+
+        ranked = downloader._race_mirrors([slow.url, fast.url], HEADERS)
+        assert ranked == [fast.url, slow.url]
+
+        total, digest, _, transferred = downloader._fetch(ranked[0], part_path, "lora.safetensors", HEADERS, 10)
+
+    assert fast.body_ranges() == [None]
+    assert slow.body_ranges() == []
+    assert total == transferred == len(payload)
+    assert digest == hashlib.sha256(payload).hexdigest()
+    with open(part_path, "rb") as f:
+        assert f.read() == payload
+
+
+@pytest.mark.parametrize("connections", [1, 4])
+def test_throughput_counts_transferred_bytes(downloader, plugin_nodes, payload, tmp_path, monkeypatch, connections):
+    """续传后记录的吞吐量按本次实际传输的字节计算，而不是总大小减去.part的大小"""
+    monkeypatch.setattr(downloader, "parallel_connections", connections)
+    monkeypatch.setattr(downloader, "min_segment_size", 256 * 1024)
+    monkeypatch.setattr(downloader, "chunk_size", 64 * 1024)
+    recorded = []
+    monkeypatch.setattr(downloader, "_race_mirrors", classmethod(lambda cls, urls, headers: urls[-1:]))
+    monkeypatch.setattr(
+        downloader, "get_mirror_stats",
+        classmethod(lambda cls: types.SimpleNamespace(record=lambda url, bps: recorded.append(bps))),
+    )
+    transferred = []
+    fetch = downloader._fetch.__func__
+
+    def counting_fetch(cls, *args):
+        result = fetch(cls, *args)
+        transferred.append(result[3])
+        return result
+
+    monkeypatch.setattr(downloader, "_fetch", classmethod(counting_fetch))
+    # download_lora中开始/结束各取一次时间，耗时固定为2秒
+    clock = iter([0.0, 2.0])
+    monkeypatch.setattr(plugin_nodes.time, "time", lambda: next(clock, 2.0))
+
+    with MirrorServer(payload) as server:
+        server.cut_after = 256 * 1024
+        server.cut_responses = connections
+        with pytest.raises(requests.exceptions.RequestException):
+            downloader._fetch(server.url, str(tmp_path / "loras" / "lora.safetensors.part"),
+                              "lora.safetensors", HEADERS, 10)
+        transferred.clear()
+        result = downloader.download_lora(server.url, "lora.safetensors")
+
+    assert result == str(tmp_path / "loras" / "lora.safetensors")
+    assert 0 < transferred[0] < len(payload)
+    assert recorded == [transferred[0] / 2.0]
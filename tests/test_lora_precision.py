@@ -0,0 +1,113 @@
+"""
+Lora精度压缩缓存测试：由fp32的safetensors生成fp16/bf16旁路文件，并与原文件比对误差
+"""
+import os
+
+import pytest
+import torch
+import safetensors.torch
+
+# 允许的最大误差(相对于各张量的最大绝对值)：fp16有10位尾数，bf16只有7位
+TOLERANCE = {"fp16": 1e-3, "bf16": 1e-2}
+DTYPE = {"fp16": torch.float16, "bf16": torch.bfloat16}
+
+
+@pytest.fixture
+def precision_cache(plugin_nodes, tmp_path, monkeypatch):
+    lora_dir = tmp_path / "loras"
+    lora_dir.mkdir()
+    monkeypatch.setattr(plugin_nodes.LoraDownloader, "get_lora_dir", classmethod(lambda c: str(lora_dir)))
+    return plugin_nodes.LoraPrecisionCache
+
+
+@pytest.fixture
+def source(tmp_path):
+    """模拟Lora的fp32文件：不同数量级的up/down矩阵、alpha标量和一个整数张量"""
+    generator = torch.Generator().manual_seed(0)
+    tensors = {
+        "lora_unet_a.lora_up.weight": torch.randn(64, 8, generator=generator) * 1e-2,
+        "lora_unet_a.lora_down.weight": torch.randn(8, 64, generator=generator),
+        "lora_unet_a.alpha": torch.tensor(8.0),
+        "lora_te_b.lora_up.weight": torch.randn(32, 4, generator=generator) * 50,
+        "lora_te_b.lora_down.weight": torch.randn(4, 32, generator=generator) * 1e-3,
+        "index": torch.arange(10, dtype=torch.int64),
+    }
+    path = tmp_path / "loras" / "style.safetensors"
+    path.parent.mkdir(exist_ok=True)
+    safetensors.torch.save_file(tensors, str(path), metadata={"ss_network_dim": "8"})
+    return str(path), tensors
+
+
+def max_relative_error(original, converted):
+    worst = 0.0
+    for key, tensor in original.items():
+        if not tensor.is_floating_point():
+            continue
+        reference = tensor.double()
+        scale = reference.abs().max().item() or 1.0
+        worst = max(worst, (converted[key].double() - reference).abs().max().item() / scale)
+    return worst
+
+
+@pytest.mark.parametrize("precision", ["fp16", "bf16"])
+def test_sidecar_matches_source_within_tolerance(precision_cache, source, monkeypatch, precision):
+    monkeypatch.setattr(precision_cache, "precision", precision)
+    path, original = source
+
+    compact_path = precision_cache.resolve(path)
+
+    assert compact_path == os.path.join(precision_cache.get_cache_dir(), f"style.{precision}.safetensors")
+    converted = safetensors.torch.load_file(compact_path)
+    assert set(converted) == set(original)
+    for key, tensor in original.items():
+        expected_dtype = DTYPE[precision] if tensor.is_floating_point() else tensor.dtype
+        assert converted[key].dtype == expected_dtype
+        assert converted[key].shape == tensor.shape
+    assert torch.equal(converted["index"], original["index"])
+    assert max_relative_error(original, converted) <= TOLERANCE[precision]
+
+    with safetensors.safe_open(compact_path, framework="pt") as f:
+        metadata = f.metadata()
+    assert metadata["ss_network_dim"] == "8"
+    assert metadata["precision"] == precision
+    # 默认不在生成时比对
+    assert "max_relative_error" not in metadata
+
+
+def test_sidecar_reused_until_source_changes(precision_cache, source, monkeypatch):
+    monkeypatch.setattr(precision_cache, "precision", "fp16")
+    path, original = source
+    compact_path = precision_cache.resolve(path)
+    built_at = os.stat(compact_path).st_mtime_ns
+
+    assert precision_cache.resolve(path) == compact_path
+    assert os.stat(compact_path).st_mtime_ns == built_at
+
+    safetensors.torch.save_file({k: v * 2 for k, v in original.items()}, path)
+    os.utime(path, ns=(built_at + 10**9, built_at + 10**9))
+    assert precision_cache.resolve(path) == compact_path
+    rebuilt = safetensors.torch.load_file(compact_path)
+    assert torch.allclose(rebuilt["lora_unet_a.alpha"].float(), torch.tensor(16.0))
+
+
+def test_optional_guard_falls_back_to_source(precision_cache, source, monkeypatch):
+    monkeypatch.setattr(precision_cache, "precision", "bf16")
+    monkeypatch.setattr(precision_cache, "verify", True)
+    path, _ = source
+
+    # bf16的实际误差在容差内，通过检查并写入元数据
+    compact_path = precision_cache.resolve(path)
+    with safetensors.safe_open(compact_path, framework="pt") as f:
+        assert float(f.metadata()["max_relative_error"]) <= TOLERANCE["bf16"]
+    os.remove(compact_path)
+
+    # 容差收紧到bf16达不到的程度时继续使用原文件
+    monkeypatch.setattr(precision_cache, "MAX_RELATIVE_ERROR", {"fp16": 1e-3, "bf16": 1e-6})
+    assert precision_cache.resolve(path) == path
+    assert not os.path.exists(compact_path)
+
+
+def test_unsupported_precision_uses_source(precision_cache, source, monkeypatch):
+    monkeypatch.setattr(precision_cache, "precision", "")
+    path, _ = source
+    assert precision_cache.resolve(path) == path
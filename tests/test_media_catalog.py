@@ -0,0 +1,131 @@
+"""
+媒体目录测试：无筛选时不探测；归档内的图片只读取成员开头，压缩tar只解压一遍
+"""
+import io
+import os
+import tarfile
+import zipfile
+
+import pytest
+from PIL import Image
+
+from conftest import load_plugin_module
+
+image_utils = load_plugin_module("image_utils")
+media_catalog = load_plugin_module("media_catalog")
+MediaCatalog = media_catalog.MediaCatalog
+
+
+@pytest.fixture(autouse=True)
+def isolated_catalog(tmp_path, monkeypatch):
+    monkeypatch.setattr(MediaCatalog, "db_path", str(tmp_path / "cache" / "media_catalog.sqlite3"))
+    monkeypatch.setattr(MediaCatalog, "_conn", None)
+    monkeypatch.setattr(MediaCatalog, "_synced", {})
+    monkeypatch.setattr(image_utils.ArchiveIndex, "cache_dir", str(tmp_path / "cache" / "archives"))
+    # 不启动后台同步线程，由测试直接调用_sync_directory或view中的补探测
+    monkeypatch.setattr(MediaCatalog, "sync", classmethod(lambda cls, index, kind: None))
+    yield
+    if MediaCatalog._conn is not None:
+        MediaCatalog._conn.close()
+
+
+def png_bytes(width, height, noise=False):
+    image = Image.frombytes("RGB", (width, height), os.urandom(width * height * 3)) if noise \
+        else Image.new("RGB", (width, height))
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def member_sizes(count):
+    """交替生成横图和竖图"""
+    return [(f"{i:04d}.png", (40, 20) if i % 2 else (20, 40)) for i in range(count)]
+
+
+def write_tar(path, members, mode):
+    with tarfile.open(path, mode) as archive:
+        for name, (width, height) in members:
+            data = png_bytes(width, height)
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+
+
+def test_unfiltered_view_skips_refresh_and_sync(tmp_path, monkeypatch):
+    (tmp_path / "a.png").write_bytes(png_bytes(4, 4))
+    index = image_utils.DirectoryIndex.get(str(tmp_path))
+    monkeypatch.setattr(MediaCatalog, "sync", classmethod(lambda cls, index, kind: pytest.fail("不应同步")))
+
+    assert MediaCatalog.view(index, "image") is index
+    assert index.full_scans == 0
+
+
+def test_compressed_tar_probed_in_one_pass(tmp_path, monkeypatch):
+    members = member_sizes(60)
+    archive_path = str(tmp_path / "images.tar.gz")
+    write_tar(archive_path, members, "w:gz")
+    index = image_utils.get_image_index(archive_path)
+    index.refresh()
+
+    opened = []
+    tar_open = tarfile.open
+
+    def counting_open(*args, **kwargs):
+        opened.append(kwargs.get("mode", "r"))
+        return tar_open(*args, **kwargs)
+
+    monkeypatch.setattr(image_utils.tarfile, "open", counting_open)
+    monkeypatch.setattr(index, "read", lambda path, limit=None: pytest.fail("不应逐个读取成员"))
+
+    probed, removed = MediaCatalog._sync_directory(index, "image")
+
+    assert (probed, removed) == (60, 0)
+    assert opened == ["r|*"]
+    for name, (width, height) in members:
+        info = MediaCatalog.lookup(os.path.join(archive_path, name))
+        assert (info["width"], info["height"]) == (width, height)
+
+    view = MediaCatalog.view(index, "image", "portrait")
+    assert view.files() == [os.path.join(archive_path, name) for name, (w, h) in members if h > w]
+
+
+@pytest.mark.parametrize("suffix", [".zip", ".tar"])
+def test_archive_members_probed_from_header_prefix(tmp_path, monkeypatch, suffix):
+    # 大于探测长度的图片，只读取开头部分
+    large = png_bytes(600, 400, noise=True)
+    assert len(large) > media_catalog.PROBE_HEADER_BYTES
+    archive_path = str(tmp_path / f"images{suffix}")
+    if suffix == ".zip":
+        with zipfile.ZipFile(archive_path, "w") as archive:
+            archive.writestr("large.png", large)
+    else:
+        with tarfile.open(archive_path, "w") as archive:
+            info = tarfile.TarInfo("large.png")
+            info.size = len(large)
+            archive.addfile(info, io.BytesIO(large))
+    index = image_utils.get_image_index(archive_path)
+
+    limits = []
+    read = index.read
+
+    def recording_read(path, limit=None):
+        limits.append(limit)
+        return read(path, limit)
+
+    monkeypatch.setattr(index, "read", recording_read)
+    view = MediaCatalog.view(index, "image", "landscape")
+
+    assert view.files() == [os.path.join(archive_path, "large.png")]
+    assert limits == [media_catalog.PROBE_HEADER_BYTES]
+
+
+def test_header_beyond_prefix_falls_back_to_full_member(tmp_path, monkeypatch):
+    monkeypatch.setattr(media_catalog, "PROBE_HEADER_BYTES", 16)
+    archive_path = str(tmp_path / "images.zip")
+    with zipfile.ZipFile(archive_path, "w") as archive:
+        archive.writestr("a.png", png_bytes(30, 10))
+    index = image_utils.get_image_index(archive_path)
+
+    view = MediaCatalog.view(index, "image", "landscape")
+
+    assert view.files() == [os.path.join(archive_path, "a.png")]
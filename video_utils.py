@@ -0,0 +1,533 @@
+"""
+视频工具（不依赖ComfyUI）
+- 视频首帧的磁盘缓存：按(路径, 修改时间, 大小)保存解码后的首帧，命中时只需读一个文件，
+  不再打开容器和初始化解码器
+- 视频帧索引：每帧的显示时间戳和关键帧位置，建立一次后持久化；按时间/序号随机取帧时
+  只需一次跳转加最多一个GOP的解码
+
+命令行用法:
+    python video_utils.py first-frames /path/to/vdata    # 批量预热目录中视频的首帧缓存
+    python video_utils.py frame-index video.mp4 --sample 8    # 建立帧索引并均匀取帧
+"""
+import os
+import sys
+import glob
+import time
+import bisect
+import shutil
+import struct
+import argparse
+import hashlib
+import tempfile
+import threading
+import subprocess
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+import torch
+
+PLUGIN_DIR = os.path.dirname(os.path.realpath(__file__))
+
+VIDEO_EXTENSIONS = ('.mp4', '.mov', '.avi', '.mkv', '.webm')
+
+# moov盒子大小上限，防止损坏文件导致读入超大数据
+MAX_MOOV_BYTES = 64 * 1024 * 1024
+
+# ISO BMFF(mp4/mov)文件开头常见的盒子类型
+_MP4_TOP_BOXES = (b"ftyp", b"moov", b"mdat", b"free", b"wide", b"skip")
+
+# 首帧缓存格式：png为无损压缩(默认，占用磁盘少)，npy为原始uint8数组(读取最快，1080p每个约6MB)
+FIRST_FRAME_FORMATS = ("npy", "png")
+
+
+# ======== mp4容器头部 ========
+def iter_mp4_boxes(data, start, end):
+    """遍历data[start:end]中的盒子，返回(类型, 内容起点, 内容终点)"""
+    pos = start
+    while pos + 8 <= end:
+        size, kind = struct.unpack_from(">I4s", data, pos)
+        header = 8
+        if size == 1:
+            if pos + 16 > end:
+                return
+            size = struct.unpack_from(">Q", data, pos + 8)[0]
+            header = 16
+        elif size == 0:
+            size = end - pos
+        if size < header or pos + size > end:
+            return
+        yield kind, pos + header, pos + size
+        pos += size
+
+
+def read_mp4_moov(path):
+    """跳过mdat等大盒子，只读出moov盒子的内容"""
+    with open(path, "rb") as f:
+        file_size = os.fstat(f.fileno()).st_size
+        pos = 0
+        while pos + 8 <= file_size:
+            f.seek(pos)
+            head = f.read(16)
+            size, kind = struct.unpack(">I4s", head[:8])
+            header = 8
+            if pos == 0 and kind not in _MP4_TOP_BOXES:
+                return None
+            if size == 1:
+                size = struct.unpack(">Q", head[8:16])[0]
+                header = 16
+            elif size == 0:
+                size = file_size - pos
+            if size < header:
+                return None
+            if kind == b"moov":
+                if size > MAX_MOOV_BYTES:
+                    return None
+                f.seek(pos + header)
+                return f.read(size - header)
+            pos += size
+    return None
+
+
+def read_first_frame(path, gpu_acceleration=False):
+    """用OpenCV解码视频第一帧，返回RGB uint8数组[H,W,3]"""
+    if gpu_acceleration and torch.cuda.is_available():
+        cap = cv2.VideoCapture(path, cv2.CAP_ANY)
+        cap.set(cv2.CAP_PROP_HW_ACCELERATION, cv2.VIDEO_ACCELERATION_ANY)
+    else:
+        cap = cv2.VideoCapture(path)
+    try:
+        success, frame = cap.read()
+    finally:
+        cap.release()
+    if not success:
+        raise ValueError(f"无法读取视频首帧: {path}")
+    return cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+
+
+def frame_to_tensor(frame):
+    """RGB uint8数组 -> ComfyUI图像张量[1,H,W,3]"""
+    return torch.from_numpy(frame.astype(np.float32) / 255.0).unsqueeze(0)
+
+
+class FirstFrameCache:
+    """
+    视频首帧的磁盘缓存（进程级单例，全部为类方法）
+    - 缓存文件名包含视频完整路径的哈希、修改时间和大小，视频被替换后自动失效，旧文件在写入新缓存时删除
+    - MUZI_FIRST_FRAME_CACHE 选择格式: png(默认) / npy，设为0关闭缓存
+    - 按磁盘预算做LRU清理（命中时刷新修改时间），已删除/移走的视频的缓存也会被清理，
+      预算可用环境变量MUZI_FIRST_FRAME_CACHE_MB配置(0为不限制)
+    """
+    cache_dir = os.path.join(PLUGIN_DIR, ".cache", "first_frames")
+    mode = os.environ.get("MUZI_FIRST_FRAME_CACHE", "png").lower()
+    max_bytes = int(float(os.environ.get("MUZI_FIRST_FRAME_CACHE_MB", "1024")) * 1024 * 1024)
+    stale_tmp_seconds = 3600  # 超过该时间的临时文件视为中断写入的残留
+    hits = 0
+    misses = 0
+    evictions = 0
+    _lock = threading.Lock()
+
+    @classmethod
+    def _entry(cls, path, stat):
+        digest = hashlib.sha1(os.path.realpath(path).encode("utf-8")).hexdigest()[:16]
+        name = f"{digest}_{stat.st_mtime_ns}_{stat.st_size}.{cls.mode}"
+        return os.path.join(cls.cache_dir, name), digest
+
+    @classmethod
+    def _read(cls, entry):
+        if cls.mode == "npy":
+            return np.load(entry)
+        frame = cv2.imdecode(np.fromfile(entry, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if frame is None:
+            raise ValueError(f"缓存文件已损坏: {entry}")
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+
+    @classmethod
+    def _store(cls, entry, digest, frame):
+        tmp_path = None
+        try:
+            os.makedirs(cls.cache_dir, exist_ok=True)
+            # 唯一的临时文件，多个线程/进程同时写同一个视频的缓存互不干扰
+            fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(entry) + ".", suffix=".tmp", dir=cls.cache_dir)
+            with os.fdopen(fd, "wb") as f:
+                if cls.mode == "npy":
+                    np.save(f, np.ascontiguousarray(frame))
+                else:
+                    f.write(cv2.imencode(".png", cv2.cvtColor(frame, cv2.COLOR_RGB2BGR))[1].tobytes())
+            os.replace(tmp_path, entry)
+            tmp_path = None
+            # 同一视频旧版本(修改时间/大小不同)的缓存
+            for stale in glob.glob(os.path.join(cls.cache_dir, f"{digest}_*")):
+                if stale != entry and not stale.endswith(".tmp"):
+                    cls._remove(stale)
+            cls.enforce_budget(keep=entry)
+        except OSError as e:
+            print(f"[首帧缓存] 写入失败: {str(e)}")
+        finally:
+            if tmp_path is not None:
+                cls._remove(tmp_path)
+
+    @classmethod
+    def enforce_budget(cls, keep=None):
+        """按修改时间从旧到新删除缓存文件，直到总大小不超过预算；keep为刚写入的文件，不会被删除"""
+        now = time.time()
+        entries = []
+        with cls._lock:
+            try:
+                scanned = list(os.scandir(cls.cache_dir))
+            except FileNotFoundError:
+                return
+            for entry in scanned:
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                if entry.name.endswith(".tmp"):
+                    if now - stat.st_mtime > cls.stale_tmp_seconds:
+                        cls._remove(entry.path)
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+            if cls.max_bytes <= 0:
+                return
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= cls.max_bytes:
+                    break
+                if path == keep:
+                    continue
+                if cls._remove(path):
+                    total -= size
+                    cls.evictions += 1
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            # 其他进程已删除或文件正在被使用
+            return False
+
+    @classmethod
+    def get(cls, path, gpu_acceleration=False):
+        """返回视频首帧(RGB uint8数组)，命中缓存时不打开视频"""
+        if cls.mode not in FIRST_FRAME_FORMATS:
+            return read_first_frame(path, gpu_acceleration)
+        stat = os.stat(path)
+        entry, digest = cls._entry(path, stat)
+        try:
+            frame = cls._read(entry)
+            cls.hits += 1
+            # 刷新修改时间，作为LRU清理的依据
+            try:
+                os.utime(entry)
+            except OSError:
+                pass
+            return frame
+        except (OSError, ValueError):
+            pass
+        cls.misses += 1
+        frame = read_first_frame(path, gpu_acceleration)
+        cls._store(entry, digest, frame)
+        return frame
+
+    @classmethod
+    def get_tensor(cls, path, gpu_acceleration=False):
+        return frame_to_tensor(cls.get(path, gpu_acceleration))
+
+
+# ======== 帧索引 ========
+def _collect_mp4_boxes(data, start, end, containers=(b"mdia", b"minf", b"stbl")):
+    """在trak内逐层展开容器盒子，返回{类型: (内容起点, 内容终点)}(同类型只取第一个)"""
+    found = {}
+    pending = [(start, end)]
+    while pending:
+        box_start, box_end = pending.pop()
+        for kind, s, e in iter_mp4_boxes(data, box_start, box_end):
+            if kind in containers:
+                pending.append((s, e))
+            else:
+                found.setdefault(kind, (s, e))
+    return found
+
+
+def _frame_table(timestamps, keyframe_mask):
+    """(解码顺序的时间戳, 是否关键帧) -> (显示顺序的时间戳(秒，从0开始), 关键帧的显示序号)"""
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    order = np.argsort(timestamps, kind="stable")
+    rank = np.empty(len(order), dtype=np.int64)
+    rank[order] = np.arange(len(order))
+    pts = timestamps[order] - timestamps[order[0]]
+    keyframes = np.sort(rank[np.asarray(keyframe_mask, dtype=bool)])
+    return pts, keyframes
+
+
+def _mp4_frame_table(path):
+    """从moov的样本表(stts/ctts/stss)读取第一条视频轨的帧时间戳和关键帧，不读取媒体数据"""
+    moov = read_mp4_moov(path)
+    if not moov:
+        return None
+    for kind, s, e in iter_mp4_boxes(moov, 0, len(moov)):
+        if kind != b"trak":
+            continue
+        boxes = _collect_mp4_boxes(moov, s, e)
+        if b"hdlr" not in boxes or moov[boxes[b"hdlr"][0] + 8:boxes[b"hdlr"][0] + 12] != b"vide":
+            continue
+        if b"mdhd" not in boxes or b"stts" not in boxes:
+            return None
+        mdhd = boxes[b"mdhd"][0]
+        if moov[mdhd] == 1:
+            timescale = struct.unpack_from(">I", moov, mdhd + 20)[0]
+        else:
+            timescale = struct.unpack_from(">I", moov, mdhd + 12)[0]
+        if not timescale:
+            return None
+
+        # stts: (样本数, 时长)表 -> 每个样本的解码时间
+        stts = boxes[b"stts"][0]
+        entries = np.frombuffer(moov, ">u4", 2 * struct.unpack_from(">I", moov, stts + 4)[0], stts + 8)
+        entries = entries.reshape(-1, 2).astype(np.int64)
+        deltas = np.repeat(entries[:, 1], entries[:, 0])
+        if not len(deltas):
+            return None
+        timestamps = np.concatenate(([0], np.cumsum(deltas)[:-1]))
+
+        # ctts: 显示时间相对解码时间的偏移(有B帧时存在)
+        if b"ctts" in boxes:
+            ctts = boxes[b"ctts"][0]
+            entries = np.frombuffer(moov, ">i4", 2 * struct.unpack_from(">I", moov, ctts + 4)[0], ctts + 8)
+            entries = entries.reshape(-1, 2).astype(np.int64)
+            offsets = np.repeat(entries[:, 1], entries[:, 0])
+            if len(offsets) == len(timestamps):
+                timestamps = timestamps + offsets
+
+        # stss: 关键帧样本号(从1开始)；没有stss表示每帧都是关键帧
+        keyframe_mask = np.ones(len(timestamps), dtype=bool)
+        if b"stss" in boxes:
+            stss = boxes[b"stss"][0]
+            sync = np.frombuffer(moov, ">u4", struct.unpack_from(">I", moov, stss + 4)[0], stss + 8).astype(np.int64)
+            sync = sync[(sync >= 1) & (sync <= len(timestamps))]
+            keyframe_mask[:] = False
+            keyframe_mask[sync - 1] = True
+        return _frame_table(timestamps / timescale, keyframe_mask)
+    return None
+
+
+def _ffprobe_frame_table(path):
+    """用ffprobe列出视频流的数据包(只解析容器，不解码)，取时间戳和关键帧标记"""
+    ffprobe = shutil.which("ffprobe")
+    if ffprobe is None:
+        return None
+    cmd = [
+        ffprobe, "-v", "error", "-select_streams", "v:0",
+        "-show_entries", "packet=pts_time,dts_time,flags", "-of", "csv=p=0", path,
+    ]
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError) as e:
+        print(f"[帧索引] ffprobe执行失败: {str(e)}")
+        return None
+    timestamps = []
+    keyframe_mask = []
+    for line in result.stdout.splitlines():
+        fields = line.strip().split(",")
+        if len(fields) < 3:
+            continue
+        pts_time, dts_time, flags = fields[:3]
+        value = pts_time if pts_time != "N/A" else dts_time
+        if value == "N/A":
+            continue
+        timestamps.append(float(value))
+        keyframe_mask.append("K" in flags)
+    if not timestamps:
+        return None
+    return _frame_table(timestamps, keyframe_mask)
+
+
+def _opencv_frame_table(path):
+    """只有容器给出的帧数和帧率时按恒定帧率推算时间戳，关键帧位置未知"""
+    cap = cv2.VideoCapture(path)
+    try:
+        if not cap.isOpened():
+            raise ValueError(f"无法打开视频: {path}")
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    finally:
+        cap.release()
+    if fps <= 0 or frame_count <= 0:
+        raise ValueError(f"无法获取视频帧数: {path}")
+    return np.arange(frame_count, dtype=np.float64) / fps, np.zeros(0, dtype=np.int64)
+
+
+class VideoFrameIndex:
+    """
+    单个视频的帧索引：按显示顺序的每帧时间戳(秒)和关键帧序号
+    - mp4/mov直接读取moov样本表；其他格式用ffprobe列出数据包；都不可用时按帧率推算(关键帧未知)
+    - 按(路径, 修改时间, 大小)持久化到插件.cache/frame_index，视频被替换后自动重建
+    - read_frames按帧序号排序后读取：目标帧之前有关键帧时直接跳转，否则从当前位置继续解码，
+      每帧最多解码一个GOP
+    """
+    cache_dir = os.path.join(PLUGIN_DIR, ".cache", "frame_index")
+    max_loaded = 64
+    _loaded = OrderedDict()  # 缓存文件路径 -> VideoFrameIndex
+
+    def __init__(self, pts, keyframes, source):
+        self.pts = pts
+        self.keyframes = keyframes
+        self.source = source
+        self.seeks = 0
+        self.decoded = 0
+
+    def __len__(self):
+        return len(self.pts)
+
+    @property
+    def fps(self):
+        if len(self.pts) < 2 or self.pts[-1] <= 0:
+            return 0.0
+        return (len(self.pts) - 1) / self.pts[-1]
+
+    @classmethod
+    def build(cls, path):
+        table = _mp4_frame_table(path)
+        source = "mp4"
+        if table is None:
+            table = _ffprobe_frame_table(path)
+            source = "ffprobe"
+        if table is None:
+            table = _opencv_frame_table(path)
+            source = "opencv"
+        return cls(table[0], table[1], source)
+
+    @classmethod
+    def get(cls, path):
+        """读取持久化的索引，不存在或视频已变化时重新建立"""
+        stat = os.stat(path)
+        digest = hashlib.sha1(os.path.realpath(path).encode("utf-8")).hexdigest()[:16]
+        entry = os.path.join(cls.cache_dir, f"{digest}_{stat.st_mtime_ns}_{stat.st_size}.npz")
+        index = cls._loaded.get(entry)
+        if index is not None:
+            cls._loaded.move_to_end(entry)
+            return index
+        try:
+            with np.load(entry) as data:
+                index = cls(data["pts"], data["keyframes"], str(data["source"]))
+        except (OSError, ValueError, KeyError):
+            start = time.perf_counter()
+            index = cls.build(path)
+            print(f"[帧索引] 已建立 {os.path.basename(path)}: {len(index)} 帧，{len(index.keyframes)} 个关键帧"
+                  f"（{index.source}，{(time.perf_counter() - start) * 1000:.0f}ms）")
+            try:
+                os.makedirs(cls.cache_dir, exist_ok=True)
+                tmp_path = entry + ".tmp"
+                with open(tmp_path, "wb") as f:
+                    np.savez(f, pts=index.pts, keyframes=index.keyframes, source=np.array(index.source))
+                os.replace(tmp_path, entry)
+                for stale in glob.glob(os.path.join(cls.cache_dir, f"{digest}_*")):
+                    if stale != entry:
+                        os.remove(stale)
+            except OSError as e:
+                print(f"[帧索引] 写入失败: {str(e)}")
+        cls._loaded[entry] = index
+        while len(cls._loaded) > cls.max_loaded:
+            cls._loaded.popitem(last=False)
+        return index
+
+    def index_at(self, seconds):
+        """该时间点正在显示的帧序号"""
+        position = bisect.bisect_right(self.pts, seconds + 1e-6) - 1
+        return min(max(position, 0), len(self.pts) - 1)
+
+    def evenly(self, count):
+        """均匀分成count段，取每段中间的帧"""
+        count = max(1, min(count, len(self.pts)))
+        return ((np.arange(count) + 0.5) * len(self.pts) / count).astype(np.int64).tolist()
+
+    def _needs_seek(self, position, target):
+        if len(self.keyframes):
+            # 当前位置与目标之间有关键帧时跳转更快(最多解码一个GOP)，否则继续向后解码
+            keyframe = self.keyframes[bisect.bisect_right(self.keyframes, target) - 1]
+            return keyframe > position
+        # 关键帧未知时，距离超过约1秒才跳转
+        return target - position > max(self.fps, 1.0)
+
+    def read_frames(self, path, indices):
+        """按帧序号读取，返回与indices顺序一致的RGB uint8数组列表"""
+        total = len(self.pts)
+        for index in indices:
+            if not 0 <= index < total:
+                raise ValueError(f"帧序号超出范围: {index}（共 {total} 帧）")
+        cap = cv2.VideoCapture(path)
+        if not cap.isOpened():
+            raise ValueError(f"无法打开视频: {path}")
+        frames = {}
+        position = None  # 下一次read返回的帧序号
+        try:
+            for target in sorted(set(indices)):
+                if position is None or target < position or self._needs_seek(position, target):
+                    # OpenCV从目标之前最近的关键帧开始解码到目标帧
+                    cap.set(cv2.CAP_PROP_POS_FRAMES, target)
+                    position = target
+                    self.seeks += 1
+                while position < target:
+                    if not cap.grab():
+                        raise ValueError(f"无法读取第{position}帧: {path}")
+                    position += 1
+                    self.decoded += 1
+                success, frame = cap.read()
+                if not success:
+                    raise ValueError(f"无法读取第{target}帧: {path}")
+                position += 1
+                self.decoded += 1
+                frames[target] = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        finally:
+            cap.release()
+        return [frames[index] for index in indices]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="视频工具")
+    commands = parser.add_subparsers(dest="command", required=True)
+    first_frames = commands.add_parser("first-frames", help="批量预热目录中视频的首帧缓存")
+    first_frames.add_argument("directory", help="视频目录")
+    first_frames.add_argument("--extensions", default=",".join(VIDEO_EXTENSIONS + ('.del',)),
+                              help="视频扩展名，逗号分隔")
+    frame_index = commands.add_parser("frame-index", help="建立视频帧索引并按索引取帧")
+    frame_index.add_argument("video", help="视频文件")
+    frame_index.add_argument("--sample", type=int, default=0, help="均匀读取的帧数，0为只建立索引")
+    args = parser.parse_args(argv)
+
+    if args.command == "first-frames":
+        extensions = tuple(ext.strip().lower() for ext in args.extensions.split(",") if ext.strip())
+        paths = sorted(
+            entry.path for entry in os.scandir(args.directory)
+            if entry.is_file() and os.path.splitext(entry.name)[1].lower() in extensions
+        )
+        start = time.perf_counter()
+        failed = 0
+        for path in paths:
+            try:
+                FirstFrameCache.get(path)
+            except (OSError, ValueError) as e:
+                print(f"[首帧缓存] 跳过 {path}: {str(e)}")
+                failed += 1
+        elapsed = time.perf_counter() - start
+        print(f"[首帧缓存] {len(paths)} 个视频，新解码 {FirstFrameCache.misses} 个，"
+              f"已缓存 {FirstFrameCache.hits} 个，失败 {failed} 个，用时 {elapsed:.2f}s")
+        return 1 if failed else 0
+
+    if args.command == "frame-index":
+        index = VideoFrameIndex.get(args.video)
+        print(f"[帧索引] {len(index)} 帧，{len(index.keyframes)} 个关键帧，时长 {index.pts[-1]:.2f}s，来源 {index.source}")
+        if args.sample:
+            start = time.perf_counter()
+            targets = index.evenly(args.sample)
+            index.read_frames(args.video, targets)
+            print(f"[帧索引] 读取 {len(targets)} 帧：跳转 {index.seeks} 次，顺序读取 {index.decoded} 帧，"
+                  f"用时 {(time.perf_counter() - start) * 1000:.0f}ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,11 +1,9 @@
 import os
 import random
-import glob
-import cv2
-import torch
-import numpy as np
-from PIL import Image
 import folder_paths
+from .image_utils import DirectoryIndex
+from .media_catalog import MediaCatalog
+from .video_utils import FirstFrameCache, VIDEO_EXTENSIONS
 
 class VideoLoader:
     """
@@ -17,8 +15,8 @@ class VideoLoader:
     微信：stone_liwei
     """
     def __init__(self):
-        self.current_index = 0  # 用于顺序模式
-        self.video_cache = []  # 缓存视频列表
+        self.last_video = None  # 顺序模式上一次读取的文件，新增/删除文件后仍能按排序位置继续
+        self.last_directory = None
     
     @classmethod
     def INPUT_TYPES(cls):
@@ -48,6 +46,24 @@ class VideoLoader:
                     "default": False,
                     "tooltip": "重置顺序模式的计数器"
                 }),
+                "orientation": (["any", "landscape", "portrait", "square"], {
+                    "default": "any",
+                    "tooltip": "按画面方向筛选：不限/横屏/竖屏/方形（来自媒体目录中的容器元数据，不解码）"
+                }),
+                "min_duration": ("FLOAT", {
+                    "default": 0.0,
+                    "min": 0.0,
+                    "max": 86400.0,
+                    "step": 0.5,
+                    "tooltip": "最短时长（秒），0为不限"
+                }),
+                "max_duration": ("FLOAT", {
+                    "default": 0.0,
+                    "min": 0.0,
+                    "max": 86400.0,
+                    "step": 0.5,
+                    "tooltip": "最长时长（秒），0为不限，例如15表示只选15秒以内的视频"
+                }),
             }
         }
     
@@ -57,67 +73,40 @@ class VideoLoader:
     CATEGORY = "🎨公众号懂AI的木子做号工具/懒人做号/视频相关"
     OUTPUT_NODE = True
 
-    def scan_video_files(self, directory):
-        """扫描目录中的视频文件"""
+    def get_index(self, directory):
+        """视频目录索引在进程内共享，其他流程新增/删除的视频会被增量同步"""
         base_dir = folder_paths.get_input_directory()
         video_dir = os.path.join(base_dir, directory)
-        
-        video_extensions = ['*.mp4', '*.mov', '*.avi', '*.mkv', '*.webm']
-        video_files = []
-        for ext in video_extensions:
-            video_files.extend(sorted(glob.glob(os.path.join(video_dir, ext))))
-        
-        if not video_files:
-            raise ValueError(f"目录中没有视频文件: {video_dir}")
-        
-        return video_files
+        if not os.path.isdir(video_dir):
+            raise ValueError(f"视频目录不存在: {video_dir}")
+        return DirectoryIndex.get(video_dir, VIDEO_EXTENSIONS)
 
-    def load_video(self, directory, mode, seed=0, gpu_acceleration=True, reset_counter=False):
-        # 重置计数器
-        if reset_counter:
-            self.current_index = 0
-        
-        # 扫描视频文件（如果目录改变或首次运行）
-        if not hasattr(self, 'last_directory') or self.last_directory != directory or not self.video_cache:
-            self.video_cache = self.scan_video_files(directory)
+    def load_video(self, directory, mode, seed=0, gpu_acceleration=True, reset_counter=False,
+                   orientation="any", min_duration=0.0, max_duration=0.0):
+        # 重置计数器；目录改变时从头开始
+        if reset_counter or self.last_directory != directory:
+            self.last_video = None
             self.last_directory = directory
-            self.current_index = 0
         
-        if not self.video_cache:
-            raise ValueError("没有可用的视频文件")
+        # 在媒体目录中按方向/时长筛选（只查询已记录的容器元数据，不解码；目录只列举一次）
+        index = MediaCatalog.view(self.get_index(directory), "video", orientation, min_duration, max_duration)
+        video_files = index.files()
+        if not video_files:
+            raise ValueError(f"目录中没有符合筛选条件的视频文件: {directory}")
         
         # 选择视频
         if mode == "random":
             random.seed(seed if seed != 0 else None)
-            selected_index = random.randint(0, len(self.video_cache) - 1)
+            selected_index = random.randint(0, len(video_files) - 1)
+            selected_video = video_files[selected_index]
         else:
-            # 顺序模式
-            if self.current_index >= len(self.video_cache):
-                self.current_index = 0  # 循环读取
-            selected_index = self.current_index
-            self.current_index += 1
-        
-        selected_video = self.video_cache[selected_index]
+            # 顺序模式：按文件名排在上一个之后的视频，读到末尾后循环
+            selected_index, selected_video = index.next_after(self.last_video)
+            self.last_video = selected_video
         
-        # 读取视频
+        # 读取首帧：优先取磁盘首帧缓存，命中时不打开视频
         try:
-            if gpu_acceleration and torch.cuda.is_available():
-                cap = cv2.VideoCapture(selected_video, cv2.CAP_ANY)
-                cap.set(cv2.CAP_PROP_HW_ACCELERATION, cv2.VIDEO_ACCELERATION_ANY)
-            else:
-                cap = cv2.VideoCapture(selected_video)
-            
-            # 读取第一帧
-            success, frame = cap.read()
-            cap.release()
-            
-            if not success:
-                raise ValueError(f"无法读取视频首帧: {selected_video}")
-            
-            # 转换图像格式
-            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            image = Image.fromarray(frame)
-            image_tensor = torch.from_numpy(np.array(image).astype(np.float32) / 255.0).unsqueeze(0)
+            image_tensor = FirstFrameCache.get_tensor(selected_video, gpu_acceleration)
             
             return (selected_video, image_tensor, selected_index + 1)  # 返回1-based序号
         except Exception as e: